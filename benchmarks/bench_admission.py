@@ -0,0 +1,110 @@
+"""Всплеск загрузок: FIFO без допуска против допуска и приоритетов по длительности.
+
+Запуск:
+    python benchmarks/bench_admission.py --uploads 200 --long-share 0.2
+
+Моделируется очередь с WORKER_CAPACITY параллельными обработчиками; время
+обработки — оценка AdmissionController (REALTIME_FACTOR * длительность +
+накладные). Решения о допуске и приоритеты берутся из настоящего
+контроллера на fakeredis. Выводятся задержки до завершения для коротких
+(< 10 минут) и длинных записей и число отказов с 429.
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import statistics
+import sys
+
+import fakeredis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "moduels"))
+
+from settings import AdmissionConfig
+from admission import AdmissionController
+
+SHORT_SECONDS = 600
+
+
+def simulate(jobs: list[dict], capacity: int, by_priority: bool) -> dict:
+    """Дискретная модель: jobs приходят в arrival, обработчик берёт следующую по (приоритет, приход)."""
+    jobs = sorted(jobs, key=lambda job: job["arrival"])
+    workers = [0.0] * capacity
+    waiting = []
+    latencies = {"short": [], "long": []}
+    position = 0
+    while position < len(jobs) or waiting:
+        free_at = min(workers)
+        # Все, кто пришёл к моменту освобождения обработчика, попадают в очередь
+        while position < len(jobs) and (jobs[position]["arrival"] <= free_at or not waiting):
+            job = jobs[position]
+            heapq.heappush(waiting, (job["priority"] if by_priority else 0, job["arrival"], position, job))
+            position += 1
+        _, _, _, job = heapq.heappop(waiting)
+        worker = workers.index(free_at)
+        finished = max(free_at, job["arrival"]) + job["work"]
+        workers[worker] = finished
+        latencies["short" if job["duration"] < SHORT_SECONDS else "long"].append(finished - job["arrival"])
+    return {
+        kind: {
+            "count": len(values),
+            "p50_minutes": round(statistics.median(values) / 60, 1) if values else None,
+            "p95_minutes": round(sorted(values)[int(len(values) * 0.95) - 1] / 60, 1) if values else None,
+        }
+        for kind, values in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--long-share", type=float, default=0.2)
+    parser.add_argument("--burst-seconds", type=float, default=600)
+    parser.add_argument("--max-backlog-seconds", type=float, default=4 * 3600)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    config = AdmissionConfig(MAX_BACKLOG_SECONDS=args.max_backlog_seconds, WORKER_CAPACITY=args.capacity)
+    controller = AdmissionController(config, fakeredis.FakeRedis())
+
+    jobs = []
+    for i in range(args.uploads):
+        long = rng.random() < args.long_share
+        duration = rng.uniform(3600, 3 * 3600) if long else rng.uniform(60, 300)
+        jobs.append({
+            "id": f"job-{i}",
+            "arrival": rng.uniform(0, args.burst_seconds),
+            "duration": duration,
+            "work": controller.estimate_work(duration),
+        })
+
+    fifo = [{**job, "priority": 0} for job in jobs]
+    admitted = []
+    rejected = 0
+    # Допуск в порядке прихода; освобождение очереди во время всплеска не учитывается (пессимистично)
+    for job in sorted(jobs, key=lambda job: job["arrival"]):
+        decision = controller.admit(job["id"], job["duration"])
+        if decision["admitted"]:
+            admitted.append({**job, "priority": decision["priority"]})
+        else:
+            rejected += 1
+
+    print(json.dumps({
+        "uploads": args.uploads,
+        "capacity": args.capacity,
+        "fifo_no_admission": simulate(fifo, args.capacity, by_priority=False),
+        "priority_no_admission": simulate(
+            [{**job, "priority": controller.priority(job["duration"])} for job in jobs], args.capacity, by_priority=True
+        ),
+        "priority_with_admission": simulate(admitted, args.capacity, by_priority=True),
+        "rejected_429": rejected,
+        "queue": controller.snapshot([]),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
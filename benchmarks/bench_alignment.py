@@ -0,0 +1,111 @@
+"""Замер сопоставления транскрипции и диаризации на синтетических данных.
+
+Запуск:
+    python benchmarks/bench_alignment.py --sizes 1000 10000 100000
+
+Для каждого размера генерируется N сегментов транскрипции и N сегментов
+диаризации трёх говорящих. Время на сегмент должно оставаться примерно
+постоянным (линейный рост). Режим legacy — прежний жадный проход
+с двумя указателями, для сравнения скорости и доли расхождений.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+
+from alignment import align, assign_speakers
+from segments import factorize
+
+
+def synthetic(n: int, seed: int = 0) -> tuple[list[dict], list[dict]]:
+    rng = np.random.default_rng(seed)
+    # Диаризация: чередование говорящих с небольшими наложениями
+    diar_lengths = rng.uniform(0.5, 8.0, n)
+    diar_starts = np.concatenate([[0.0], np.cumsum(diar_lengths)[:-1]]) - rng.uniform(0, 0.3, n).clip(0)
+    diar_ends = diar_starts + diar_lengths
+    speakers = rng.integers(0, 3, n)
+    diarization = [
+        {"start": float(s), "end": float(e), "speaker_id": f"SPEAKER_{k:02d}"}
+        for s, e, k in zip(diar_starts, diar_ends, speakers)
+    ]
+    total = float(diar_ends[-1])
+    trans_starts = np.sort(rng.uniform(0, total, n))
+    trans_ends = trans_starts + rng.uniform(0.3, 6.0, n)
+    transcription = [
+        {"start": float(s), "end": float(e), "transcription": f"фраза {i}"}
+        for i, (s, e) in enumerate(zip(trans_starts, trans_ends))
+    ]
+    return transcription, diarization
+
+
+def legacy_align(transcription_segments, diarization_segments) -> list[str]:
+    speakers = []
+    current_speaker = None
+    transcription_segments = sorted(transcription_segments, key=lambda x: x["start"])
+    diarization_segments = sorted(diarization_segments, key=lambda x: x["start"])
+    di = 0
+    for trans in transcription_segments:
+        while di < len(diarization_segments):
+            diar = diarization_segments[di]
+            if diar["start"] >= trans["end"]:
+                if current_speaker:
+                    speakers.append(current_speaker)
+                break
+            if diar["start"] <= trans["end"] and diar["end"] >= trans["start"]:
+                current_speaker = diar["speaker_id"]
+                speakers.append(current_speaker)
+                break
+            di += 1
+        if di >= len(diarization_segments) and current_speaker:
+            speakers.append(current_speaker)
+    return speakers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        transcription, diarization = synthetic(n)
+
+        started = time.perf_counter()
+        aligned = align(transcription, diarization, split_words=False)
+        vectorized = time.perf_counter() - started
+
+        # Только векторное назначение, без преобразования словарей
+        starts = np.array([segment["start"] for segment in transcription])
+        ends = np.array([segment["end"] for segment in transcription])
+        diar_starts = np.array([segment["start"] for segment in diarization])
+        diar_ends = np.array([segment["end"] for segment in diarization])
+        labels, codes = factorize([segment["speaker_id"] for segment in diarization])
+        started = time.perf_counter()
+        assign_speakers(starts, ends, diar_starts, diar_ends, codes, len(labels))
+        assign_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        legacy = legacy_align(transcription, diarization)
+        legacy_seconds = time.perf_counter() - started
+
+        disagreement = sum(a != b for a, b in zip(aligned.speaker, legacy)) / n
+        results.append({
+            "segments": n,
+            "vectorized_seconds": round(vectorized, 4),
+            "vectorized_us_per_segment": round(vectorized / n * 1e6, 2),
+            "assign_seconds": round(assign_seconds, 4),
+            "legacy_seconds": round(legacy_seconds, 4),
+            "legacy_extra_lines": len(legacy) - n,
+            "speaker_disagreement": round(disagreement, 4),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""RTF и WER бэкендов инференса ASR относительно eager fp32 на локальном наборе.
+
+Запуск:
+    python benchmarks/bench_asr_backends.py --manifest testset/ru.jsonl
+    python benchmarks/bench_asr_backends.py --manifest testset/en.jsonl --language en --backends torch_fp32,torch_int8
+    python benchmarks/bench_asr_backends.py --manifest testset/ru.jsonl --threads 4 --inter-op-threads 1
+
+Манифест — JSONL, по записи на файл: {"audio": "clip.wav", "text": "эталон", "language": "ru"};
+пути считаются от каталога манифеста, language по умолчанию --language.
+Набор фиксирован, поэтому результаты разных коммитов и машин сравнимы.
+
+Каждый бэкенд (--backends) замеряется в отдельном процессе с настоящими
+моделями из окружения воркера (GIGAAM_MODEL_NAME, WHISPER_MODEL_NAME,
+ASR_ARTIFACT_DIR): загрузка модели, прогрев на первом файле, затем
+распознавание всех файлов. Файл GigaAM распознаётся целиком одним
+сегментом речи, без VAD. WER считается по всему набору после нормализации
+(регистр, ё, пунктуация). Для бэкендов печатается ускорение RTF и прирост WER
+относительно torch_fp32, а также WER относительно гипотез fp32 (agreement):
+он показывает, сколько слов меняет сама оптимизация, даже при шумных эталонах.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import ROOT, git_commit
+
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+
+BASELINE = "torch_fp32"
+
+
+def normalize(text: str) -> list[str]:
+    text = text.lower().replace("ё", "е")
+    return re.sub(r"[^\w\s]", " ", text).split()
+
+
+def edit_distance(reference: list[str], hypothesis: list[str]) -> int:
+    """Расстояние Левенштейна по словам."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1]
+
+
+def corpus_wer(references: list[str], hypotheses: list[str]) -> float:
+    edits = words = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        reference = normalize(reference)
+        edits += edit_distance(reference, normalize(hypothesis))
+        words += len(reference)
+    return edits / max(words, 1)
+
+
+def load_manifest(path: str, language: str) -> list[dict]:
+    base = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get("language", language) != language:
+                continue
+            items.append({"audio": os.path.join(base, item["audio"]), "text": item["text"]})
+    return items
+
+
+def run_backend(args) -> dict:
+    """Один бэкенд в текущем процессе: загрузка, прогрев, распознавание набора."""
+    import torch
+    from config import load_transcription_config
+    from file_ingestion_module import FileIngestionModule, peak_rss_mb
+    from segments import Segments
+    from transcription_module import TranscriptionModule
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    config = load_transcription_config(args.language).copy(update={
+        "inference_backend": args.backend,
+        "onnx_intra_op_threads": args.threads,
+        "onnx_inter_op_threads": args.inter_op_threads,
+    })
+    items = load_manifest(args.manifest, args.language)[:args.limit or None]
+
+    with tempfile.TemporaryDirectory(prefix="bench_asr_") as workdir:
+        audios = [
+            FileIngestionModule.preprocess_audio(item["audio"], os.path.join(workdir, f"{index}.wav"))
+            for index, item in enumerate(items)
+        ]
+        started = time.perf_counter()
+        module = TranscriptionModule.from_config(config)
+        load_seconds = time.perf_counter() - started
+
+        def transcribe(audio) -> str:
+            segments = module.transcribe(audio, Segments([0.0], [audio.duration]))
+            return " ".join(text for text in segments.text or [] if text)
+
+        if audios:
+            transcribe(audios[0])
+        hypotheses = []
+        seconds = 0.0
+        for audio in audios:
+            started = time.perf_counter()
+            hypotheses.append(transcribe(audio))
+            seconds += time.perf_counter() - started
+        audio_seconds = sum(audio.duration for audio in audios)
+
+    return {
+        "backend": args.backend,
+        "files": len(items),
+        "audio_seconds": round(audio_seconds, 3),
+        "load_seconds": round(load_seconds, 3),
+        "seconds": round(seconds, 3),
+        "rtf": round(seconds / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(corpus_wer([item["text"] for item in items], hypotheses), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "hypotheses": hypotheses,
+    }
+
+
+def add_deltas(results: list[dict]) -> None:
+    """Сравнение с torch_fp32: ускорение RTF, прирост WER и расхождение с гипотезами fp32."""
+    baseline = next((result for result in results if result["backend"] == BASELINE and "error" not in result), None)
+    if baseline is None:
+        return
+    for result in results:
+        if "error" in result:
+            continue
+        result["rtf_speedup"] = round(baseline["rtf"] / result["rtf"], 3) if result["rtf"] else None
+        result["wer_delta"] = round(result["wer"] - baseline["wer"], 4)
+        result["agreement_wer"] = round(corpus_wer(baseline["hypotheses"], result["hypotheses"]), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", required=True, help="JSONL тестового набора")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--backends", default="torch_fp32,torch_int8,onnx,onnx_int8")
+    parser.add_argument("--threads", type=int, default=0, help="Потоки torch и intra-op ONNX Runtime (0 — по умолчанию)")
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=0, help="Первые N файлов набора")
+    parser.add_argument("--output", default="bench_asr_backends.json")
+    # Внутренний режим: один бэкенд в дочернем процессе
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args), ensure_ascii=False))
+        return
+
+    results = []
+    for backend in args.backends.split(","):
+        command = [
+            sys.executable, os.path.abspath(__file__), "--backend", backend,
+            "--manifest", args.manifest, "--language", args.language, "--limit", str(args.limit),
+            "--threads", str(args.threads), "--inter-op-threads", str(args.inter_op_threads),
+        ]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            # Например, onnx для Whisper: бэкенд не поддерживается, остальные замеряются
+            results.append({"backend": backend, "error": completed.stderr.strip().splitlines()[-1]})
+        else:
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    add_deltas(results)
+    for result in results:
+        print(json.dumps({key: value for key, value in result.items() if key != "hypotheses"}, ensure_ascii=False))
+
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "backend"},
+        "backends": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Замер задержки суммаризации против фейкового Ollama.
+
+Запуск:
+    python benchmarks/bench_llm_client.py --requests 64 --concurrency 8 --fail-rate 0.05
+
+Сравнивает прежнюю схему (requests.post без сессии, без потоковой выдачи)
+с асинхронным клиентом: общая задержка, время до первого частичного реферата,
+число TCP-соединений, открытых к серверу.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import start_server
+
+DIALOGUE = "\n".join(f"#SPEAKER_0{i % 2}#: реплика номер {i}" for i in range(40))
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_legacy(url: str, prompt: dict, args) -> dict:
+    import requests
+
+    def request(_):
+        started = time.perf_counter()
+        payload = {"model": "fake", "prompt": prompt["prompt"].format(DIalogue=DIALOGUE), "stream": False}
+        for attempt in range(args.retries + 1):
+            response = requests.post(url, json=payload)
+            if response.ok or attempt == args.retries:
+                break
+        response.raise_for_status()
+        latency = time.perf_counter() - started
+        return latency, latency
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        return list(executor.map(request, range(args.requests)))
+
+
+def run_client(url: str, prompt_path: str, args) -> list:
+    from config import SummarizationConfig
+    from summarization_module import SummarizationModule
+
+    config = SummarizationConfig(
+        model="fake", url=url, temperature=0.2, format="ollama", prompt_path=prompt_path,
+        max_concurrency=args.concurrency, max_retries=args.retries, stream=True,
+    )
+
+    def request(_):
+        module = SummarizationModule.from_config(config)
+        started = time.perf_counter()
+        first = []
+        module.summarize(DIALOGUE, on_partial=lambda text: first or first.append(time.perf_counter() - started))
+        latency = time.perf_counter() - started
+        return latency, first[0] if first else latency
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        return list(executor.map(request, range(args.requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"prompt": "Кратко перескажи беседу:\n{DIalogue}"}, f, ensure_ascii=False)
+        prompt_path = f.name
+
+    results = {}
+    for mode in ("legacy", "client"):
+        server = start_server(tokens=args.tokens, token_delay=args.token_delay, fail_rate=args.fail_rate)
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+        started = time.perf_counter()
+        if mode == "legacy":
+            samples = run_legacy(url, {"prompt": "Кратко перескажи беседу:\n{DIalogue}"}, args)
+        else:
+            samples = run_client(url, prompt_path, args)
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, _ in samples]
+        first = [first for _, first in samples]
+        results[mode] = {
+            "total_seconds": round(elapsed, 3),
+            "latency_p50": round(statistics.median(latencies), 3),
+            "latency_p95": round(percentile(latencies, 0.95), 3),
+            "first_partial_p50": round(statistics.median(first), 3),
+            "connections": len(server.RequestHandlerClass.connections),
+        }
+        server.shutdown()
+
+    os.remove(prompt_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
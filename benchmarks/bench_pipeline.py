@@ -0,0 +1,268 @@
+"""Сквозной замер SummarizationPipeline без настоящих моделей и сервисов.
+
+Запуск:
+    python benchmarks/bench_pipeline.py --durations 60,600,3600,10800 --concurrency 1,4
+    python benchmarks/bench_pipeline.py --asr-rtf 0.05 --output new.json --compare old.json
+
+Для каждой длительности генерируется синтетический диалог, затем задачи
+проходят стадии воркера из moduels/tasks.py в eager-режиме Celery:
+предобработка, транскрибация и диаризация (заглушки из stub_models.py,
+длинные записи — через шарды и сведение говорящих), разбор и сжатие диалога,
+суммаризация против fake_ollama.py, публикация в LocalStorageManager.
+Статусы и допуск — на fakeredis, кэш артефактов включается --cache.
+
+Каждый сценарий (длительность, параллельность) выполняется в отдельном
+процессе, чтобы пиковый RSS не смешивался. Результат — JSON с коммитом,
+параметрами и метриками: время стадий, RTF стадий, пиковый RSS, файлов
+в час, p50/p95 задержки задачи. --compare печатает отношение метрик к прошлому прогону.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+MODUELS = os.path.join(ROOT, "moduels")
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+sys.path.insert(0, BENCH_DIR)
+
+STAGES = ["preprocess", "analyze", "summarize", "publish"]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def import_service_module(name: str):
+    """Импорт модуля сервиса из moduels, как из рабочего каталога uvicorn и celery.
+
+    Корень репозитория тоже в пути, как в PYTHONPATH воркеров: tasks импортирует пакет summarization_pipeline.
+    """
+    for path in (MODUELS, ROOT):
+        if path not in sys.path:
+            sys.path.append(path)
+    return importlib.import_module(name)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(args) -> dict:
+    """Один сценарий в текущем процессе: args.tasks задач по args.concurrency параллельно.
+
+    Задачи проходят стадии tasks.py в eager-режиме Celery (контрольные точки,
+    кэш артефактов, шарды и сведение — как у воркеров), модели заменены заглушками.
+    """
+    import fakeredis
+    from celery.signals import task_postrun, task_prerun
+    from file_ingestion_module import peak_rss_mb
+    from fake_ollama import start_server
+    from stub_models import StubTranscriptionModule, StubDiarizationModule
+
+    workdir = args.workdir
+    server = start_server(tokens=args.llm_tokens, token_delay=args.llm_token_delay)
+    prompt_path = os.path.join(workdir, "prompt.json")
+    with open(prompt_path, "w", encoding="utf-8") as f:
+        json.dump({"prompt": "Кратко перескажи беседу:\n{DIalogue}"}, f, ensure_ascii=False)
+    os.environ.update({
+        "STORAGE_BACKEND": "local",
+        "STORAGE_LOCAL_DIR": os.path.join(workdir, "storage"),
+        "UPLOAD_BACKEND": "local",
+        "UPLOAD_LOCAL_DIR": os.path.join(workdir, "uploads"),
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+        # Все задачи сценария обрабатывают одну запись: без --cache каждая проходит все стадии
+        "CACHE_BACKEND": "local" if args.cache else "none",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "LLM_MODEL": "fake",
+        "LLM_URL": f"http://127.0.0.1:{server.server_address[1]}/api/generate",
+        "LLM_FORMAT": "ollama",
+        "PROMPT_PATH": prompt_path,
+    })
+    # Имена моделей нужны только конфигам: вместо моделей работают заглушки
+    os.environ.setdefault("GIGAAM_MODEL_NAME", "stub")
+    os.environ.setdefault("WHISPER_MODEL_NAME", "stub")
+    os.makedirs(os.environ["UPLOAD_LOCAL_DIR"], exist_ok=True)
+    tasks_module = import_service_module("tasks")
+
+    # Цепочка и chord шардов выполняются синхронно в потоке задачи, шарды — по очереди,
+    # как у одного ASR-воркера. Бэкенд результатов chord — в памяти, Redis статусов и допуска — fakeredis.
+    tasks_module.celery_app.conf.task_always_eager = True
+    tasks_module.celery_app.conf.result_backend = "cache+memory://"
+    tasks_module.celery_app.conf.task_eager_propagates = True
+    redis_client = fakeredis.FakeRedis()
+    tasks_module.status_tracker.redis_client = redis_client
+    tasks_module.admission_controller.redis_client = redis_client
+
+    class BenchPipeline(tasks_module.SummarizationPipeline):
+        @cached_property
+        def transcription(self):
+            return StubTranscriptionModule(self.transcription_config, args.asr_rtf)
+
+        @cached_property
+        def diarization(self):
+            return StubDiarizationModule(self.diarization_config, args.diarization_rtf)
+
+    # build_pipeline создаёт пайплайн по имени из модуля tasks
+    tasks_module.SummarizationPipeline = BenchPipeline
+
+    # Время стадий Celery по задаче; шарды и сведение выполняются внутри analyze.
+    # Сведение после replace наследует id analyze, поэтому начала стадий — стеком.
+    stage_started = {}
+    stage_seconds = {}
+
+    def stage_key(task, task_args):
+        context = task_args[-1] if task_args and isinstance(task_args[-1], dict) else {}
+        return context.get("task_id"), task.name.rsplit(".", 1)[-1].removesuffix("_task")
+
+    @task_prerun.connect(weak=False)
+    def start_stage(task_id=None, **kwargs):
+        stage_started.setdefault(task_id, []).append(time.perf_counter())
+
+    @task_postrun.connect(weak=False)
+    def finish_stage(task_id=None, task=None, **kwargs):
+        key = stage_key(task, kwargs.get("args") or ())
+        if key[0] is not None:
+            stage_seconds[key] = stage_seconds.get(key, 0.0) + time.perf_counter() - stage_started[task_id].pop()
+
+    def run_task(index: int) -> dict:
+        task_id = f"bench-{args.duration:g}-{index}"
+        # Публикация удаляет загрузку, поэтому у каждой задачи своя копия записи
+        upload_path = os.path.join(os.environ["UPLOAD_LOCAL_DIR"], f"{task_id}.wav")
+        shutil.copyfile(args.audio, upload_path)
+        started = time.perf_counter()
+        # apply, а не delay: eager-delay взводит общий для процесса флаг запрета join Celery,
+        # и цепочки соседних потоков падали бы на result.get()
+        tasks_module.process_audio_task.apply((upload_path, task_id, None, args.language))
+        latency = time.perf_counter() - started
+        status = tasks_module.status_tracker.get_status(task_id)
+        if status["status"] != "completed":
+            raise RuntimeError(f"{task_id}: {status['status']} {status['details']}")
+        return {
+            "latency": latency,
+            "stages": {name: stage_seconds.get((task_id, name), 0.0) for name in STAGES},
+            "pipeline": status["details"]["timings"],
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(executor.map(run_task, range(args.tasks)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies = [task["latency"] for task in results]
+    return {
+        "duration_seconds": args.duration,
+        "concurrency": args.concurrency,
+        "tasks": args.tasks,
+        "wall_seconds": round(elapsed, 3),
+        "files_per_hour": round(args.tasks / elapsed * 3600, 1),
+        "audio_hours_per_hour": round(args.tasks * args.duration / elapsed, 2),
+        "latency_p50_seconds": round(percentile(latencies, 0.5), 3),
+        "latency_p95_seconds": round(percentile(latencies, 0.95), 3),
+        "stage_seconds_mean": {
+            name: round(statistics.mean(task["stages"][name] for task in results), 3) for name in STAGES
+        },
+        # RTF по замерам самого пайплайна (instrumentation.StageTimings); взятые из кэша стадии не замеряются
+        "stage_rtf_mean": {
+            name: round(statistics.mean(task["pipeline"][name]["rtf"] for task in results if "rtf" in task["pipeline"].get(name, {})), 4)
+            for name in sorted({name for task in results for name, entry in task["pipeline"].items() if "rtf" in entry})
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    """Отношение текущих метрик к прошлому прогону по совпадающим сценариям (>1 — выросло)."""
+    previous_runs = {(run["duration_seconds"], run["concurrency"]): run for run in previous["scenarios"]}
+    for run in current["scenarios"]:
+        old = previous_runs.get((run["duration_seconds"], run["concurrency"]))
+        if old is None:
+            continue
+        ratios = {
+            metric: round(run[metric] / old[metric], 3)
+            for metric in ("files_per_hour", "latency_p50_seconds", "latency_p95_seconds", "peak_rss_mb")
+            if old.get(metric)
+        }
+        print(f"{run['duration_seconds']:>7g}s x{run['concurrency']}: {json.dumps(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", default="60,600,3600,10800", help="Длительности записей, секунды")
+    parser.add_argument("--concurrency", default="1,4", help="Число одновременных задач")
+    parser.add_argument("--tasks", type=int, default=0, help="Задач на сценарий (по умолчанию 2 * concurrency)")
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--asr-rtf", type=float, default=0.0)
+    parser.add_argument("--diarization-rtf", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Кэш артефактов: повторные задачи берут стадии из кэша")
+    parser.add_argument("--llm-tokens", type=int, default=100)
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    # Внутренний режим: один сценарий в дочернем процессе
+    parser.add_argument("--scenario", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--audio", help=argparse.SUPPRESS)
+    parser.add_argument("--duration", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        args.concurrency = int(args.concurrency)
+        print(json.dumps(run_scenario(args)))
+        return
+
+    from stub_models import synthesize_dialogue
+
+    scenarios = []
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        for duration in [float(value) for value in args.durations.split(",")]:
+            audio = synthesize_dialogue(os.path.join(workdir, f"dialogue_{duration:g}.wav"), duration, args.speakers)
+            for concurrency in [int(value) for value in args.concurrency.split(",")]:
+                scenario_dir = tempfile.mkdtemp(dir=workdir)
+                command = [
+                    sys.executable, os.path.abspath(__file__), "--scenario",
+                    "--audio", audio, "--duration", str(duration), "--workdir", scenario_dir,
+                    "--concurrency", str(concurrency), "--tasks", str(args.tasks or 2 * concurrency),
+                    "--language", args.language, "--asr-rtf", str(args.asr_rtf),
+                    "--diarization-rtf", str(args.diarization_rtf),
+                    "--llm-tokens", str(args.llm_tokens), "--llm-token-delay", str(args.llm_token_delay),
+                ] + (["--cache"] if args.cache else [])
+                output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+                scenarios.append(json.loads(output.strip().splitlines()[-1]))
+                print(json.dumps(scenarios[-1]))
+
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("scenario", "audio", "duration", "workdir")},
+        "scenarios": scenarios,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Замер времени декодирования и пикового RSS предобработки аудио.
+
+Запуск:
+    python benchmarks/bench_preprocess.py path/to/audio.mp3
+
+Каждый режим выполняется в отдельном процессе, чтобы пиковый RSS
+не смешивался между прогонами. Режим legacy воспроизводит прежнюю
+цепочку convert_to_wav -> normalize_volume -> resample_audio и одно
+повторное чтение WAV стадией транскрибации.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+
+
+def run_single_pass(path: str) -> dict:
+    from file_ingestion_module import FileIngestionModule
+
+    with tempfile.TemporaryDirectory() as tmp:
+        audio = FileIngestionModule.preprocess_audio(path, os.path.join(tmp, "audio_16k.wav"))
+        # Стадии читают отображённый в память буфер
+        float(audio.waveform.sum())
+        stats = audio.stats()
+        audio.release()
+    return stats
+
+
+def run_legacy(path: str) -> dict:
+    from pydub import AudioSegment
+    from file_ingestion_module import peak_rss_mb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        wav_path = os.path.join(tmp, "audio.wav")
+        AudioSegment.from_file(path).export(wav_path, format="wav")
+        AudioSegment.from_file(wav_path).normalize()
+        audio = AudioSegment.from_wav(wav_path)
+        audio.set_frame_rate(16000).export(wav_path, format="wav")
+        audio = AudioSegment.from_wav(wav_path)
+        decode_seconds = time.perf_counter() - started
+        duration = len(audio) / 1000
+    return {
+        "duration": round(duration, 3),
+        "decode_seconds": round(decode_seconds, 3),
+        "decode_seconds_per_hour": round(decode_seconds / max(duration, 1e-9) * 3600, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio_path")
+    parser.add_argument("--mode", choices=["legacy", "single_pass"])
+    args = parser.parse_args()
+
+    if args.mode:
+        runner = run_legacy if args.mode == "legacy" else run_single_pass
+        print(json.dumps(runner(args.audio_path)))
+        return
+
+    results = {}
+    for mode in ("legacy", "single_pass"):
+        output = subprocess.check_output([sys.executable, __file__, args.audio_path, "--mode", mode])
+        results[mode] = json.loads(output)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Публикация результатов: файлы по одному против put_many из памяти, и выдача ссылок.
+
+Запуск:
+    python benchmarks/bench_result_upload.py --tasks 50
+    python benchmarks/bench_result_upload.py --backend local
+
+Для s3 поднимается moto-сервер как локальная замена S3. Сравниваются прежний
+путь (запись .md/.txt на диск и последовательный upload_file) и put_many,
+а также генерация ссылки на скачивание без кэша и с кэшем. --latency-ms
+добавляет задержку к каждому запросу к S3, имитируя сеть.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "moduels"))
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+
+BUCKET = "bench-results"
+SUMMARY = "Участники обсудили сроки релиза и распределили задачи.\n\n" * 200
+
+
+def start_s3(port: int) -> str:
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    ThreadedMotoServer(port=port).start()
+    endpoint = f"http://127.0.0.1:{port}"
+    boto3.client(
+        "s3", endpoint_url=endpoint, region_name="us-east-1",
+        aws_access_key_id="bench", aws_secret_access_key="bench",
+    ).create_bucket(Bucket=BUCKET)
+    return endpoint
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--backend", choices=["s3", "local"], default="s3")
+    parser.add_argument("--port", type=int, default=5123)
+    # Задержка сети до S3 на каждый запрос: у moto на localhost её практически нет
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_results_")
+    env = {"STORAGE_BACKEND": args.backend, "STORAGE_LOCAL_DIR": os.path.join(workdir, "storage")}
+    if args.backend == "s3":
+        env.update({
+            "S3_ENDPOINT_URL": start_s3(args.port), "S3_BUCKET_NAME": BUCKET, "S3_REGION": "us-east-1",
+            "S3_ACCESS_KEY": "bench", "S3_SECRET_KEY": "bench",
+        })
+    os.environ.update(env)
+
+    from settings import StorageConfig
+    from s3_storage import create_storage
+    from result_formatter import ResultFormatterModule
+
+    storage = create_storage(StorageConfig())
+    if args.backend == "s3" and args.latency_ms:
+        storage.s3_client.meta.events.register("before-send.s3.*", lambda **kwargs: time.sleep(args.latency_ms / 1000))
+    formatter = ResultFormatterModule()
+    task_ids = [f"bench-{i}" for i in range(args.tasks)]
+
+    def files_one_by_one():
+        for task_id in task_ids:
+            for path in formatter.format_results(SUMMARY, os.path.join(workdir, "results"), task_id).values():
+                storage.upload_file(path, f"results/{task_id}/{os.path.basename(path)}")
+
+    def put_many():
+        for task_id in task_ids:
+            rendered = formatter.render_results(SUMMARY)
+            storage.put_many({
+                f"results/{task_id}/{task_id}_summary.{file_type}": content.encode("utf-8")
+                for file_type, content in rendered.items()
+            })
+
+    keys = [f"results/{task_id}/{task_id}_summary.md" for task_id in task_ids]
+    result = {
+        "backend": args.backend,
+        "tasks": args.tasks,
+        "latency_ms": args.latency_ms if args.backend == "s3" else 0,
+        "files_one_by_one_ms": timed(files_one_by_one),
+        "put_many_ms": timed(put_many),
+        "presign_uncached_ms": timed(lambda: [storage.presign(key, 3600) for key in keys]),
+        "presign_cold_cache_ms": timed(lambda: [storage.get_download_url(key) for key in keys]),
+        "presign_warm_cache_ms": timed(lambda: [storage.get_download_url(key) for key in keys]),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
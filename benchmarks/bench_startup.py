@@ -0,0 +1,166 @@
+"""Время импорта и память процесса API и простаивающего воркера.
+
+Запуск:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --preload ru --output new.json --compare old.json
+
+Каждая цель импортируется в чистом дочернем процессе: python — пустой
+интерпретатор для отсчёта, api — api_service (как uvicorn), worker — tasks
+(как celery -A tasks worker, модели ещё не загружены), pipeline — пакет
+summarization_pipeline. С --preload воркер дополнительно прогревает модели
+для перечисленных языков, как при MODEL_POOL_PRELOAD.
+
+Для цели пишется медиана времени импорта по --repeat запускам, RSS после
+импорта, пиковый RSS, число модулей и какие тяжёлые пакеты оказались
+загружены: процесс API не должен тянуть ни одного. Если зависимости цели
+не установлены, вместо замера записывается ошибка импорта.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import ROOT, git_commit, import_service_module
+
+TARGETS = ["python", "api", "worker", "pipeline"]
+# Пакеты моделей и инференса: их импорт занимает секунды и сотни МБ
+HEAVY_MODULES = ["torch", "whisper", "gigaam", "pyannote", "onnxruntime", "transformers", "openai", "summarization_pipeline"]
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def import_target(target: str, preload: list[str]) -> None:
+    """Импорт так же, как его выполняет процесс сервиса."""
+    if target == "api":
+        import_service_module("api_service")
+    elif target == "worker":
+        # Модули пайплайна импортируются плоско: воркеру нужны корень и каталог пайплайна в PYTHONPATH
+        sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+        sys.path.insert(0, ROOT)
+        import summarization_pipeline
+        import_service_module("tasks")
+        if preload:
+            summarization_pipeline.preload_models(preload)
+    elif target == "pipeline":
+        sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+        sys.path.insert(0, ROOT)
+        import summarization_pipeline  # noqa: F401
+
+
+def measure_target(target: str, preload: list[str]) -> dict:
+    """Замер в текущем (дочернем) процессе."""
+    rss_before = rss_mb()
+    modules_before = len(sys.modules)
+    started = time.perf_counter()
+    try:
+        import_target(target, preload)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {
+        "import_seconds": time.perf_counter() - started,
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": rss_mb() - rss_before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "modules": len(sys.modules) - modules_before,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def run_target(target: str, args) -> dict:
+    runs = []
+    for _ in range(args.repeat):
+        command = [sys.executable, os.path.abspath(__file__), "--target", target, "--preload", args.preload]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            return {"target": target, "error": completed.stderr.strip().splitlines()[-1]}
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        if "error" in run:
+            return {"target": target, **run}
+        runs.append(run)
+    return {
+        "target": target,
+        "import_seconds_median": round(statistics.median(run["import_seconds"] for run in runs), 3),
+        "import_seconds_max": round(max(run["import_seconds"] for run in runs), 3),
+        "rss_mb": round(statistics.median(run["rss_mb"] for run in runs), 1),
+        "rss_delta_mb": round(statistics.median(run["rss_delta_mb"] for run in runs), 1),
+        "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+        "modules": runs[-1]["modules"],
+        "heavy_modules": runs[-1]["heavy_modules"],
+    }
+
+
+def compare(current: dict, previous: dict) -> None:
+    """Отношение текущих метрик к прошлому прогону по совпадающим целям (>1 — выросло)."""
+    previous_runs = {run["target"]: run for run in previous["targets"]}
+    for run in current["targets"]:
+        old = previous_runs.get(run["target"])
+        if old is None or "error" in run or "error" in old:
+            continue
+        ratios = {
+            metric: round(run[metric] / old[metric], 3)
+            for metric in ("import_seconds_median", "rss_mb", "peak_rss_mb")
+            if old.get(metric)
+        }
+        print(f"{run['target']:>8}: {json.dumps(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="Запусков на цель, берётся медиана")
+    parser.add_argument("--preload", default="", help="Языки прогрева моделей воркера, например ru,en")
+    parser.add_argument("--output", default="bench_startup.json")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    # Внутренний режим: замер одной цели в дочернем процессе
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    preload = [lang.strip() for lang in args.preload.split(",") if lang.strip()]
+    if args.target:
+        print(json.dumps(measure_target(args.target, preload)))
+        return
+
+    # Сервисы читают конфиги при импорте: без S3 и имён моделей импорт не пройдёт
+    os.environ.setdefault("STORAGE_BACKEND", "local")
+    os.environ.setdefault("GIGAAM_MODEL_NAME", "stub")
+    os.environ.setdefault("WHISPER_MODEL_NAME", "stub")
+
+    targets = []
+    for target in args.targets.split(","):
+        targets.append(run_target(target, args))
+        print(json.dumps(targets[-1]))
+
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "target"},
+        "targets": targets,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Опрос статусов многих задач: по одной против get_many.
+
+Запуск:
+    python benchmarks/bench_status_batch.py --tasks 500
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/bench_status_batch.py
+
+Без REDIS_URL используется fakeredis, где нет сетевых задержек, поэтому
+разница между поштучным и пакетным опросом там занижена.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import fakeredis
+import redis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "moduels"))
+
+from status_tracker import StatusTracker, PROGRESS_STAGES
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--completed-share", type=float, default=0.5)
+    args = parser.parse_args()
+
+    url = os.getenv("REDIS_URL")
+    client = redis.from_url(url) if url else fakeredis.FakeRedis()
+    tracker = StatusTracker(client)
+    task_ids = [f"bench-{i}" for i in range(args.tasks)]
+    completed = int(args.tasks * args.completed_share)
+
+    updates = []
+    for i, task_id in enumerate(task_ids):
+        stages = ["uploaded", "processing", *PROGRESS_STAGES]
+        if i < completed:
+            stages.append("completed")
+        updates.extend((task_id, stage, {"filename": f"{task_id}.wav"}) for stage in stages)
+
+    result = {
+        "tasks": args.tasks,
+        "backend": "redis" if url else "fakeredis",
+        "set_status_ms": timed(lambda: [tracker.set_status(*update) for update in updates[:len(updates) // 2]]),
+        "set_many_ms": timed(lambda: tracker.set_many(updates[len(updates) // 2:])),
+    }
+    tracker.cache.entries.clear()
+    result["get_status_loop_ms"] = timed(lambda: [tracker.get_status(task_id) for task_id in task_ids])
+    tracker.cache.entries.clear()
+    result["get_many_cold_ms"] = timed(lambda: tracker.get_many(task_ids))
+    # Завершённые задачи теперь в кэше процесса, в Redis идут только остальные
+    result["get_many_warm_ms"] = timed(lambda: tracker.get_many(task_ids))
+    result["cached_completed"] = len(tracker.cache.entries)
+
+    client.delete(*[tracker.key(task_id) for task_id in task_ids])
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
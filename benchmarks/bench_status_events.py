@@ -0,0 +1,98 @@
+"""Рассылка событий статуса множеству подписчиков на fakeredis.
+
+Запуск:
+    python benchmarks/bench_status_events.py --tasks 200 --subscribers 10
+
+Воркер (StatusTracker в отдельном потоке) проводит каждую задачу через все
+стадии; на каждую задачу подписано --subscribers клиентов через
+StatusEventHub. Проверяется, что каждый подписчик получил снимок и все
+переходы по порядку с накопленным прогрессом, и замеряется задержка доставки.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import fakeredis
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "moduels"))
+
+from status_tracker import StatusTracker, PROGRESS_STAGES
+from status_events import StatusEventHub
+
+STAGES = ["uploaded", "processing", *PROGRESS_STAGES, "completed"]
+
+
+async def subscriber(hub: StatusEventHub, tracker: StatusTracker, task_id: str) -> dict:
+    statuses = []
+    latencies = []
+    async for event in hub.events(task_id, lambda: asyncio.to_thread(tracker.get_status, task_id)):
+        if event is None or event["type"] != "status":
+            continue
+        latencies.append(time.time() - event["updated_at"])
+        statuses.append(event["status"])
+        last = event
+    done = [stage for stage, reached in last["pipeline_progress"].items() if reached]
+    return {"statuses": statuses, "latencies": latencies, "progress_complete": done == PROGRESS_STAGES}
+
+
+def run_worker(tracker: StatusTracker, task_ids: list[str], delay: float) -> None:
+    for stage in STAGES:
+        for task_id in task_ids:
+            tracker.set_status(task_id, stage)
+        time.sleep(delay)
+
+
+async def main_async(args) -> dict:
+    server = fakeredis.FakeServer()
+    tracker = StatusTracker(fakeredis.FakeRedis(server=server))
+    hub = StatusEventHub(fakeredis.aioredis.FakeRedis(server=server))
+    task_ids = [f"task-{i}" for i in range(args.tasks)]
+    for task_id in task_ids:
+        tracker.set_status(task_id, "uploaded")
+
+    subscribers = [
+        asyncio.create_task(subscriber(hub, tracker, task_id))
+        for task_id in task_ids for _ in range(args.subscribers)
+    ]
+    # Ждём, пока все подписки оформятся
+    while sum(len(queues) for queues in hub.subscribers.values()) < len(subscribers):
+        await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    worker = threading.Thread(target=run_worker, args=(tracker, task_ids, args.stage_delay))
+    worker.start()
+    results = await asyncio.gather(*subscribers)
+    elapsed = time.perf_counter() - started
+    worker.join()
+
+    expected = STAGES[1:]
+    latencies = [latency for result in results for latency in result["latencies"]]
+    return {
+        "tasks": args.tasks,
+        "subscribers": len(subscribers),
+        "events_delivered": len(latencies),
+        "complete_sequences": sum(r["statuses"][-len(expected):] == expected for r in results),
+        "progress_accumulated": sum(r["progress_complete"] for r in results),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_max_ms": round(max(latencies) * 1000, 2),
+        "total_seconds": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--stage-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
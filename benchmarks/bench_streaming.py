@@ -0,0 +1,231 @@
+"""Потоковая транскрибация: задержка строк и предел одновременных потоков.
+
+Запуск:
+    python benchmarks/bench_streaming.py --duration 120 --streams 1,4,8,16
+    python benchmarks/bench_streaming.py --asr-rtf 0.05 --speed 4 --latency-budget 2
+
+Клиент воспроизводит записанный диалог (синтетический, см. stub_models.py)
+кадрами --chunk-ms в реальном времени (--speed ускоряет) через WebSocket
+к uvicorn-серверу с настоящим приложением stream_service.app и маршрутом /stream.
+В приложении подменены только внешние зависимости: сессии StreamSessionManager
+работают с заглушками ASR и эмбеддингов говорящих, статусы пишутся в fakeredis,
+а задачи суммаризации записываются вместо отправки в Celery. После прогона
+проверяется, что каждый принятый поток дошёл до dialogue_done и поставил задачу.
+
+Для каждой строки считается задержка от отправки последнего кадра её
+фрагмента до получения строки (с паузой, закрывающей фрагмент) и серверная
+задержка от закрытия фрагмента VAD до отправки. Предел потоков на процесс —
+наибольшее число, при котором p95 задержки не превышает --latency-budget.
+Нужен пакет websockets (идёт с uvicorn[standard]).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import git_commit, import_service_module, percentile
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_app(manager) -> tuple:
+    """stream_service.app с менеджером сессий бенчмарка, fakeredis и записью задач Celery.
+
+    Returns:
+        tuple: (приложение, модуль stream_service, список поставленных задач)
+    """
+    import fakeredis
+
+    os.environ.setdefault("STORAGE_BACKEND", "local")
+    stream_service = import_service_module("stream_service")
+    stream_service.stream_session_manager = manager
+    stream_service.status_tracker.redis_client = fakeredis.FakeRedis()
+    sent = []
+    stream_service.celery_app.send_task = lambda name, args=None, **kwargs: sent.append((name, args))
+    return stream_service.app, stream_service, sent
+
+
+def check_streams(stream_service, sent: list, task_ids: list[str]) -> None:
+    """Каждый принятый поток дошёл до dialogue_done и поставил задачу суммаризации."""
+    queued = {args[0] for name, args in sent if name == stream_service.PROCESS_STREAM_TASK}
+    for task_id in task_ids:
+        status = stream_service.status_tracker.get_status(task_id)
+        assert status is not None and status["status"] == "dialogue_done", (task_id, status)
+        assert task_id in queued, f"{task_id}: stream task was not queued"
+
+
+def start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def replay(url: str, pcm: bytes, args) -> dict:
+    """Один клиент: кадры в темпе записи, строки принимаются параллельно."""
+    import websockets
+
+    chunk = int(16000 * args.chunk_ms / 1000) * 2
+    lines = []
+    async with websockets.connect(url, max_size=None) as ws:
+        try:
+            started = json.loads(await ws.recv())
+        except websockets.ConnectionClosed as e:
+            # Отказ по лимиту сессий — закрытие 1013 до сообщения started; прочие закрытия — ошибка
+            if e.rcvd is not None and e.rcvd.code == 1013:
+                return {"rejected": True}
+            raise
+        task_id = started["task_id"]
+        t0 = time.perf_counter()
+
+        async def send():
+            for offset in range(0, len(pcm), chunk):
+                # Кадр уходит не раньше, чем он прозвучал бы в живом разговоре
+                due = t0 + offset / 2 / 16000 / args.speed
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await ws.send(pcm[offset:offset + chunk])
+            await ws.send(json.dumps({"type": "end"}))
+
+        sender = asyncio.create_task(send())
+        finished = None
+        async for message in ws:
+            event = json.loads(message)
+            if event["type"] == "line":
+                received = time.perf_counter()
+                sent = t0 + event["end"] / args.speed
+                lines.append({"client": received - sent, "server": event["latency"]})
+            elif event["type"] == "finished":
+                finished = event
+        await sender
+    return {"rejected": False, "task_id": task_id, "lines": lines, "finished": finished}
+
+
+def summarize_latencies(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(percentile(values, 0.5), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "max": round(max(values), 3),
+    }
+
+
+async def run_streams(port: int, pcm: bytes, count: int, args) -> dict:
+    url = f"ws://127.0.0.1:{port}/stream?num_speakers={args.speakers}"
+    started = time.perf_counter()
+    # Запись у каждого клиента сдвинута по кругу: реплики разных потоков заканчиваются не одновременно
+    shift = len(pcm) // 2 // count * 2
+    streams = [pcm[i * shift:] + pcm[:i * shift] for i in range(count)]
+    results = await asyncio.gather(*[replay(url, stream, args) for stream in streams])
+    elapsed = time.perf_counter() - started
+    rejected = sum(1 for result in results if result["rejected"])
+    accepted = [result for result in results if not result["rejected"]]
+    client = [line["client"] for result in accepted for line in result["lines"]]
+    server = [line["server"] for result in accepted for line in result["lines"]]
+    return {
+        "streams": count,
+        "rejected": rejected,
+        "wall_seconds": round(elapsed, 3),
+        "lines_per_stream": round(sum(len(result["lines"]) for result in accepted) / max(len(accepted), 1), 1),
+        "speakers_found": sorted({result["finished"]["speakers"] for result in accepted if result["finished"]}),
+        "task_ids": [result["task_id"] for result in accepted],
+        "client_latency_seconds": summarize_latencies(client),
+        "server_latency_seconds": summarize_latencies(server),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=120, help="Длительность записи, секунды")
+    parser.add_argument("--streams", default="1,4,8,16", help="Число одновременных потоков")
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--speed", type=float, default=1.0, help="Ускорение воспроизведения относительно записи")
+    parser.add_argument("--asr-rtf", type=float, default=0.05)
+    parser.add_argument("--embedding-rtf", type=float, default=0.01)
+    parser.add_argument("--inference-workers", type=int, default=1)
+    parser.add_argument("--max-sessions", type=int, default=0, help="Лимит сессий (по умолчанию без отказов)")
+    parser.add_argument("--latency-budget", type=float, default=2.0, help="Допустимая p95 задержка строки, секунды")
+    parser.add_argument("--output", default="bench_streaming.json")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GIGAAM_MODEL_NAME", "stub")
+    os.environ.setdefault("WHISPER_MODEL_NAME", "stub")
+    from config import load_streaming_config, load_transcription_config
+    from streaming import StreamingSession
+    from stub_models import StubSpeakerEmbeddingModule, StubTranscriptionModule, synthesize_dialogue
+
+    streams = [int(value) for value in args.streams.split(",")]
+    stream_sessions = import_service_module("stream_sessions")
+    service_config = import_service_module("settings").StreamSessionConfig(
+        MAX_SESSIONS=args.max_sessions or max(streams), INFERENCE_WORKERS=args.inference_workers,
+    )
+    streaming_config = load_streaming_config()
+    transcription_config = load_transcription_config("ru")
+
+    def session_factory(language, num_speakers):
+        return StreamingSession(
+            StubTranscriptionModule(transcription_config, args.asr_rtf),
+            StubSpeakerEmbeddingModule(args.embedding_rtf),
+            streaming_config,
+            num_speakers,
+        )
+
+    manager = stream_sessions.StreamSessionManager(service_config, session_factory)
+    app, stream_service, sent = build_app(manager)
+    port = free_port()
+    server = start_server(app, port)
+
+    with tempfile.TemporaryDirectory(prefix="bench_streaming_") as workdir:
+        path = synthesize_dialogue(os.path.join(workdir, "dialogue.wav"), args.duration, args.speakers)
+        with wave.open(path, "rb") as f:
+            pcm = f.readframes(f.getnframes())
+
+    scenarios = []
+    for count in streams:
+        scenarios.append(asyncio.run(run_streams(port, pcm, count, args)))
+        check_streams(stream_service, sent, scenarios[-1].pop("task_ids"))
+        print(json.dumps(scenarios[-1]))
+    server.should_exit = True
+
+    within_budget = [
+        run["streams"] for run in scenarios
+        if not run["rejected"] and run["client_latency_seconds"]["p95"] is not None
+        and run["client_latency_seconds"]["p95"] <= args.latency_budget
+    ]
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "parameters": vars(args),
+        "streaming_config": streaming_config.dict(exclude={"hf_token"}),
+        "scenarios": scenarios,
+        "max_streams_within_budget": max(within_budget) if within_budget else 0,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Max streams with p95 <= {args.latency_budget}s: {result['max_streams_within_budget']}")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
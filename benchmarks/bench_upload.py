@@ -0,0 +1,158 @@
+"""Нагрузочный замер загрузок: много параллельных клиентов против API с S3-стендом.
+
+Запуск (нужен Redis по REDIS_URL — API пишет статус и ставит задачу в очередь):
+    python benchmarks/bench_upload.py --clients 32 --size-mb 64
+    python benchmarks/bench_upload.py --backend local --endpoint multipart
+
+Скрипт поднимает moto-сервер как локальную замену S3 и API через uvicorn
+в отдельном процессе. Параллельно загрузкам опрашивается /status, и задержка
+этих запросов показывает, не блокируется ли цикл событий.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = "bench-uploads"
+
+
+def start_s3(port: int) -> str:
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    ThreadedMotoServer(port=port).start()
+    endpoint = f"http://127.0.0.1:{port}"
+    boto3.client(
+        "s3", endpoint_url=endpoint, region_name="us-east-1",
+        aws_access_key_id="bench", aws_secret_access_key="bench",
+    ).create_bucket(Bucket=BUCKET)
+    return endpoint
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_service:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.join(ROOT, "moduels"),
+        env={**os.environ, **env},
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await client.get("/status/ready")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+async def body(size: int, chunk_size: int):
+    chunk = os.urandom(chunk_size)
+    sent = 0
+    while sent < size:
+        yield chunk[:size - sent]
+        sent += len(chunk)
+
+
+async def upload(client: httpx.AsyncClient, endpoint: str, size: int, chunk_size: int) -> float:
+    started = time.perf_counter()
+    if endpoint == "stream":
+        response = await client.put(
+            "/upload/stream", params={"filename": "bench.wav"},
+            content=body(size, chunk_size), headers={"content-length": str(size)},
+        )
+    else:
+        response = await client.post("/upload/", files={"file": ("bench.wav", os.urandom(size))})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def poll_status(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/status/bench-missing")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def run(args, base_url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        await wait_ready(client)
+        size = args.size_mb * 1024 * 1024
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_status(client, stop))
+        started = time.perf_counter()
+        durations = await asyncio.gather(*[
+            upload(client, args.endpoint, size, args.chunk_kb * 1024) for _ in range(args.clients)
+        ])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        polls = await poller
+
+    return {
+        "clients": args.clients,
+        "size_mb": args.size_mb,
+        "backend": args.backend,
+        "endpoint": args.endpoint,
+        "total_seconds": round(elapsed, 3),
+        "throughput_mb_s": round(args.clients * args.size_mb / elapsed, 1),
+        "upload_p50_seconds": round(statistics.median(durations), 3),
+        "upload_p95_seconds": round(percentile(durations, 0.95), 3),
+        "status_p50_ms": round(percentile(polls, 0.5) * 1000, 1),
+        "status_p95_ms": round(percentile(polls, 0.95) * 1000, 1),
+        "status_max_ms": round(max(polls, default=0.0) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--backend", choices=["s3", "local"], default="s3")
+    parser.add_argument("--endpoint", choices=["stream", "multipart"], default="stream")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--s3-port", type=int, default=5055)
+    parser.add_argument("--part-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    env = {
+        "UPLOAD_BACKEND": args.backend,
+        "UPLOAD_PART_CONCURRENCY": str(args.part_concurrency),
+        "UPLOAD_LOCAL_DIR": os.path.join(ROOT, "benchmarks", ".uploads"),
+        "UPLOAD_MAX_SIZE_MB": str(args.size_mb + 1),
+        "S3_BUCKET_NAME": BUCKET,
+        "S3_ACCESS_KEY": "bench",
+        "S3_SECRET_KEY": "bench",
+        "S3_REGION": "us-east-1",
+    }
+    if args.backend == "s3":
+        env["S3_ENDPOINT_URL"] = start_s3(args.s3_port)
+
+    api = start_api(args.api_port, env)
+    try:
+        result = asyncio.run(run(args, f"http://127.0.0.1:{args.api_port}"))
+    finally:
+        api.terminate()
+        api.wait()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
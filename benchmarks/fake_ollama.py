@@ -0,0 +1,139 @@
+"""Локальный фейковый сервер Ollama (/api/generate) и OpenAI (/v1/chat/completions).
+
+Запуск:
+    python benchmarks/fake_ollama.py --port 11435 --token-delay 0.01 --fail-rate 0.1
+
+Отвечает фиксированным текстом из --tokens токенов с задержкой --token-delay
+на токен, поддерживает "stream": true и keep-alive (HTTP/1.1). Доля запросов
+--fail-rate завершается ответом 503, чтобы проверять повторы клиента;
+первые --fail-first запросов завершаются им всегда. Сервер запоминает
+тела запросов (payloads) и наибольшее число одновременных (max_active).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    tokens = 50
+    token_delay = 0.01
+    first_token_delay = 0.05
+    fail_rate = 0.0
+    fail_first = 0
+    connections = set()
+    payloads = []
+    requests = 0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        handler = type(self)
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.lock:
+            self.connections.add(self.client_address)
+            self.payloads.append(payload)
+            handler.requests += 1
+            failed = handler.requests <= self.fail_first or random.random() < self.fail_rate
+            if not failed:
+                handler.active += 1
+                handler.max_active = max(handler.max_active, handler.active)
+        if failed:
+            self.send_json(503, {"error": "overloaded"})
+            return
+        try:
+            self.respond(payload)
+        finally:
+            with self.lock:
+                handler.active -= 1
+
+    def respond(self, payload: dict):
+        words = [f"слово{i} " for i in range(self.tokens)]
+        openai = self.path.startswith("/v1/")
+        structured = "format" in payload or "response_format" in payload
+        time.sleep(self.first_token_delay)
+
+        if not payload.get("stream") or structured:
+            time.sleep(self.token_delay * self.tokens)
+            text = "".join(words)
+            if structured:
+                text = json.dumps({"summary": text}, ensure_ascii=False)
+            if openai:
+                self.send_json(200, {"choices": [{"message": {"role": "assistant", "content": text}}]})
+            else:
+                self.send_json(200, {"response": text, "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if openai else "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in words:
+            if openai:
+                line = "data: " + json.dumps({"choices": [{"delta": {"content": word}}]}, ensure_ascii=False) + "\n\n"
+            else:
+                line = json.dumps({"response": word, "done": False}, ensure_ascii=False) + "\n"
+            self.write_chunk(line)
+            time.sleep(self.token_delay)
+        self.write_chunk("data: [DONE]\n\n" if openai else json.dumps({"response": "", "done": True}) + "\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port: int = 0, tokens: int = 50, token_delay: float = 0.01,
+                 first_token_delay: float = 0.05, fail_rate: float = 0.0, fail_first: int = 0) -> ThreadingHTTPServer:
+    """Запускает сервер в фоновом потоке; фактический порт — server.server_address[1]."""
+    handler = type("Handler", (FakeLLMHandler,), {
+        "tokens": tokens,
+        "token_delay": token_delay,
+        "first_token_delay": first_token_delay,
+        "fail_rate": fail_rate,
+        "fail_first": fail_first,
+        "connections": set(),
+        "payloads": [],
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.tokens, args.token_delay, args.first_token_delay, args.fail_rate, args.fail_first)
+    print(f"Fake LLM listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
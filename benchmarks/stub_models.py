@@ -0,0 +1,153 @@
+"""Синтетические диалоги и лёгкие CPU-заглушки моделей для замеров пайплайна.
+
+Аудио: говорящие чередуются репликами по 2-8 секунд, у каждого свой тон
+с огибающей слогов, между репликами — паузы с шумом. Заглушки находят речь
+по энергии кадров, «распознают» её словами из словаря, а говорящего
+определяют по доминирующей частоте реплики. Параметр rtf добавляет ожидание
+длительность * rtf, имитируя инференс модели (без удержания GIL, как у GPU).
+"""
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "summarization_pipeline"))
+
+from file_ingestion_module import PreprocessedAudio, load_audio
+from transcription_module import TranscriptionModule
+from segments import Segments, factorize, merge_intervals
+
+SAMPLE_RATE = 16000
+SPEAKER_TONES = [150.0, 250.0, 350.0, 450.0, 550.0, 650.0]
+TONE_BIN_HZ = 100.0
+FRAME = 480
+ENERGY_THRESHOLD = 0.02
+MIN_GAP_SECONDS = 0.2
+VOCABULARY = (
+    "ну вот значит мы обсудили сроки релиза и задачи команды по проекту "
+    "нужно проверить отчёт согласовать бюджет подготовить презентацию к пятнице"
+).split()
+
+
+def synthesize_dialogue(path: str, duration: float, speakers: int = 3, seed: int = 0) -> str:
+    """Пишет 16 кГц моно WAV заданной длительности блоками, не держа файл в памяти."""
+    rng = np.random.default_rng(seed)
+    total = int(duration * SAMPLE_RATE)
+    written = 0
+    previous = -1
+    with wave.open(path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        while written < total:
+            speaker = int(rng.integers(speakers - 1))
+            speaker = speaker + 1 if speaker >= previous >= 0 else speaker
+            previous = speaker
+            turn = int(rng.uniform(2, 8) * SAMPLE_RATE)
+            pause = int(rng.uniform(0.3, 1.0) * SAMPLE_RATE)
+            t = np.arange(turn) / SAMPLE_RATE
+            # Огибающая слогов ~4 Гц не опускается до нуля, чтобы реплика не рвалась на части
+            voice = 0.3 * (0.7 + 0.3 * np.sin(2 * np.pi * 4 * t)) * np.sin(2 * np.pi * SPEAKER_TONES[speaker] * t)
+            block = np.concatenate([voice, 0.003 * rng.standard_normal(pause)])[:total - written]
+            out.writeframes((block * 32767).astype(np.int16).tobytes())
+            written += len(block)
+    return path
+
+
+def detect_speech(audio: PreprocessedAudio) -> Segments:
+    """Энергетический VAD по кадрам 30 мс; близкие участки сливаются."""
+    waveform = audio.waveform
+    frames = len(waveform) // FRAME
+    energy = np.sqrt(np.mean(np.square(waveform[:frames * FRAME].reshape(frames, FRAME)), axis=1))
+    voiced = np.concatenate([[False], energy > ENERGY_THRESHOLD, [False]])
+    edges = np.flatnonzero(np.diff(voiced.astype(np.int8)))
+    starts = edges[0::2] * FRAME / audio.sample_rate
+    ends = edges[1::2] * FRAME / audio.sample_rate
+    starts, ends = merge_intervals(starts - MIN_GAP_SECONDS / 2, ends + MIN_GAP_SECONDS / 2)
+    return Segments(np.maximum(starts + MIN_GAP_SECONDS / 2, 0), ends - MIN_GAP_SECONDS / 2)
+
+
+def dominant_tone(audio: PreprocessedAudio, start: float, end: float) -> int:
+    sr = audio.sample_rate
+    middle = (start + end) / 2
+    window = audio.waveform[int((middle - 0.25) * sr):int((middle + 0.25) * sr)]
+    if len(window) == 0:
+        return 0
+    spectrum = np.abs(np.fft.rfft(window))
+    return int(np.argmax(spectrum) * sr / len(window) // TONE_BIN_HZ)
+
+
+def simulate_inference(duration: float, rtf: float) -> None:
+    if rtf > 0:
+        time.sleep(duration * rtf)
+
+
+class StubTranscriptionModule(TranscriptionModule):
+    def __init__(self, config, rtf: float = 0.0):
+        self.config = config
+        self.rtf = rtf
+
+    def transcribe(self, audio: PreprocessedAudio | str, speech_timeline: Segments | None = None) -> Segments:
+        audio = load_audio(audio)
+        speech = speech_timeline if speech_timeline is not None else detect_speech(audio)
+        simulate_inference(audio.duration, self.rtf)
+        records = []
+        for start, end in zip(speech.start.tolist(), speech.end.tolist()):
+            count = max(1, int((end - start) * 2.5))
+            offset = int(start * 10)
+            words = [VOCABULARY[(offset + i) % len(VOCABULARY)] for i in range(count)]
+            step = (end - start) / count
+            records.append({
+                "start": start,
+                "end": end,
+                "transcription": " ".join(words),
+                "words": [{"start": start + i * step, "end": start + (i + 1) * step, "word": word} for i, word in enumerate(words)],
+            })
+        return self.format_transcription(records)
+
+    def format_transcription(self, transcription_segments: list[dict]) -> Segments:
+        segments = Segments.from_records(transcription_segments)
+        if not self.config.word_timestamps:
+            segments.words = None
+        return segments
+
+
+class StubDiarizationModule:
+    """Диаризация по тону реплики; эмбеддинг говорящего — one-hot его частотной полосы."""
+
+    def __init__(self, config, rtf: float = 0.0):
+        self.config = config
+        self.rtf = rtf
+
+    def diarize(self, audio: PreprocessedAudio | str, num_speakers: int | None = None) -> Segments:
+        return self.diarize_with_embeddings(audio, num_speakers)[0]
+
+    def diarize_with_embeddings(self, audio: PreprocessedAudio | str, num_speakers: int | None = None) -> tuple[Segments, dict]:
+        audio = load_audio(audio)
+        speech = detect_speech(audio)
+        simulate_inference(audio.duration, self.rtf)
+        tones = [dominant_tone(audio, start, end) for start, end in zip(speech.start.tolist(), speech.end.tolist())]
+        labels, codes = factorize(tones)
+        speakers = [f"SPEAKER_{code:02d}" for code in codes.tolist()]
+        embeddings = {}
+        for code, tone in enumerate(labels):
+            vector = np.zeros(16)
+            vector[min(tone, 15)] = 1.0
+            embeddings[f"SPEAKER_{code:02d}"] = vector.tolist()
+        return speech.with_speakers(speakers), embeddings
+
+
+class StubSpeakerEmbeddingModule:
+    """Эмбеддинг фрагмента для потокового режима: one-hot полосы доминирующего тона."""
+
+    def __init__(self, rtf: float = 0.0):
+        self.rtf = rtf
+
+    def embed(self, audio: PreprocessedAudio) -> np.ndarray:
+        simulate_inference(audio.duration, self.rtf)
+        vector = np.zeros(16, dtype=np.float32)
+        vector[min(dominant_tone(audio, 0.0, audio.duration), 15)] = 1.0
+        return vector
@@ -0,0 +1,175 @@
+import json
+import math
+import os
+import struct
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import redis
+
+from settings import AdmissionConfig
+
+# Приоритеты Redis-брокера Celery: 0 — самый высокий
+PRIORITY_STEPS = [0, 3, 6, 9]
+PRIORITY_SEP = "\x06\x16"
+# Задача, не освобождённая за это время (упавший воркер), перестаёт учитываться
+STALE_SECONDS = 86400
+
+
+def probe_wav_duration(header: bytes, total_size: int) -> Optional[float]:
+    """Длительность WAV по чанкам fmt и data в начале файла."""
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    byte_rate = None
+    position = 12
+    while position + 8 <= len(header):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", header, position)
+        body = position + 8
+        if chunk_id == b"fmt " and body + 12 <= len(header):
+            byte_rate = struct.unpack_from("<I", header, body + 8)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Размер data бывает 0 или 0xFFFFFFFF у потоковых WAV — тогда по размеру файла
+            data_size = total_size - body if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, total_size - body)
+            return data_size / byte_rate
+        position = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def probe_ffprobe_duration(header: bytes, total_size: int) -> Optional[float]:
+    """Длительность по битрейту из заголовка через ffprobe, без декодирования всего файла."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration,bit_rate", "-of", "json", "-i", "pipe:0"],
+            input=header, capture_output=True, timeout=10,
+        )
+        info = json.loads(result.stdout or b"{}").get("format", {})
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return None
+    # ffprobe видит только заголовок, поэтому его duration верна, лишь если прочитан весь файл
+    if len(header) >= total_size and info.get("duration") not in (None, "N/A"):
+        return float(info["duration"])
+    if info.get("bit_rate") not in (None, "N/A") and float(info["bit_rate"]) > 0:
+        return total_size * 8 / float(info["bit_rate"])
+    return None
+
+
+def probe_duration(header: bytes, total_size: int, fallback_bytes_per_second: int) -> Dict:
+    """Оценка длительности загрузки по первым байтам и полному размеру.
+
+    Returns:
+        dict: {"duration": секунды, "method": wav | ffprobe | size}
+    """
+    for method, probe in (("wav", probe_wav_duration), ("ffprobe", probe_ffprobe_duration)):
+        duration = probe(header, total_size)
+        if duration is not None:
+            return {"duration": duration, "method": method}
+    return {"duration": total_size / fallback_bytes_per_second, "method": "size"}
+
+
+class AdmissionController:
+    """Допуск загрузок по оценённому объёму работы в очереди.
+
+    Оценка работы каждой принятой задачи хранится в Redis-хэше до её
+    завершения, так что сумма видна всем процессам API. Задача, которая
+    не помещается под MAX_BACKLOG_SECONDS, получает отказ с временем,
+    через которое очередь должна освободиться.
+    """
+
+    def __init__(self, config: AdmissionConfig, redis_client=None):
+        self.config = config
+        self.redis_client = redis_client or redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        self.backlog_key = "admission:backlog"
+        self.priority_bounds = [float(bound) for bound in config.PRIORITY_BOUNDS.split(",") if bound.strip()]
+
+    def estimate_work(self, duration: float) -> float:
+        return duration * self.config.REALTIME_FACTOR + self.config.TASK_OVERHEAD_SECONDS
+
+    def priority(self, duration: float) -> int:
+        for step, bound in zip(PRIORITY_STEPS, self.priority_bounds):
+            if duration <= bound:
+                return step
+        return PRIORITY_STEPS[min(len(self.priority_bounds), len(PRIORITY_STEPS) - 1)]
+
+    def drain_seconds(self, work: float) -> int:
+        return math.ceil(work / max(self.config.WORKER_CAPACITY, 1))
+
+    def backlog(self, entries: Dict) -> float:
+        """Сумма работы по записям хэша; зависшие записи удаляются."""
+        now = time.time()
+        total = 0.0
+        stale = []
+        for task_id, value in entries.items():
+            entry = json.loads(value)
+            if now - entry["admitted_at"] > STALE_SECONDS:
+                stale.append(task_id)
+            else:
+                total += entry["work"]
+        if stale:
+            self.redis_client.hdel(self.backlog_key, *stale)
+        return total
+
+    def retry_after(self, backlog: float, work: float) -> int:
+        # Через сколько секунд очередь разберётся настолько, что задача поместится
+        excess = backlog + work - self.config.MAX_BACKLOG_SECONDS
+        return max(1, self.drain_seconds(excess))
+
+    def check(self) -> Optional[int]:
+        """Быстрая проверка до приёма тела: Retry-After, если очередь уже заполнена."""
+        if not self.config.ENABLED:
+            return None
+        backlog = self.backlog(self.redis_client.hgetall(self.backlog_key))
+        if backlog < self.config.MAX_BACKLOG_SECONDS:
+            return None
+        return self.retry_after(backlog, 0)
+
+    def admit(self, task_id: str, duration: float) -> Dict:
+        """Резервирует работу задачи в очереди.
+
+        Returns:
+            dict: admitted, priority, work, retry_after (при отказе)
+        """
+        work = self.estimate_work(duration)
+        decision = {"admitted": True, "priority": self.priority(duration), "work": work}
+        if not self.config.ENABLED:
+            return decision
+        # Сначала резервируем, потом проверяем сумму: параллельные загрузки не проскочат предел вместе
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.backlog_key, task_id, json.dumps({"work": work, "duration": duration, "admitted_at": time.time()}))
+        pipe.hgetall(self.backlog_key)
+        backlog = self.backlog(pipe.execute()[-1])
+        # Одиночная задача больше предела принимается в пустую очередь, иначе её не принять никогда
+        if backlog > self.config.MAX_BACKLOG_SECONDS and backlog > work:
+            self.release(task_id)
+            decision.update(admitted=False, retry_after=self.retry_after(backlog - work, work))
+        return decision
+
+    def release(self, task_id: str) -> None:
+        self.redis_client.hdel(self.backlog_key, task_id)
+
+    def queue_lengths(self, queues: List[str]) -> Dict[str, int]:
+        """Число сообщений в очередях Celery с учётом подочередей приоритетов."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for queue in queues:
+            for step in PRIORITY_STEPS:
+                pipe.llen(queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}")
+        lengths = pipe.execute()
+        per_queue = len(PRIORITY_STEPS)
+        return {queue: sum(lengths[i * per_queue:(i + 1) * per_queue]) for i, queue in enumerate(queues)}
+
+    def snapshot(self, queues: List[str]) -> Dict:
+        entries = self.redis_client.hgetall(self.backlog_key)
+        backlog = self.backlog(entries)
+        return {
+            "admission_enabled": self.config.ENABLED,
+            "pending_tasks": len(entries),
+            "backlog_seconds": round(backlog, 1),
+            "max_backlog_seconds": self.config.MAX_BACKLOG_SECONDS,
+            "estimated_drain_seconds": self.drain_seconds(backlog),
+            "queues": self.queue_lengths(queues),
+        }
+
+
+admission_controller = AdmissionController(AdmissionConfig())
@@ -1,56 +1,231 @@
-from fastapi import FastAPI, UploadFile, HTTPException, FileResponse, Query
-from tasks import process_audio_task
+from fastapi import FastAPI, UploadFile, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from celery_app import celery_app, PROCESS_AUDIO_TASK, QUEUES
+import asyncio
+import json
+import time
 import uuid
-import shutil
 import os
-from typing import Dict, Literal
+from typing import Dict, List, Literal
+from pydantic import BaseModel
 
+from admission import admission_controller, probe_duration
+from metrics import metrics_payload, observe_request
 from s3_storage import s3_storage
 from status_tracker import status_tracker
+from status_events import status_event_hub
+from upload_storage import upload_storage, UploadTooLarge
 
 app = FastAPI()
 
-@app.post("/upload/")
-async def upload_audio(
-    file: UploadFile,
-    num_speakers: int | None = Query(None, description="Expected number of speakers in the audio"),
-    language: str | None = Query(None, description="Language of the audio file")
-) -> Dict[str, str]:
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Шаблон маршрута, а не путь: task_id не должен порождать новые ряды метрики
+    route = request.scope.get("route")
+    observe_request(request.method, route.path if route else "unmatched", response.status_code, time.perf_counter() - started)
+    return response
+
+MAX_STATUS_BATCH = 1000
+
+
+class StatusBatchRequest(BaseModel):
+    task_ids: List[str]
+
+
+async def read_upload_file(file: UploadFile):
+    while chunk := await file.read(upload_storage.chunk_size):
+        yield chunk
+
+
+def too_busy(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Processing queue is full, retry later",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def read_head(chunks, limit: int) -> list[bytes]:
+    """Читает из потока куски, пока не наберётся limit байт; остальное тело не трогается."""
+    head = []
+    size = 0
+    while size < limit:
+        try:
+            chunk = await anext(chunks)
+        except StopAsyncIteration:
+            break
+        head.append(chunk)
+        size += len(chunk)
+    return head
+
+
+async def prepend(head: list[bytes], chunks):
+    for chunk in head:
+        yield chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+async def admit_upload(task_id: str, header: bytes, size: int) -> tuple[Dict, Dict]:
+    """Длительность по заголовку, без декодирования файла; по ней — допуск и приоритет."""
+    probe = await asyncio.to_thread(
+        probe_duration, header, size, admission_controller.config.FALLBACK_BYTES_PER_SECOND
+    )
+    return probe, await asyncio.to_thread(admission_controller.admit, task_id, probe["duration"])
+
+
+async def start_processing(chunks, filename: str, content_length: str | None, num_speakers: int | None, language: str | None, profile: bool = False) -> Dict[str, str]:
+    if content_length and int(content_length) > upload_storage.max_size:
+        raise HTTPException(status_code=413, detail="File is too large")
+    # Очередь уже заполнена — отказываем до приёма тела
+    retry_after = await asyncio.to_thread(admission_controller.check)
+    if retry_after is not None:
+        raise too_busy(retry_after)
+
     task_id = str(uuid.uuid4())
-    
-    # Create uploads directory if it doesn't exist
-    os.makedirs("uploads", exist_ok=True)
-    
-    # Save file locally
-    filepath = f"uploads/{task_id}_{file.filename}"
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+    filename = os.path.basename(filename or "audio")
+    probe_bytes = admission_controller.config.PROBE_BYTES
+    head = await read_head(chunks, probe_bytes)
+    header = b"".join(head)[:probe_bytes]
+    probe = decision = None
+    if content_length:
+        # Размер известен заранее: допуск решается до приёма остального тела
+        probe, decision = await admit_upload(task_id, header, int(content_length))
+        if not decision["admitted"]:
+            raise too_busy(decision["retry_after"])
+    try:
+        # Тело пишется в хранилище потоком, хэш для кэша артефактов считается на лету
+        reference, audio_hash, size = await upload_storage.receive(prepend(head, chunks), f"{task_id}_{filename}")
+    except BaseException as e:
+        if decision is not None:
+            await asyncio.to_thread(admission_controller.release, task_id)
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=str(e))
+        raise
+
+    if decision is None:
+        # Без Content-Length (chunked) размер известен только после приёма
+        probe, decision = await admit_upload(task_id, header, size)
+        if not decision["admitted"]:
+            await asyncio.to_thread(upload_storage.delete, reference)
+            raise too_busy(decision["retry_after"])
+
     # Set initial status
-    status_tracker.set_status(task_id, "uploaded", {"filename": file.filename})
-    
-    # Start processing task
-    process_audio_task.delay(filepath, task_id, num_speakers, language)
-    
+    await asyncio.to_thread(status_tracker.set_status, task_id, "uploaded", {
+        "filename": filename,
+        "estimated_duration": round(probe["duration"], 1),
+        "priority": decision["priority"],
+    })
+
+    # Start processing task: по имени, без импорта пайплайна в процесс API
+    await asyncio.to_thread(
+        celery_app.send_task,
+        PROCESS_AUDIO_TASK,
+        (reference, task_id, num_speakers, language, audio_hash, decision["priority"], profile),
+        priority=decision["priority"],
+    )
+
     return {
         "task_id": task_id,
         "status": "processing",
         "message": "File uploaded successfully, processing started"
     }
 
+@app.post("/upload/")
+async def upload_audio(
+    request: Request,
+    file: UploadFile,
+    num_speakers: int | None = Query(None, description="Expected number of speakers in the audio"),
+    language: str | None = Query(None, description="Language of the audio file"),
+    profile: bool = Query(False, description="Dump a profile of every pipeline stage")
+) -> Dict[str, str]:
+    return await start_processing(
+        read_upload_file(file), file.filename, request.headers.get("content-length"), num_speakers, language, profile
+    )
+
+@app.put("/upload/stream")
+async def upload_audio_stream(
+    request: Request,
+    filename: str = Query(..., description="Original file name"),
+    num_speakers: int | None = Query(None, description="Expected number of speakers in the audio"),
+    language: str | None = Query(None, description="Language of the audio file"),
+    profile: bool = Query(False, description="Dump a profile of every pipeline stage")
+) -> Dict[str, str]:
+    """Загрузка сырым телом запроса: без multipart-разбора и временного файла на API."""
+    return await start_processing(
+        request.stream(), filename, request.headers.get("content-length"), num_speakers, language, profile
+    )
+
 @app.get("/status/{task_id}")
 async def get_status(task_id: str) -> Dict:
-    status_data = status_tracker.get_status(task_id)
+    status_data = await asyncio.to_thread(status_tracker.get_status, task_id)
     if not status_data:
         raise HTTPException(status_code=404, detail="Task not found")
     return status_data
 
+@app.get("/queue")
+async def get_queue() -> Dict:
+    """Оценённая работа в очереди, время её разбора и длины очередей Celery."""
+    return await asyncio.to_thread(admission_controller.snapshot, QUEUES)
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """Метрики Prometheus процесса API (с PROMETHEUS_MULTIPROC_DIR — всех процессов)."""
+    payload = metrics_payload()
+    if payload is None:
+        raise HTTPException(status_code=503, detail="prometheus_client is not installed")
+    body, content_type = payload
+    return Response(content=body, media_type=content_type)
+
+@app.post("/status/batch")
+async def get_status_batch(request: StatusBatchRequest) -> Dict:
+    """Статусы многих задач за один проход до Redis; неизвестные задачи — null."""
+    if len(request.task_ids) > MAX_STATUS_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_BATCH} task ids per request")
+    return {"statuses": await asyncio.to_thread(status_tracker.get_many, request.task_ids)}
+
+def task_events(task_id: str):
+    return status_event_hub.events(task_id, lambda: asyncio.to_thread(status_tracker.get_status, task_id))
+
+@app.get("/status/{task_id}/events")
+async def stream_status(task_id: str) -> StreamingResponse:
+    """Server-Sent Events: снимок статуса, затем переходы, тайминги стадий и частичные результаты."""
+    if await asyncio.to_thread(status_tracker.get_status, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def stream():
+        async for event in task_events(task_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/status/{task_id}/ws")
+async def status_websocket(websocket: WebSocket, task_id: str):
+    await websocket.accept()
+    # Как 404 у SSE: иначе неизвестная задача держала бы сокет одними heartbeat
+    if await asyncio.to_thread(status_tracker.get_status, task_id) is None:
+        await websocket.close(code=4404, reason="Task not found")
+        return
+    try:
+        async for event in task_events(task_id):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
 @app.get("/download/{task_id}")
 async def get_download_link(
     task_id: str,
     format: Literal["md", "txt"] = Query("txt", description="Format of the summary file")
 ) -> Dict:
-    status_data = status_tracker.get_status(task_id)
+    status_data = await asyncio.to_thread(status_tracker.get_status, task_id)
     if not status_data:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -69,13 +244,14 @@ async def get_download_link(
             detail=f"Download link not found for format: {format}"
         )
     
-    # Generate presigned URL
-    download_url = s3_storage.get_download_url(s3_key)
-    if not download_url:
+    # Generate presigned URL (reused until shortly before it expires)
+    link = await s3_storage.aget_download_link(s3_key)
+    if not link:
         raise HTTPException(status_code=500, detail="Failed to generate download URL")
-    
+    download_url, expires_at = link
+
     return {
         "download_url": download_url,
         "format": format,
-        "expires_in": "1 hour"
-    }
\ No newline at end of file
+        "expires_in": int(expires_at - time.time())
+    }
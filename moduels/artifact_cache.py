@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+from settings import CacheConfig, StorageConfig
+
+TMP_SUFFIX = ".tmp"
+# Доля MAX_SIZE_MB, после записи которой вытеснение запускается раньше интервала
+EVICT_WRITE_FRACTION = 0.1
+
+
+def make_cache_key(stage: str, parts: Dict) -> str:
+    """Ключ кэша: стадия + хэш от всех параметров, влияющих на её результат."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{stage}/{digest}"
+
+
+class LocalCacheBackend:
+    """Кэш в локальной директории с вытеснением по TTL и общему размеру (LRU по mtime).
+
+    Директорию делят несколько воркеров: запись может исчезнуть между
+    проверкой и чтением, а чужие временные файлы недописанных записей не трогаются.
+    """
+
+    def __init__(self, root_dir: str, max_size_mb: float, ttl_seconds: int, evict_interval_seconds: float = 60):
+        self.root_dir = root_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.ttl_seconds = ttl_seconds
+        self.evict_interval_seconds = evict_interval_seconds
+        self._last_evict = 0.0
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            # Обновляем mtime, чтобы часто используемые записи вытеснялись последними
+            os.utime(path)
+        except FileNotFoundError:
+            # Запись вытеснил другой воркер: это промах, а не ошибка стадии
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Своё имя временного файла у каждой записи: параллельные put одного ключа не мешают друг другу
+        tmp_path = f"{path}.{uuid.uuid4().hex}{TMP_SUFFIX}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._written += len(data)
+            due = (
+                time.monotonic() - self._last_evict >= self.evict_interval_seconds
+                or self._written >= self.max_size * EVICT_WRITE_FRACTION
+            )
+            if due:
+                self._last_evict = time.monotonic()
+                self._written = 0
+        if due:
+            self.evict()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        entries = []
+        now = time.time()
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    # Устаревшая запись или временный файл упавшего процесса
+                    self._remove(path)
+                elif not filename.endswith(TMP_SUFFIX):
+                    # Недописанные записи других воркеров не вытесняются
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+
+class S3CacheBackend:
+    """Кэш в существующем бакете S3. Записи старше TTL считаются промахом;
+    для удаления по размеру стоит настроить lifecycle-правило на префикс."""
+
+    def __init__(self, s3_client, bucket_name: str, prefix: str, ttl_seconds: int):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.prefix + key)
+        except ClientError:
+            return None
+        if time.time() - response["LastModified"].timestamp() > self.ttl_seconds:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.prefix + key)
+            return None
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=self.prefix + key, Body=data)
+
+
+class ArtifactCache:
+    """Кэш результатов стадий по хэшу аудио и конфигурации стадии.
+
+    Повторная загрузка той же записи или пересуммаризация с другим промптом
+    переиспользует уже посчитанные стадии.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        if self.backend is None:
+            return None
+        return self.backend.get(key)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        if self.backend is not None:
+            self.backend.put(key, data)
+
+    def get_text(self, key: str) -> Optional[str]:
+        data = self.get_bytes(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_text(self, key: str, text: str) -> None:
+        self.put_bytes(key, text.encode("utf-8"))
+
+
+def create_artifact_cache(config: CacheConfig) -> ArtifactCache:
+    if config.BACKEND == "local":
+        return ArtifactCache(LocalCacheBackend(config.DIR, config.MAX_SIZE_MB, config.TTL_SECONDS, config.EVICT_INTERVAL_SECONDS))
+    if config.BACKEND == "s3":
+        from s3_storage import StorageManager, s3_storage
+        storage_config = StorageConfig()
+        if not storage_config.BUCKET_NAME:
+            raise ValueError("CACHE_BACKEND=s3 requires S3_BUCKET_NAME")
+        # Результаты могут храниться локально (STORAGE_BACKEND=local): тогда клиент S3 для кэша свой
+        storage = s3_storage if isinstance(s3_storage, StorageManager) else StorageManager(storage_config)
+        return ArtifactCache(S3CacheBackend(storage.s3_client, storage.bucket_name, config.PREFIX, config.TTL_SECONDS))
+    return ArtifactCache()
+
+
+artifact_cache = create_artifact_cache(CacheConfig())
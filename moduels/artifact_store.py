@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+from typing import Any, Dict
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class ArtifactStore:
+    """Промежуточные артефакты задач на общем для воркеров томе.
+
+    Между стадиями Celery передаются только пути к артефактам,
+    а не сами данные, чтобы не гонять их через Redis. Завершённые стадии
+    отмечаются в checkpoint.json, чтобы повтор задачи продолжал работу
+    с последней завершённой стадии.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def task_dir(self, task_id: str) -> str:
+        path = os.path.join(self.root_dir, task_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, task_id: str, name: str) -> str:
+        return os.path.join(self.task_dir(task_id), name)
+
+    def exists(self, task_id: str, name: str) -> bool:
+        return os.path.exists(os.path.join(self.root_dir, task_id, name))
+
+    def save_json(self, task_id: str, name: str, data: Any) -> str:
+        path = self.path(task_id, name)
+        # Пишем во временный файл, чтобы прерванная запись не оставила битый артефакт
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def load_json(self, path: str) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_text(self, task_id: str, name: str, text: str) -> str:
+        path = self.path(task_id, name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def load_text(self, path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def save_bytes(self, task_id: str, name: str, data: bytes) -> str:
+        path = self.path(task_id, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def save_checkpoint(self, task_id: str, stage: str, artifacts: Dict[str, str], metadata: Dict | None = None) -> None:
+        """Отмечает стадию завершённой вместе со ссылками на её артефакты."""
+        checkpoint = self.load_checkpoint(task_id)
+        checkpoint[stage] = {"artifacts": artifacts, "metadata": metadata or {}}
+        self.save_json(task_id, CHECKPOINT_FILE, checkpoint)
+
+    def load_checkpoint(self, task_id: str) -> Dict[str, Dict]:
+        """Завершённые стадии задачи: {стадия: {"artifacts": ..., "metadata": ...}}."""
+        if not self.exists(task_id, CHECKPOINT_FILE):
+            return {}
+        return self.load_json(self.path(task_id, CHECKPOINT_FILE))
+
+    def cleanup(self, task_id: str) -> None:
+        shutil.rmtree(os.path.join(self.root_dir, task_id), ignore_errors=True)
+
+
+artifact_store = ArtifactStore(os.getenv("ARTIFACT_DIR", "artifacts"))
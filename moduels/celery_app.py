@@ -0,0 +1,43 @@
+import os
+
+from celery import Celery
+
+from admission import PRIORITY_SEP, PRIORITY_STEPS
+
+# Приложение Celery без задач: API ставит задачи по имени, а сами задачи
+# и пайплайн с моделями загружает только воркер через tasks.py
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Очереди стадий: декодирование на CPU, модели ASR/диаризации, I/O (LLM и S3).
+# Каждый тип воркера запускается отдельно, например:
+#   celery -A tasks worker -Q asr --concurrency=1
+QUEUE_CPU = "cpu"
+QUEUE_ASR = "asr"
+QUEUE_IO = "io"
+QUEUES = [QUEUE_CPU, QUEUE_ASR, QUEUE_IO]
+
+# Точки входа для send_task
+PROCESS_AUDIO_TASK = "tasks.process_audio_task"
+PROCESS_STREAM_TASK = "tasks.process_stream_task"
+
+# Бэкенд результатов нужен для chord при шардировании длинных записей
+celery_app = Celery("audio_tasks", broker=REDIS_URL, backend=REDIS_URL)
+celery_app.conf.task_routes = {
+    PROCESS_AUDIO_TASK: {"queue": QUEUE_IO},
+    PROCESS_STREAM_TASK: {"queue": QUEUE_IO},
+    "tasks.preprocess_task": {"queue": QUEUE_CPU},
+    "tasks.analyze_task": {"queue": QUEUE_ASR},
+    "tasks.process_shard_task": {"queue": QUEUE_ASR},
+    "tasks.reduce_shards_task": {"queue": QUEUE_CPU},
+    "tasks.summarize_task": {"queue": QUEUE_IO},
+    "tasks.publish_task": {"queue": QUEUE_IO},
+}
+# Тяжёлые задачи не должны копиться в предвыборке одного воркера
+celery_app.conf.worker_prefetch_multiplier = 1
+celery_app.conf.task_acks_late = True
+# Приоритет задачи зависит от длительности записи: короткие обгоняют многочасовые в тех же очередях
+celery_app.conf.broker_transport_options = {
+    "queue_order_strategy": "priority",
+    "priority_steps": PRIORITY_STEPS,
+    "sep": PRIORITY_SEP,
+}
@@ -0,0 +1,50 @@
+import os
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Histogram, multiprocess
+except ImportError:  # без prometheus_client /metrics отвечает 503, воркер сервер не поднимает
+    prometheus_client = None
+
+if prometheus_client is not None:
+    REQUEST_SECONDS = Histogram(
+        "api_request_seconds", "Время обработки HTTP-запроса", ["method", "route", "status"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    )
+
+
+def metrics_registry():
+    """Реестр для выдачи метрик.
+
+    При PROMETHEUS_MULTIPROC_DIR метрики собираются из файлов всех процессов:
+    дочерних процессов prefork-воркера или нескольких воркеров uvicorn.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_payload() -> tuple[bytes, str] | None:
+    if prometheus_client is None:
+        return None
+    return prometheus_client.generate_latest(metrics_registry()), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> bool:
+    if prometheus_client is None:
+        return False
+    prometheus_client.start_http_server(port, registry=metrics_registry())
+    return True
+
+
+def mark_process_dead(pid: int) -> None:
+    # Живые gauge завершившегося процесса больше не учитываются
+    if prometheus_client is not None and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    if prometheus_client is not None:
+        REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
@@ -1,39 +1,262 @@
+import abc
+import asyncio
 import boto3
+import hashlib
+import io
+import mimetypes
 import os
+import shutil
+import threading
+import time
+import uuid
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 
+from settings import StorageConfig
 
 
-class StorageManager:
-    def __init__(self, config):
+def content_type(key: str) -> Optional[str]:
+    guessed, _ = mimetypes.guess_type(key)
+    if guessed and guessed.startswith("text/"):
+        return f"{guessed}; charset=utf-8"
+    return guessed
+
+
+class PresignedUrlCache:
+    """Ссылки на скачивание по (ключ, срок): выдаются повторно до refresh_margin секунд до истечения."""
+
+    def __init__(self, refresh_margin: int):
+        self.refresh_margin = refresh_margin
+        self.entries: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int]) -> Optional[Tuple[str, float]]:
+        entry = self.entries.get(key)
+        if entry is None or entry[1] - self.refresh_margin <= time.time():
+            return None
+        return entry
+
+    def put(self, key: Tuple[str, int], url: str, expires_at: float) -> None:
+        with self.lock:
+            now = time.time()
+            # Просроченные ссылки вычищаются при записи, чтобы кэш не рос бесконечно
+            self.entries = {k: v for k, v in self.entries.items() if v[1] > now}
+            self.entries[key] = (url, expires_at)
+
+
+class BaseStorageManager(abc.ABC):
+    """Общее для хранилищ результатов: пакетная запись, кэш ссылок, async-обёртки.
+
+    Наследники реализуют put_bytes и presign.
+    """
+
+    def __init__(self, config: StorageConfig):
+        self.config = config
+        self.url_cache = PresignedUrlCache(config.URL_REFRESH_MARGIN)
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.config.TRANSFER_CONCURRENCY, thread_name_prefix="storage")
+        return self._executor
+
+    @abc.abstractmethod
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """Записывает объект из памяти под ключом key."""
+
+    @abc.abstractmethod
+    def presign(self, key: str, expiration: int) -> str:
+        """Ссылка на скачивание объекта, действительная expiration секунд."""
+
+    def put_many(self, objects: Dict[str, bytes]) -> List[str]:
+        """Параллельно записывает объекты из памяти; тип содержимого — по расширению ключа."""
+        futures = [self.executor.submit(self.put_bytes, key, data, content_type(key)) for key, data in objects.items()]
+        for future in futures:
+            future.result()
+        return list(objects)
+
+    def get_download_link(self, key: str, expiration: Optional[int] = None) -> Optional[Tuple[str, float]]:
+        """Ссылка на скачивание и момент её истечения (unix time)."""
+        expiration = expiration or self.config.URL_EXPIRATION
+        cached = self.url_cache.get((key, expiration))
+        if cached is not None:
+            return cached
+        try:
+            expires_at = time.time() + expiration
+            url = self.presign(key, expiration)
+        except ClientError as e:
+            print(f"Error generating download URL: {e}")
+            return None
+        self.url_cache.put((key, expiration), url, expires_at)
+        return url, expires_at
+
+    def get_download_url(self, key: str, expiration: Optional[int] = None) -> Optional[str]:
+        link = self.get_download_link(key, expiration)
+        return link[0] if link else None
+
+    # Вызовы из обработчиков API: сетевые операции не блокируют цикл событий
+    async def aget_download_link(self, key: str, expiration: Optional[int] = None) -> Optional[Tuple[str, float]]:
+        return await asyncio.to_thread(self.get_download_link, key, expiration)
+
+    async def aput_many(self, objects: Dict[str, bytes]) -> List[str]:
+        return await asyncio.to_thread(self.put_many, objects)
+
+
+class StorageManager(BaseStorageManager):
+    def __init__(self, config: StorageConfig):
+        super().__init__(config)
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=config.ACCESS_KEY,
             aws_secret_access_key=config.SECRET_KEY,
-            region_name=config.REGION
+            region_name=config.REGION,
+            endpoint_url=config.ENDPOINT_URL,
+            # Соединений хватает и на параллельные объекты, и на части каждого из них
+            config=Config(max_pool_connections=max(10, config.TRANSFER_CONCURRENCY * 2))
         )
         self.bucket_name = config.BUCKET_NAME
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            max_concurrency=config.TRANSFER_CONCURRENCY,
+        )
 
     def upload_file(self, file_path: str, s3_key: str) -> bool:
         try:
-            self.s3_client.upload_file(file_path, self.bucket_name, s3_key)
+            self.s3_client.upload_file(file_path, self.bucket_name, s3_key, Config=self.transfer_config)
             return True
         except ClientError as e:
             print(f"Error uploading file to S3: {e}")
             return False
 
-    def get_download_url(self, s3_key: str, expiration: int = 3600) -> Optional[str]:
+    def put_bytes(self, s3_key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        # Небольшой объект — один PUT без накладных расходов менеджера передачи
+        if len(data) < self.transfer_config.multipart_threshold:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=data, **extra_args)
+            return
+        self.s3_client.upload_fileobj(
+            io.BytesIO(data), self.bucket_name, s3_key, ExtraArgs=extra_args, Config=self.transfer_config
+        )
+
+    def download_file(self, s3_key: str, file_path: str) -> None:
+        self.s3_client.download_file(self.bucket_name, s3_key, file_path, Config=self.transfer_config)
+
+    def delete_object(self, s3_key: str) -> None:
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+
+    def create_multipart_upload(self, s3_key: str) -> str:
+        response = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=s3_key)
+        return response["UploadId"]
+
+    def upload_part(self, s3_key: str, upload_id: str, part_number: int, data: bytes) -> Dict:
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: List[Dict]) -> None:
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])}
+        )
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+
+    def presign(self, s3_key: str, expiration: int) -> str:
+        return self.s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': s3_key},
+            ExpiresIn=expiration
+        )
+
+
+class LocalStorageManager(BaseStorageManager):
+    """Хранилище в локальной директории с тем же интерфейсом, что у StorageManager.
+
+    Для разработки и тестов без S3; ссылки на скачивание — file:// URI.
+    """
+
+    def __init__(self, config: StorageConfig):
+        super().__init__(config)
+        self.root = Path(config.LOCAL_DIR).resolve()
+        self.multipart_root = self.root / ".multipart"
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Key escapes storage root: {key}")
+        return path
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def upload_file(self, file_path: str, key: str) -> bool:
         try:
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': s3_key},
-                ExpiresIn=expiration
-            )
-            return url
-        except ClientError as e:
-            print(f"Error generating download URL: {e}")
-            return None
+            path = self.path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, path)
+            return True
+        except OSError as e:
+            print(f"Error uploading file to local storage: {e}")
+            return False
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        self.write(key, data)
+
+    def download_file(self, key: str, file_path: str) -> None:
+        shutil.copyfile(self.path(key), file_path)
+
+    def delete_object(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def create_multipart_upload(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        (self.multipart_root / upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> Dict:
+        (self.multipart_root / upload_id / f"{part_number:05d}").write_bytes(data)
+        return {"PartNumber": part_number, "ETag": hashlib.md5(data).hexdigest()}
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict]) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as out:
+            for part in sorted(parts, key=lambda part: part["PartNumber"]):
+                with open(self.multipart_root / upload_id / f"{part['PartNumber']:05d}", "rb") as f:
+                    shutil.copyfileobj(f, out)
+        self.abort_multipart_upload(key, upload_id)
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self.multipart_root / upload_id, ignore_errors=True)
+
+    def presign(self, key: str, expiration: int) -> str:
+        return self.path(key).as_uri()
+
+
+def create_storage(config: StorageConfig) -> BaseStorageManager:
+    if config.BACKEND == "local":
+        return LocalStorageManager(config)
+    if config.BACKEND == "s3":
+        return StorageManager(config)
+    raise ValueError(f"Unknown storage backend: {config.BACKEND}")
+
 
-# Initialize S3 storage with bucket name from environment variable
-s3_storage = StorageManager(os.getenv('S3_BUCKET_NAME', 'your-bucket-name')) 
\ No newline at end of file
+# Хранилище результатов из конфигурации окружения
+s3_storage = create_storage(StorageConfig())
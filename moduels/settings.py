@@ -0,0 +1,104 @@
+from pydantic import BaseSettings, Field
+
+
+class StorageConfig(BaseSettings):
+    BUCKET_NAME: str = Field(default="", env="S3_BUCKET_NAME")
+    ACCESS_KEY: str = Field(default="", env="S3_ACCESS_KEY")
+    SECRET_KEY: str = Field(default="", env="S3_SECRET_KEY")
+    REGION: str = Field(default="", env="S3_REGION")
+    # Для S3-совместимых хранилищ (MinIO, локальный стенд)
+    ENDPOINT_URL: str | None = Field(default=None, env="S3_ENDPOINT_URL")
+    # s3 | local: local хранит объекты в LOCAL_DIR (разработка, тесты)
+    BACKEND: str = Field(default="s3", env="STORAGE_BACKEND")
+    LOCAL_DIR: str = Field(default="storage", env="STORAGE_LOCAL_DIR")
+    # Параллельность передачи: объекты в put_many и части внутри одного объекта
+    TRANSFER_CONCURRENCY: int = Field(default=8, env="S3_TRANSFER_CONCURRENCY")
+    MULTIPART_THRESHOLD_MB: int = Field(default=8, env="S3_MULTIPART_THRESHOLD_MB")
+    # Срок жизни ссылки на скачивание; закэшированная ссылка обновляется за URL_REFRESH_MARGIN до истечения
+    URL_EXPIRATION: int = Field(default=3600, env="S3_URL_EXPIRATION")
+    URL_REFRESH_MARGIN: int = Field(default=300, env="S3_URL_REFRESH_MARGIN")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+class CacheConfig(BaseSettings):
+    # local | s3 | none
+    BACKEND: str = Field(default="local", env="CACHE_BACKEND")
+    DIR: str = Field(default="cache", env="CACHE_DIR")
+    PREFIX: str = Field(default="cache/", env="CACHE_S3_PREFIX")
+    MAX_SIZE_MB: float = Field(default=10240, env="CACHE_MAX_SIZE_MB")
+    TTL_SECONDS: int = Field(default=30 * 86400, env="CACHE_TTL_SECONDS")
+    # Обход директории для вытеснения — не чаще раза в интервал или после записи 10% MAX_SIZE_MB
+    EVICT_INTERVAL_SECONDS: float = Field(default=60, env="CACHE_EVICT_INTERVAL_SECONDS")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+class UploadConfig(BaseSettings):
+    # local | s3: куда потоково пишется загружаемое аудио
+    BACKEND: str = Field(default="local", env="UPLOAD_BACKEND")
+    LOCAL_DIR: str = Field(default="uploads", env="UPLOAD_LOCAL_DIR")
+    S3_PREFIX: str = Field(default="uploads/", env="UPLOAD_S3_PREFIX")
+    MAX_SIZE_MB: int = Field(default=2048, env="UPLOAD_MAX_SIZE_MB")
+    # Размер чтения тела запроса
+    CHUNK_SIZE_KB: int = Field(default=1024, env="UPLOAD_CHUNK_SIZE_KB")
+    # Размер части multipart-загрузки (минимум 5 МБ для S3) и число частей в полёте
+    PART_SIZE_MB: int = Field(default=8, env="UPLOAD_PART_SIZE_MB")
+    PART_CONCURRENCY: int = Field(default=4, env="UPLOAD_PART_CONCURRENCY")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+class AdmissionConfig(BaseSettings):
+    ENABLED: bool = Field(default=True, env="ADMISSION_ENABLED")
+    # Предел оценённой работы в очереди (секунды обработки); сверх него загрузки получают 429
+    MAX_BACKLOG_SECONDS: float = Field(default=4 * 3600, env="ADMISSION_MAX_BACKLOG_SECONDS")
+    # Секунды обработки на секунду аудио и постоянная часть на задачу (LLM, публикация)
+    REALTIME_FACTOR: float = Field(default=0.3, env="ADMISSION_REALTIME_FACTOR")
+    TASK_OVERHEAD_SECONDS: float = Field(default=30, env="ADMISSION_TASK_OVERHEAD_SECONDS")
+    # Сколько задач обрабатывается одновременно (ASR-воркеры), для оценки времени разбора очереди
+    WORKER_CAPACITY: int = Field(default=1, env="ADMISSION_WORKER_CAPACITY")
+    # Границы длительности (секунды) для приоритетов Celery 0, 3, 6, 9: короткие записи идут первыми
+    PRIORITY_BOUNDS: str = Field(default="300,1800,7200", env="ADMISSION_PRIORITY_BOUNDS")
+    # Сколько первых байт загрузки читается для оценки длительности
+    PROBE_BYTES: int = Field(default=256 * 1024, env="ADMISSION_PROBE_BYTES")
+    # Битрейт на случай, когда заголовок не разобрать (128 кбит/с)
+    FALLBACK_BYTES_PER_SECOND: int = Field(default=16000, env="ADMISSION_FALLBACK_BYTES_PER_SECOND")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+class MetricsConfig(BaseSettings):
+    # Порт HTTP-сервера метрик Prometheus в процессе воркера Celery; не задан — сервер не запускается
+    WORKER_PORT: int | None = Field(default=None, env="WORKER_METRICS_PORT")
+    # Профилировать каждую задачу; иначе только загруженные с profile=true
+    PROFILE_TASKS: bool = Field(default=False, env="PROFILE_TASKS")
+    PROFILE_DIR: str = Field(default="profiles", env="PROFILE_DIR")
+    # cprofile — .prof и текстовый топ функций, py-spy — flame graph всех потоков
+    PROFILE_MODE: str = Field(default="cprofile", env="PROFILE_MODE")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+class StreamSessionConfig(BaseSettings):
+    # Одновременных потоков на процесс stream_service; сверх лимита WebSocket закрывается с кодом 1013
+    MAX_SESSIONS: int = Field(default=4, env="STREAM_MAX_SESSIONS")
+    # Потоков инференса для фрагментов всех сессий (модели общие, на GPU — 1)
+    INFERENCE_WORKERS: int = Field(default=1, env="STREAM_INFERENCE_WORKERS")
+    # Поток без кадров дольше этого времени считается завершённым
+    IDLE_TIMEOUT_SECONDS: float = Field(default=30, env="STREAM_IDLE_TIMEOUT_SECONDS")
+    MAX_DURATION_SECONDS: float = Field(default=4 * 3600, env="STREAM_MAX_DURATION_SECONDS")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
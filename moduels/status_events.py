@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, Set
+
+import redis.asyncio as aioredis
+
+from status_tracker import TERMINAL_STATUSES
+
+HEARTBEAT_SECONDS = 15
+# Пауза перед переподпиской после обрыва Redis удваивается до максимума
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30
+# Внутреннее событие: подписчик перечитывает снимок (клиентам не отправляется)
+RESYNC = "resync"
+
+
+class StatusEventHub:
+    """Раздача событий статуса подписчикам API-процесса.
+
+    Одно pattern-подключение к Redis на процесс вместо подписки на каждого
+    клиента; события раскладываются по очередям подписчиков задачи.
+    Медленный подписчик теряет старейшие события, а не тормозит остальных.
+    """
+
+    def __init__(self, redis_client=None, channel_prefix: str = "task_events:", queue_size: int = 256):
+        self.redis_client = redis_client or aioredis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        self.channel_prefix = channel_prefix
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._reader is None or self._reader.done():
+                # Первая подписка оформляется до возврата: иначе подписчик может не увидеть ранние события
+                self._reader = asyncio.create_task(self._read(await self._psubscribe()))
+
+    async def _psubscribe(self):
+        pubsub = self.redis_client.pubsub()
+        await pubsub.psubscribe(f"{self.channel_prefix}*")
+        return pubsub
+
+    async def _read(self, pubsub) -> None:
+        """Читает события; при обрыве переподписывается с нарастающей паузой."""
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._psubscribe()
+                    delay = RECONNECT_MIN_SECONDS
+                    # События за время обрыва потеряны: подписчики перечитывают снимок
+                    for queues in self.subscribers.values():
+                        for queue in queues:
+                            self._put(queue, {"type": RESYNC})
+                async for message in pubsub.listen():
+                    self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Status events reader failed, reconnecting in {delay:.1f}s: {e}")
+            if pubsub is not None:
+                # aclose появился в redis 5, в redis 4 есть только reset
+                with contextlib.suppress(Exception):
+                    await getattr(pubsub, "aclose", pubsub.reset)()
+                pubsub = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _dispatch(self, message: dict) -> None:
+        if message["type"] != "pmessage":
+            return
+        channel = message["channel"]
+        channel = channel.decode() if isinstance(channel, bytes) else channel
+        queues = self.subscribers.get(channel[len(self.channel_prefix):])
+        if not queues:
+            return
+        event = json.loads(message["data"])
+        for queue in queues:
+            self._put(queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        await self.start()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers.get(task_id)
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[task_id]
+
+    async def events(self, task_id: str, load_snapshot: Callable[[], Awaitable[Dict | None]]) -> AsyncIterator[Dict | None]:
+        """Текущее состояние, затем события до завершения задачи.
+
+        None означает, что за HEARTBEAT_SECONDS событий не было. После
+        переподписки к Redis снимок отправляется заново.
+        """
+        # Подписка оформляется до снимка, чтобы не потерять переходы между ними
+        async with self.subscribe(task_id) as queue:
+            event = {"type": RESYNC}
+            while True:
+                if event is None:
+                    yield None
+                elif event.get("type") == RESYNC:
+                    snapshot = await load_snapshot()
+                    if snapshot is not None:
+                        yield {"type": "snapshot", "task_id": task_id, **snapshot}
+                        if snapshot.get("status") in TERMINAL_STATUSES:
+                            return
+                else:
+                    yield event
+                    if event.get("type") == "status" and event.get("status") in TERMINAL_STATUSES:
+                        return
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    event = None
+
+status_event_hub = StatusEventHub()
@@ -1,50 +1,227 @@
 import redis
 import json
 import os
-from typing import Optional, Dict
+import threading
+import time
+from typing import Optional, Dict, Iterable, List, Tuple
+
+STATUS_TTL_SECONDS = 86400
+# Сколько секунд API-процесс отдаёт завершённую задачу из памяти, не обращаясь к Redis
+COMPLETED_CACHE_SECONDS = float(os.getenv('STATUS_CACHE_SECONDS', '30'))
+COMPLETED_CACHE_SIZE = 10000
+# Стадии, из которых складывается pipeline_progress
+PROGRESS_STAGES = [
+    "preprocessed",
+    "transcription_done",
+    "diarization_done",
+    "dialogue_done",
+    "summarization_done",
+    "formatting_done",
+]
+TERMINAL_STATUSES = {"completed", "failed"}
+
+# Поля хэша задачи: status, details, updated_at и поля с префиксами ниже
+STAGE_FIELD = "stage:"
+PARTIAL_FIELD = "partial:"
+CHECKPOINT_FIELD = "checkpoint:"
+
+
+class CompletedCache:
+    """Кэш статусов завершённых задач: после completed статус уже не меняется."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: Dict[str, Tuple[float, Dict]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        entry = self.entries.get(task_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, task_id: str, status_data: Dict) -> None:
+        if self.ttl <= 0 or status_data.get("status") != "completed":
+            return
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                now = time.monotonic()
+                self.entries = {k: v for k, v in self.entries.items() if v[0] >= now}
+                # Все записи свежие: вытесняем самые старые
+                while len(self.entries) >= self.max_size:
+                    del self.entries[next(iter(self.entries))]
+            self.entries[task_id] = (time.monotonic() + self.ttl, status_data)
+
+    def discard(self, task_id: str) -> None:
+        with self.lock:
+            self.entries.pop(task_id, None)
+
 
 class StatusTracker:
-    def __init__(self):
+    def __init__(self, redis_client=None):
         redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-        self.redis_client = redis.from_url(redis_url)
-        self.status_key_prefix = "task_status:"
+        self.redis_client = redis_client or redis.from_url(redis_url)
+        # Один хэш на задачу: смена стадии — запись нескольких полей, а не всего документа
+        self.status_key_prefix = "task_state:"
+        # Канал событий задачи для SSE/WebSocket подписчиков
+        self.channel_prefix = "task_events:"
+        self.cache = CompletedCache(COMPLETED_CACHE_SECONDS, COMPLETED_CACHE_SIZE)
         self.valid_statuses = [
             "uploaded",
+            # Идёт приём потока /stream: диалог ещё не сформирован
+            "streaming",
+            "processing",
             "preprocessed",
-            "transcription_done", 
+            "transcription_done",
             "diarization_done",
+            "dialogue_done",
+            "dialogue_compacted",
+            "summarizing",
             "summarization_done",
             "formatting_done",
             "completed",
             "failed"
         ]
 
-    def set_status(self, task_id: str, status: str, details: Optional[Dict] = None) -> None:
+    def key(self, task_id: str) -> str:
+        return f"{self.status_key_prefix}{task_id}"
+
+    def channel(self, task_id: str) -> str:
+        return f"{self.channel_prefix}{task_id}"
+
+    @staticmethod
+    def decode_hash(data: Dict) -> Dict[str, str]:
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+
+    @staticmethod
+    def progress_view(progress: Dict[str, str]) -> Dict:
+        """pipeline_progress и длительности стадий по времени достижения статусов."""
+        reached = sorted((float(ts), stage) for stage, ts in progress.items())
+        timings = {}
+        for (previous, _), (current, stage) in zip(reached, reached[1:]):
+            timings[stage] = round(current - previous, 3)
+        return {
+            "pipeline_progress": {stage: stage in progress for stage in PROGRESS_STAGES},
+            "stage_timings": timings,
+        }
+
+    def stage_fields(self) -> List[str]:
+        return [f"{STAGE_FIELD}{status}" for status in self.valid_statuses]
+
+    def queue_update(self, pipe, task_id: str, status: str, details: Optional[Dict], now: float) -> Dict:
         if status not in self.valid_statuses:
             raise ValueError(f"Invalid status: {status}. Must be one of: {self.valid_statuses}")
-            
-        status_data = {
-            "status": status,
-            "details": details or {},
-            "pipeline_progress": {
-                "preprocessed": status == "preprocessed",
-                "transcription_done": status == "transcription_done",
-                "diarization_done": status == "diarization_done", 
-                "summarization_done": status == "summarization_done",
-                "formatting_done": status == "formatting_done"
-            }
+        status_data = {"status": status, "details": details or {}, "updated_at": now}
+        key = self.key(task_id)
+        pipe.hset(key, mapping={"status": status, "details": json.dumps(status_data["details"]), "updated_at": now})
+        # Время первого достижения статуса: прогресс накапливается, а не перезаписывается
+        pipe.hsetnx(key, f"{STAGE_FIELD}{status}", now)
+        pipe.expire(key, STATUS_TTL_SECONDS)
+        pipe.hmget(key, self.stage_fields())
+        return status_data
+
+    def progress_from_values(self, values: List) -> Dict[str, str]:
+        return {
+            status: value.decode() if isinstance(value, bytes) else value
+            for status, value in zip(self.valid_statuses, values)
+            if value is not None
+        }
+
+    def set_status(self, task_id: str, status: str, details: Optional[Dict] = None) -> None:
+        self.set_many([(task_id, status, details)])
+
+    def set_many(self, updates: Iterable[Tuple[str, str, Optional[Dict]]]) -> None:
+        """Несколько переходов (в том числе разных задач) за один проход до Redis.
+
+        Переходы одной задачи применяются в переданном порядке.
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        queued = []
+        for task_id, status, details in updates:
+            queued.append((task_id, self.queue_update(pipe, task_id, status, details, time.time())))
+            self.cache.discard(task_id)
+        if not queued:
+            return
+        # На каждый переход в конвейере 4 команды, последняя — HMGET времён стадий
+        results = pipe.execute()[3::4]
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for (task_id, status_data), stage_values in zip(queued, results):
+            progress = self.progress_from_values(stage_values)
+            event = {"type": "status", "task_id": task_id, **status_data, **self.progress_view(progress)}
+            pipe.publish(self.channel(task_id), json.dumps(event))
+        pipe.execute()
+
+    def publish_partial(self, task_id: str, kind: str, text: str) -> None:
+        """Частичный результат (transcript, summary): хранится последний и рассылается подписчикам."""
+        key = self.key(task_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(key, f"{PARTIAL_FIELD}{kind}", text)
+        pipe.expire(key, STATUS_TTL_SECONDS)
+        pipe.publish(self.channel(task_id), json.dumps({
+            "type": "partial", "task_id": task_id, "kind": kind, "text": text, "updated_at": time.time()
+        }))
+        pipe.execute()
+
+    def mark_checkpoint(self, task_id: str, stage: str) -> None:
+        """Отмечает стадию, результат которой сохранён и не будет пересчитан при повторе."""
+        key = self.key(task_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(key, f"{CHECKPOINT_FIELD}{stage}", 1)
+        pipe.expire(key, STATUS_TTL_SECONDS)
+        pipe.execute()
+
+    def parse_state(self, data: Dict) -> Optional[Dict]:
+        data = self.decode_hash(data)
+        if "status" not in data:
+            return None
+        progress, partials, checkpoints = {}, {}, []
+        for field, value in data.items():
+            if field.startswith(STAGE_FIELD):
+                progress[field[len(STAGE_FIELD):]] = value
+            elif field.startswith(PARTIAL_FIELD):
+                partials[field[len(PARTIAL_FIELD):]] = value
+            elif field.startswith(CHECKPOINT_FIELD):
+                checkpoints.append(field[len(CHECKPOINT_FIELD):])
+        return {
+            "status": data["status"],
+            "details": json.loads(data.get("details") or "{}"),
+            "updated_at": float(data["updated_at"]),
+            **self.progress_view(progress),
+            "partials": partials,
+            "checkpoints": sorted(checkpoints),
         }
-        self.redis_client.set(
-            f"{self.status_key_prefix}{task_id}",
-            json.dumps(status_data),
-            ex=86400  # Expire after 24 hours
-        )
 
     def get_status(self, task_id: str) -> Optional[Dict]:
-        status_data = self.redis_client.get(f"{self.status_key_prefix}{task_id}")
-        if status_data:
-            return json.loads(status_data)
-        return None
+        return self.get_many([task_id])[task_id]
+
+    def get_many(self, task_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Статусы нескольких задач за один конвейер HGETALL; завершённые берутся из кэша процесса."""
+        statuses = {}
+        missing = []
+        for task_id in task_ids:
+            cached = self.cache.get(task_id)
+            if cached is not None:
+                statuses[task_id] = cached
+            elif task_id not in statuses:
+                statuses[task_id] = None
+                missing.append(task_id)
+        if not missing:
+            return statuses
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for task_id in missing:
+            pipe.hgetall(self.key(task_id))
+        for task_id, data in zip(missing, pipe.execute()):
+            status_data = self.parse_state(data)
+            statuses[task_id] = status_data
+            if status_data is not None:
+                self.cache.put(task_id, status_data)
+        return statuses
 
 # Initialize status tracker
-status_tracker = StatusTracker() 
\ No newline at end of file
+status_tracker = StatusTracker()
@@ -0,0 +1,64 @@
+from fastapi import FastAPI, Query, WebSocket
+from celery_app import celery_app, PROCESS_STREAM_TASK
+import asyncio
+import contextlib
+import uuid
+
+from admission import admission_controller
+from status_tracker import status_tracker
+from stream_sessions import stream_session_manager
+
+# Отдельное приложение: модели потокового режима загружаются в его процессе, а не в процессе API
+app = FastAPI()
+
+
+@app.websocket("/stream")
+async def stream_audio(
+    websocket: WebSocket,
+    num_speakers: int | None = Query(None, description="Expected number of speakers in the audio"),
+    language: str | None = Query(None, description="Language of the audio stream")
+):
+    """Потоковая транскрибация живого разговора.
+
+    Клиент шлёт бинарные кадры 16 кГц моно int16 PCM и {"type": "end"} в конце,
+    сервер — строки диалога {"type": "line", "line": "#SPEAKER_00#: ..."}.
+    После завершения потока диалог уходит на суммаризацию и публикацию,
+    дальше задача отслеживается как обычная загрузка.
+    """
+    await websocket.accept()
+    if not stream_session_manager.acquire():
+        await websocket.close(code=1013, reason="Too many concurrent streams")
+        return
+    task_id = str(uuid.uuid4())
+    try:
+        await asyncio.to_thread(status_tracker.set_status, task_id, "streaming", {"filename": "stream"})
+        await websocket.send_json({"type": "started", "task_id": task_id})
+        session = await stream_session_manager.run(websocket, language, num_speakers)
+    except Exception as e:
+        await asyncio.to_thread(status_tracker.set_status, task_id, "failed", {"error": str(e), "filename": "stream"})
+        with contextlib.suppress(Exception):
+            await websocket.close(code=1011)
+        return
+    finally:
+        stream_session_manager.release()
+
+    stats = session.stats()
+    dialogue = session.dialogue()
+    if dialogue:
+        await asyncio.to_thread(status_tracker.set_many, [
+            (task_id, "transcription_done", stats),
+            (task_id, "diarization_done", stats),
+            (task_id, "dialogue_done", stats),
+        ])
+        priority = admission_controller.priority(stats["duration"])
+        await asyncio.to_thread(
+            celery_app.send_task, PROCESS_STREAM_TASK, (task_id, dialogue, num_speakers, language, priority), priority=priority
+        )
+        result = {"type": "finished", "task_id": task_id, "status": "processing", **stats}
+    else:
+        await asyncio.to_thread(status_tracker.set_status, task_id, "failed", {"error": "No speech detected", "filename": "stream"})
+        result = {"type": "finished", "task_id": task_id, "status": "failed", **stats}
+    # Клиент мог уже отключиться: задача всё равно продолжается
+    with contextlib.suppress(Exception):
+        await websocket.send_json(result)
+        await websocket.close()
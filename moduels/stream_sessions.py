@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from settings import StreamSessionConfig
+
+
+class StreamSessionManager:
+    """Потоковые сессии транскрибации в процессе stream_service.
+
+    Кадры принимаются в цикле событий, VAD выполняется сразу, а готовые
+    фрагменты распознаются в общем пуле инференса: модели загружены один
+    раз на процесс. Фрагменты одной сессии обрабатываются по порядку,
+    число одновременных сессий ограничено MAX_SESSIONS.
+    """
+
+    def __init__(self, config: StreamSessionConfig, session_factory: Callable | None = None):
+        self.config = config
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(max_workers=config.INFERENCE_WORKERS, thread_name_prefix="stream")
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def create_session(self, language: str | None, num_speakers: int | None):
+        if self.session_factory is None:
+            # Модели нужны только потоковому режиму: импорт при первой сессии
+            from summarization_pipeline import create_session
+            self.session_factory = create_session
+        return self.session_factory(language, num_speakers)
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.config.MAX_SESSIONS:
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    async def run(self, websocket, language: str | None, num_speakers: int | None):
+        """Принимает бинарные кадры 16 кГц int16 PCM до {"type": "end"}, закрытия или простоя.
+
+        Строки диалога отправляются клиенту по мере распознавания фрагментов.
+
+        Returns:
+            StreamingSession: сессия со всеми строками и статистикой
+        """
+        loop = asyncio.get_running_loop()
+        # Первая сессия загружает модели в пуле инференса, не блокируя цикл событий
+        session = await loop.run_in_executor(self.executor, self.create_session, language, num_speakers)
+        segments = asyncio.Queue()
+        connected = True
+
+        async def transcribe_segments():
+            nonlocal connected
+            while (item := await segments.get()) is not None:
+                lines = await loop.run_in_executor(self.executor, session.process, *item)
+                for line in lines:
+                    if not connected:
+                        break
+                    try:
+                        await websocket.send_json({"type": "line", **line})
+                    except Exception:
+                        # Клиент ушёл: строки всё равно копятся для суммаризации
+                        connected = False
+
+        def enqueue(finished):
+            closed_at = time.perf_counter()
+            for start, samples in finished:
+                segments.put_nowait((start, samples, closed_at))
+
+        worker = asyncio.create_task(transcribe_segments())
+        try:
+            while session.vad.position < self.config.MAX_DURATION_SECONDS:
+                try:
+                    message = await asyncio.wait_for(websocket.receive(), self.config.IDLE_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if message["type"] == "websocket.disconnect":
+                    connected = False
+                    break
+                if message.get("bytes"):
+                    enqueue(session.feed(message["bytes"]))
+                elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                    break
+                if worker.done():
+                    break
+        finally:
+            enqueue(session.flush())
+            segments.put_nowait(None)
+            # Ошибка распознавания всплывает отсюда
+            await worker
+        return session
+
+
+stream_session_manager = StreamSessionManager(StreamSessionConfig())
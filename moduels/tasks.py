@@ -1,57 +1,452 @@
-from celery import Celery
+from celery import Task, chain, chord
+from celery.signals import celeryd_init, worker_init, worker_process_init, worker_process_shutdown
+import hashlib
+import inspect
 import os
+from contextlib import contextmanager
 from typing import Dict
+from admission import admission_controller
+from artifact_cache import artifact_cache, make_cache_key
+from artifact_store import artifact_store
+from celery_app import celery_app
+from settings import MetricsConfig
+from metrics import start_metrics_server, mark_process_dead
 from s3_storage import s3_storage
 from status_tracker import status_tracker
-from summarization_pipeline import SummarizationPipeline
-
-celery_app = Celery("audio_tasks", broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
-
-@celery_app.task(bind=True)
-def process_audio_task(self, filepath: str, task_id: str, num_speakers: int | None, language: str | None):
-    pipeline = SummarizationPipeline()
-    try:
-        # Обновляем статус
-        status_tracker.set_status(task_id, "processing", {"filename": os.path.basename(filepath)})
-        
-        # Запускаем пайплайн
-        result = pipeline.run(filepath, num_speakers, language)
-
-        # Загружаем оба отформатированных файла в S3
-        s3_keys = {}
-        for file_type, file_path in result.items():
-            s3_key = f"results/{task_id}/{os.path.basename(file_path)}"
-            if s3_storage.upload_file(file_path, s3_key):
-                s3_keys[file_type] = s3_key
-            else:
-                raise Exception(f"Failed to upload {file_type} file to S3")
-        
-        # Обновляем статус
-        status_tracker.set_status(
-            task_id,
-            "completed",
-            {
-                "filename": os.path.basename(filepath),
-                "s3_keys": s3_keys
-            }
-        )
-        
-        # Удаляем локальные файлы
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        for file_path in result.values():
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-        return {"status": "completed"}
-        
-    except Exception as e:
-        status_tracker.set_status(
-            task_id,
-            "failed",
-            {
-                "error": str(e),
-                "filename": os.path.basename(filepath)
+from upload_storage import upload_storage
+from summarization_pipeline import (
+    SummarizationPipeline,
+    Segments,
+    preload_models,
+    plan_shards,
+    write_shard,
+    reconcile_speakers,
+    instrumentation,
+)
+from summarization_pipeline.config import (
+    load_transcription_config,
+    load_diarization_config,
+    load_summarization_config,
+    load_execution_config,
+    load_sharding_config,
+    load_compaction_config,
+)
+
+metrics_config = MetricsConfig()
+
+
+@celeryd_init.connect
+def configure_queue_concurrency(conf=None, options=None, **kwargs):
+    # Параллелизм воркера по его очереди: CELERY_ASR_CONCURRENCY=1, CELERY_IO_CONCURRENCY=32 и т.д.
+    # Явный --concurrency в командной строке имеет приоритет.
+    options = options or {}
+    queues = options.get("queues") or []
+    if isinstance(queues, str):
+        queues = queues.split(",")
+    if len(queues) != 1 or options.get("concurrency"):
+        return
+    concurrency = os.getenv(f"CELERY_{queues[0].strip().upper()}_CONCURRENCY")
+    if concurrency:
+        conf.worker_concurrency = int(concurrency)
+
+
+@worker_process_init.connect
+def warmup_models(**kwargs):
+    # Загружаем модели один раз при старте процесса воркера,
+    # например MODEL_POOL_PRELOAD="ru,en"
+    languages = [lang.strip() for lang in os.getenv("MODEL_POOL_PRELOAD", "").split(",") if lang.strip()]
+    if languages:
+        preload_models(languages)
+
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    # Один сервер на воркер; дочерние процессы prefork видны через PROMETHEUS_MULTIPROC_DIR
+    if metrics_config.WORKER_PORT:
+        start_metrics_server(metrics_config.WORKER_PORT)
+
+
+@worker_process_shutdown.connect
+def release_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
+
+
+def build_pipeline(num_speakers: int | None, language: str | None) -> SummarizationPipeline:
+    # Модули создаются лениво и берут модели из пула воркера, поэтому создание пайплайна дешёвое
+    return SummarizationPipeline(
+        load_transcription_config(language),
+        load_diarization_config(),
+        load_summarization_config(),
+        status_tracker,
+        num_speakers,
+        language,
+        load_execution_config(),
+    )
+
+
+class PipelineTask(Task):
+    """Стадия пайплайна: повтор через 60 секунд, статус failed после исчерпания попыток.
+
+    Последний позиционный аргумент стадии — контекст задачи со ссылками на артефакты.
+    """
+    autoretry_for = (Exception,)
+    max_retries = 3
+    default_retry_delay = 60
+
+    def failure_context(self, args, kwargs) -> Dict:
+        return args[-1] if args and isinstance(args[-1], dict) else {}
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        context = self.failure_context(args, kwargs)
+        if "task_id" in context:
+            admission_controller.release(context["task_id"])
+            details = {
+                "error": str(exc),
+                "filename": os.path.basename(context["filepath"])
             }
-        )
-        self.retry(exc=e, countdown=60, max_retries=3)
\ No newline at end of file
+            if "timings" in context:
+                details["timings"] = context["timings"]
+            status_tracker.set_status(context["task_id"], "failed", details)
+
+
+class EntryTask(PipelineTask):
+    """Точка входа: контекста ещё нет, task_id и filepath берутся из аргументов задачи.
+
+    Ошибка до постановки цепочки (загрузка, хэш, ключи кэша) так же
+    освобождает допуск и переводит задачу в failed.
+    """
+
+    def failure_context(self, args, kwargs) -> Dict:
+        arguments = inspect.signature(self.run).bind_partial(*args, **kwargs).arguments
+        return {"task_id": arguments["task_id"], "filepath": arguments.get("filepath", "")}
+
+
+@contextmanager
+def instrumented(context: Dict, name: str, pipeline: SummarizationPipeline):
+    """Тайминги шагов стадии в context["timings"] и профиль стадии, если он запрошен."""
+    directory = metrics_config.PROFILE_DIR if metrics_config.PROFILE_TASKS or context.get("profile") else None
+    with instrumentation.profile_to(directory, f"{context['task_id']}_{name}", metrics_config.PROFILE_MODE) as profile_path:
+        try:
+            yield
+        finally:
+            instrumentation.merge_timings(context.setdefault("timings", {}), pipeline.timings.pop())
+    if profile_path:
+        context.setdefault("profiles", []).append(profile_path)
+
+
+def hash_file(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+# Формат сериализации сегментов входит в ключ кэша, чтобы не читать записи старого формата
+SEGMENTS_FORMAT = "segments-npz-1"
+# Имена артефактов кэшируемых стадий: одни и те же при записи и при чтении из кэша
+CACHED_FILES = {
+    "transcription": "transcription.npz",
+    "diarization": "diarization.npz",
+    "dialogue": "dialogue.txt",
+    "summary": "summary.txt",
+}
+
+
+def build_cache_keys(audio_hash: str, num_speakers: int | None, language: str | None) -> Dict[str, str]:
+    """Ключи кэша стадий: хэш аудио плюс параметры, от которых зависит результат стадии."""
+    transcription_config = load_transcription_config(language)
+    diarization_config = load_diarization_config()
+
+    transcription = make_cache_key("transcription", {
+        "audio": audio_hash,
+        "format": SEGMENTS_FORMAT,
+        "language": language,
+        **transcription_config.dict(exclude={"device", "hf_token"}),
+    })
+    diarization = make_cache_key("diarization", {
+        "audio": audio_hash,
+        "format": SEGMENTS_FORMAT,
+        "checkpoint": diarization_config.checkpoint_path,
+        "num_speakers": num_speakers,
+    })
+    dialogue = make_cache_key("dialogue", {"transcription": transcription, "diarization": diarization})
+    return {"transcription": transcription, "diarization": diarization, "dialogue": dialogue, "summary": build_summary_cache_key(dialogue)}
+
+
+def build_summary_cache_key(dialogue_key: str) -> str:
+    summarization_config = load_summarization_config()
+    with open(summarization_config.prompt_path, "rb") as f:
+        prompt_hash = hashlib.sha256(f.read()).hexdigest()
+    return make_cache_key("summary", {
+        "dialogue": dialogue_key,
+        "model": summarization_config.model,
+        "prompt": prompt_hash,
+        **summarization_config.dict(include={"temperature", "chunk_max_tokens", "chunk_overlap_turns"}),
+        "compaction": load_compaction_config().dict(),
+    })
+
+
+@celery_app.task(bind=True, base=EntryTask)
+def process_audio_task(self, filepath: str, task_id: str, num_speakers: int | None, language: str | None, audio_hash: str | None = None, priority: int | None = None, profile: bool = False):
+    """Точка входа: запускает граф стадий по очередям.
+
+    Повторный запуск с тем же task_id продолжает работу с последней
+    завершённой стадии по контрольным точкам в ARTIFACT_DIR. Стадии,
+    результат которых уже есть в кэше для того же аудио и конфигурации,
+    пропускаются. priority (по длительности записи) наследуют все стадии.
+    profile включает дамп профиля каждой стадии в PROFILE_DIR.
+    """
+    status_tracker.set_status(task_id, "processing", {"filename": os.path.basename(filepath)})
+    if audio_hash is None:
+        audio_hash = hash_file(upload_storage.fetch(filepath, artifact_store.path(task_id, "upload_" + os.path.basename(filepath))))
+    context = {
+        "task_id": task_id,
+        "filepath": filepath,
+        "num_speakers": num_speakers,
+        "language": language,
+        "artifacts": {},
+        "cache_keys": build_cache_keys(audio_hash, num_speakers, language),
+        "cache_hits": [],
+        "priority": priority,
+        "profile": profile,
+        "timings": {},
+    }
+    chain(
+        preprocess_task.s(context).set(priority=priority),
+        analyze_task.s().set(priority=priority),
+        summarize_task.s().set(priority=priority),
+        publish_task.s().set(priority=priority),
+    ).apply_async()
+    return {"status": "queued"}
+
+
+@celery_app.task(bind=True, base=EntryTask)
+def process_stream_task(self, task_id: str, dialogue: str, num_speakers: int | None, language: str | None, priority: int | None = None):
+    """Точка входа потокового режима: диалог собран API, остаются суммаризация и публикация."""
+    dialogue_key = make_cache_key("dialogue", {"text": hashlib.sha256(dialogue.encode("utf-8")).hexdigest()})
+    context = {
+        "task_id": task_id,
+        # Загрузки нет: публикации нечего удалять
+        "filepath": "",
+        "num_speakers": num_speakers,
+        "language": language,
+        "artifacts": {},
+        "cache_keys": {"dialogue": dialogue_key, "summary": build_summary_cache_key(dialogue_key)},
+        "cache_hits": [],
+        "priority": priority,
+        "profile": False,
+        "timings": {},
+    }
+    save_cached(context, "dialogue", dialogue)
+    chain(
+        summarize_task.s(context).set(priority=priority),
+        publish_task.s().set(priority=priority),
+    ).apply_async()
+    return {"status": "queued"}
+
+
+def restore_checkpoint(context: Dict, stage: str) -> bool:
+    """Подставляет в контекст результаты стадии, если она уже завершалась."""
+    saved = artifact_store.load_checkpoint(context["task_id"]).get(stage)
+    if saved is None:
+        return False
+    context["artifacts"].update(saved["artifacts"])
+    context.update(saved["metadata"])
+    return True
+
+
+def save_checkpoint(context: Dict, stage: str, artifacts: Dict[str, str], **metadata) -> None:
+    context["artifacts"].update(artifacts)
+    context.update(metadata)
+    artifact_store.save_checkpoint(context["task_id"], stage, artifacts, metadata)
+    status_tracker.mark_checkpoint(context["task_id"], stage)
+
+
+def restore_cached(context: Dict, stage: str) -> bool:
+    """Берёт результат стадии из кэша и сохраняет его как артефакт задачи."""
+    data = artifact_cache.get_bytes(context["cache_keys"][stage])
+    if data is None:
+        return False
+    save_checkpoint(context, stage, {stage: artifact_store.save_bytes(context["task_id"], CACHED_FILES[stage], data)})
+    context["cache_hits"].append(stage)
+    return True
+
+
+def save_cached(context: Dict, stage: str, data: str | bytes) -> None:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    save_checkpoint(context, stage, {stage: artifact_store.save_bytes(context["task_id"], CACHED_FILES[stage], data)})
+    artifact_cache.put_bytes(context["cache_keys"][stage], data)
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def preprocess_task(self, context: Dict) -> Dict:
+    if restore_checkpoint(context, "preprocessed"):
+        return context
+
+    # Если диалог или обе стадии анализа есть в кэше, аудио декодировать не нужно
+    if restore_cached(context, "dialogue"):
+        return context
+    if restore_cached(context, "transcription") and restore_cached(context, "diarization"):
+        return context
+
+    pipeline = build_pipeline(context["num_speakers"], context["language"])
+    audio_path = artifact_store.path(context["task_id"], "audio_16k.wav")
+    with instrumented(context, "preprocess", pipeline):
+        # Загрузка может лежать в S3, а не на хосте API
+        with pipeline.timings.measure("fetch"):
+            upload_path = upload_storage.fetch(context["filepath"], artifact_store.path(context["task_id"], "upload_" + os.path.basename(context["filepath"])))
+        audio = pipeline.preprocess(upload_path, context["task_id"], audio_path)
+    save_checkpoint(context, "preprocessed", {"audio": audio.path}, duration=audio.duration)
+    return context
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def analyze_task(self, context: Dict) -> Dict:
+    task_id = context["task_id"]
+    if restore_checkpoint(context, "dialogue") or restore_cached(context, "dialogue"):
+        return context
+
+    pipeline = build_pipeline(context["num_speakers"], context["language"])
+    transcription = None
+    if restore_checkpoint(context, "transcription") or restore_cached(context, "transcription"):
+        transcription = Segments.load(context["artifacts"]["transcription"])
+    diarization = None
+    if restore_checkpoint(context, "diarization") or restore_cached(context, "diarization"):
+        diarization = Segments.load(context["artifacts"]["diarization"])
+
+    if transcription is None or diarization is None:
+        # Длинные записи раскладываем по воркерам, остальная цепочка продолжится после сведения
+        sharding_config = load_sharding_config()
+        if transcription is None and diarization is None and context["duration"] > sharding_config.threshold_seconds:
+            return self.replace(build_shard_chord(context))
+
+        with instrumented(context, "analyze", pipeline):
+            transcription, diarization = pipeline.transcribe_and_diarize(
+                context["artifacts"]["audio"], task_id, transcription, diarization
+            )
+        context["model_load_timings"] = pipeline.model_load_timings
+    return save_dialogue(pipeline, context, transcription, diarization)
+
+
+def save_dialogue(pipeline: SummarizationPipeline, context: Dict, transcription: Segments, diarization: Segments) -> Dict:
+    if "transcription" not in context["artifacts"]:
+        save_cached(context, "transcription", transcription.to_bytes())
+    if "diarization" not in context["artifacts"]:
+        save_cached(context, "diarization", diarization.to_bytes())
+    with instrumented(context, "dialogue", pipeline):
+        dialogue = pipeline.parse_dialogue(transcription, diarization, context["task_id"])
+    save_cached(context, "dialogue", dialogue)
+    return context
+
+
+def build_shard_chord(context: Dict):
+    """Режет запись в паузах: шарды обрабатываются параллельно, затем сводятся."""
+    sharding_config = load_sharding_config()
+    audio_path = context["artifacts"]["audio"]
+    bounds = plan_shards(audio_path, sharding_config.shard_seconds, sharding_config.search_seconds)
+
+    shard_tasks = []
+    for index, (start, end) in enumerate(bounds):
+        shard_path = artifact_store.path(context["task_id"], f"shard_{index:03d}.wav")
+        # Шард, уже обработанный в прошлой попытке, заново не вырезается
+        if not artifact_store.exists(context["task_id"], f"shard_{index:03d}.json"):
+            write_shard(audio_path, start, end, shard_path)
+        shard_tasks.append(process_shard_task.s(shard_path, start, index, context).set(priority=context.get("priority")))
+
+    status_tracker.set_status(context["task_id"], "processing", {"filename": os.path.basename(context["filepath"]), "shards": len(bounds)})
+    return chord(shard_tasks, reduce_shards_task.s(context).set(priority=context.get("priority")))
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def process_shard_task(self, shard_path: str, offset: float, index: int, context: Dict) -> str:
+    name = f"shard_{index:03d}.json"
+    if artifact_store.exists(context["task_id"], name):
+        return artifact_store.path(context["task_id"], name)
+
+    pipeline = build_pipeline(None, context["language"])
+    # Тайминги шарда отдельно от контекста: сведение суммирует их по всем шардам
+    shard_metrics = {"task_id": context["task_id"], "profile": context.get("profile")}
+    with instrumented(shard_metrics, f"shard_{index:03d}", pipeline):
+        result = pipeline.process_shard(shard_path)
+    # Результат шарда передаётся по ссылке; JSON пишется последним и отмечает готовность шарда
+    ref = artifact_store.save_json(context["task_id"], name, {
+        "offset": offset,
+        "transcription": result["transcription"].save(artifact_store.path(context["task_id"], f"shard_{index:03d}_transcription.npz")),
+        "diarization": result["diarization"].save(artifact_store.path(context["task_id"], f"shard_{index:03d}_diarization.npz")),
+        "embeddings": result["embeddings"],
+        "timings": shard_metrics["timings"],
+        "profiles": shard_metrics.get("profiles", []),
+    })
+    os.remove(shard_path)
+    return ref
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def reduce_shards_task(self, shard_refs: list, context: Dict) -> Dict:
+    shard_results = []
+    for ref in shard_refs:
+        shard = artifact_store.load_json(ref)
+        shard["transcription"] = Segments.load(shard["transcription"])
+        shard["diarization"] = Segments.load(shard["diarization"])
+        shard_results.append(shard)
+        instrumentation.merge_timings(context.setdefault("timings", {}), shard.get("timings", {}))
+        if shard.get("profiles"):
+            context.setdefault("profiles", []).extend(shard["profiles"])
+    sharding_config = load_sharding_config()
+    transcription, diarization = reconcile_speakers(shard_results, sharding_config.speaker_threshold, context["num_speakers"])
+    status_tracker.set_many([
+        (context["task_id"], "transcription_done", {"shards": len(shard_results)}),
+        (context["task_id"], "diarization_done", {"shards": len(shard_results)}),
+    ])
+
+    pipeline = build_pipeline(context["num_speakers"], context["language"])
+    pipeline.publish_transcript(context["task_id"], transcription)
+
+    context["shards"] = len(shard_results)
+    return save_dialogue(pipeline, context, transcription, diarization)
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def summarize_task(self, context: Dict) -> Dict:
+    if restore_checkpoint(context, "summary") or restore_cached(context, "summary"):
+        return context
+
+    pipeline = build_pipeline(context["num_speakers"], context["language"])
+    dialogue = artifact_store.load_text(context["artifacts"]["dialogue"])
+    with instrumented(context, "summarize", pipeline):
+        dialogue, context["compaction_stats"] = pipeline.compact_dialogue(dialogue, context["task_id"])
+        summary = pipeline.summarize(dialogue, context["task_id"])
+    context["summarization_stats"] = pipeline.summarization.last_stats
+    save_cached(context, "summary", summary)
+    return context
+
+
+@celery_app.task(bind=True, base=PipelineTask)
+def publish_task(self, context: Dict) -> Dict:
+    task_id = context["task_id"]
+    filepath = context["filepath"]
+    pipeline = build_pipeline(context["num_speakers"], context["language"])
+    summary = artifact_store.load_text(context["artifacts"]["summary"])
+    with instrumented(context, "publish", pipeline):
+        rendered = pipeline.render_results(summary, task_id)
+
+        # Оба формата загружаются параллельно прямо из памяти
+        s3_keys = {file_type: f"results/{task_id}/{task_id}_summary.{file_type}" for file_type in rendered}
+        with pipeline.timings.measure("upload"):
+            s3_storage.put_many({s3_keys[file_type]: content.encode("utf-8") for file_type, content in rendered.items()})
+
+    # Обновляем статус
+    details = {"filename": os.path.basename(filepath), "s3_keys": s3_keys}
+    for key in ("shards", "model_load_timings", "cache_hits", "compaction_stats", "summarization_stats", "timings", "profiles"):
+        if key in context:
+            details[key] = context[key]
+    status_tracker.set_status(task_id, "completed", details)
+    admission_controller.release(task_id)
+
+    # Удаляем исходную загрузку и промежуточные файлы
+    upload_storage.delete(filepath)
+    artifact_store.cleanup(task_id)
+
+    return {"status": "completed"}
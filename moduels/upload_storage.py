@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import os
+from typing import AsyncIterator, Dict, List
+
+from settings import UploadConfig
+
+S3_SCHEME = "s3://"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class LocalUploadSink:
+    """Пишет загрузку в локальную (или смонтированную общую) директорию."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path + ".part", "wb")
+
+    async def write(self, chunk: bytes) -> None:
+        await asyncio.to_thread(self.file.write, chunk)
+
+    async def complete(self) -> str:
+        self.file.close()
+        os.replace(self.path + ".part", self.path)
+        return self.path
+
+    async def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.path + ".part"):
+            os.remove(self.path + ".part")
+
+
+class S3MultipartUploadSink:
+    """Потоковая multipart-загрузка в S3.
+
+    Тело запроса копится до part_size и уходит отдельной частью в пуле потоков;
+    одновременно в полёте не больше part_concurrency частей, так что память
+    ограничена part_size * (part_concurrency + 1).
+    """
+
+    def __init__(self, storage, s3_key: str, part_size: int, part_concurrency: int):
+        self.storage = storage
+        self.s3_key = s3_key
+        self.part_size = part_size
+        self.semaphore = asyncio.Semaphore(part_concurrency)
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.pending: List[asyncio.Task] = []
+        self.parts: List[Dict] = []
+
+    async def _upload_part(self, part_number: int, data: bytes) -> None:
+        try:
+            self.parts.append(await asyncio.to_thread(
+                self.storage.upload_part, self.s3_key, self.upload_id, part_number, data
+            ))
+        finally:
+            self.semaphore.release()
+
+    async def _flush(self) -> None:
+        if self.upload_id is None:
+            self.upload_id = await asyncio.to_thread(self.storage.create_multipart_upload, self.s3_key)
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        # Ждём свободный слот до запуска части, чтобы не буферизовать всё тело
+        await self.semaphore.acquire()
+        self.pending.append(asyncio.create_task(self._upload_part(len(self.pending) + 1, data)))
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        if len(self.buffer) >= self.part_size:
+            await self._flush()
+
+    async def complete(self) -> str:
+        if self.buffer or self.upload_id is None:
+            await self._flush()
+        await asyncio.gather(*self.pending)
+        await asyncio.to_thread(self.storage.complete_multipart_upload, self.s3_key, self.upload_id, self.parts)
+        return f"{S3_SCHEME}{self.s3_key}"
+
+    async def abort(self) -> None:
+        for task in self.pending:
+            task.cancel()
+        await asyncio.gather(*self.pending, return_exceptions=True)
+        if self.upload_id is not None:
+            await asyncio.to_thread(self.storage.abort_multipart_upload, self.s3_key, self.upload_id)
+
+
+class UploadStorage:
+    """Приём загрузок потоком и выдача их воркерам.
+
+    Ссылка на загрузку — локальный путь либо s3://<ключ> в бакете StorageManager;
+    воркеры получают файл через fetch независимо от хоста API.
+    """
+
+    def __init__(self, config: UploadConfig):
+        self.config = config
+        self.chunk_size = config.CHUNK_SIZE_KB * 1024
+        self.max_size = config.MAX_SIZE_MB * 1024 * 1024
+
+    @property
+    def storage(self):
+        from s3_storage import s3_storage
+        return s3_storage
+
+    def open_sink(self, name: str):
+        if self.config.BACKEND == "s3":
+            return S3MultipartUploadSink(
+                self.storage,
+                self.config.S3_PREFIX + name,
+                self.config.PART_SIZE_MB * 1024 * 1024,
+                self.config.PART_CONCURRENCY,
+            )
+        return LocalUploadSink(os.path.join(self.config.LOCAL_DIR, name))
+
+    async def receive(self, chunks: AsyncIterator[bytes], name: str) -> tuple[str, str, int]:
+        """Потоково сохраняет тело загрузки, считая SHA-256 на лету.
+
+        Returns:
+            tuple: (ссылка на загрузку, sha256, размер в байтах)
+        """
+        sink = self.open_sink(name)
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > self.max_size:
+                    raise UploadTooLarge(f"Upload exceeds {self.config.MAX_SIZE_MB} MB")
+                sha256.update(chunk)
+                await sink.write(chunk)
+            reference = await sink.complete()
+        except BaseException:
+            await sink.abort()
+            raise
+        return reference, sha256.hexdigest(), size
+
+    def fetch(self, reference: str, path: str) -> str:
+        """Возвращает локальный путь к загрузке, скачивая её из S3 при необходимости."""
+        if not reference.startswith(S3_SCHEME):
+            return reference
+        if not os.path.exists(path):
+            self.storage.download_file(reference[len(S3_SCHEME):], path + ".part")
+            os.replace(path + ".part", path)
+        return path
+
+    def delete(self, reference: str) -> None:
+        if reference.startswith(S3_SCHEME):
+            self.storage.delete_object(reference[len(S3_SCHEME):])
+        elif os.path.exists(reference):
+            os.remove(reference)
+
+
+upload_storage = UploadStorage(UploadConfig())
@@ -1,4 +1,8 @@
-from .pipeline import SummarizationPipeline
-
-__all__ = ["SummarizationPipeline"]
+# Segments берётся из модуля пайплайна, чтобы класс совпадал с тем, что возвращают модули
+from .pipeline import SummarizationPipeline, Segments, preload_models
+# instrumentation — тоже через модуль пайплайна: второй экземпляр зарегистрировал бы метрики Prometheus повторно
+from .pipeline import instrumentation
+from .sharding import plan_shards, write_shard, reconcile_speakers
+from .streaming import StreamingSession, create_session
 
+__all__ = ["SummarizationPipeline", "Segments", "preload_models", "plan_shards", "write_shard", "reconcile_speakers", "instrumentation", "StreamingSession", "create_session"]
@@ -0,0 +1,120 @@
+import numpy as np
+
+from segments import Segments, factorize, merge_intervals, object_array
+
+
+def speaker_coverage(starts: np.ndarray, ends: np.ndarray):
+    """Сливает интервалы одного говорящего и готовит их к запросам покрытия.
+
+    Returns:
+        tuple: (начала, концы, накопленная длина до каждого интервала)
+    """
+    merged_starts, merged_ends = merge_intervals(starts, ends)
+    lengths = merged_ends - merged_starts
+    cumulative = np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+    return merged_starts, merged_ends, cumulative
+
+
+def covered_before(t: np.ndarray, coverage) -> np.ndarray:
+    """Суммарная длительность речи говорящего до моментов t."""
+    starts, ends, cumulative = coverage
+    index = np.searchsorted(starts, t, side="right") - 1
+    valid = index >= 0
+    index = np.clip(index, 0, None)
+    inside = np.clip(t - starts[index], 0.0, ends[index] - starts[index])
+    return np.where(valid, cumulative[index] + inside, 0.0)
+
+
+def overlap_matrix(starts: np.ndarray, ends: np.ndarray, diar_starts: np.ndarray, diar_ends: np.ndarray, diar_codes: np.ndarray, num_speakers: int) -> np.ndarray:
+    """Длительность пересечения каждого отрезка с речью каждого говорящего: (N, K)."""
+    overlaps = np.zeros((len(starts), num_speakers))
+    for code in range(num_speakers):
+        mask = diar_codes == code
+        coverage = speaker_coverage(diar_starts[mask], diar_ends[mask])
+        overlaps[:, code] = covered_before(ends, coverage) - covered_before(starts, coverage)
+    return overlaps
+
+
+def nearest_segment(starts: np.ndarray, ends: np.ndarray, diar_starts: np.ndarray, diar_ends: np.ndarray) -> np.ndarray:
+    """Индекс ближайшего по времени сегмента диаризации (диаризация отсортирована по началу)."""
+    right = np.clip(np.searchsorted(diar_starts, starts, side="left"), 0, len(diar_starts) - 1)
+    left = np.clip(right - 1, 0, len(diar_starts) - 1)
+    gap_left = np.maximum(starts - diar_ends[left], 0.0)
+    gap_right = np.maximum(diar_starts[right] - ends, 0.0)
+    return np.where(gap_left <= gap_right, left, right)
+
+
+def assign_speakers(starts, ends, diar_starts, diar_ends, diar_codes, num_speakers: int) -> np.ndarray:
+    """Назначает каждому отрезку код говорящего с наибольшим пересечением.
+
+    Отрезки без пересечения получают говорящего ближайшего сегмента
+    диаризации, при пустой диаризации — код -1. Вычисление векторное:
+    O((N + M) log M) на говорящего.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if len(diar_starts) == 0:
+        return np.full(len(starts), -1, dtype=np.int64)
+
+    diar_starts = np.asarray(diar_starts, dtype=np.float64)
+    diar_ends = np.asarray(diar_ends, dtype=np.float64)
+    overlaps = overlap_matrix(starts, ends, diar_starts, diar_ends, diar_codes, num_speakers)
+    best = overlaps.argmax(axis=1)
+
+    no_overlap = overlaps.max(axis=1) <= 0
+    if no_overlap.any():
+        order = np.argsort(diar_starts, kind="stable")
+        nearest = nearest_segment(starts[no_overlap], ends[no_overlap], diar_starts[order], diar_ends[order])
+        best[no_overlap] = diar_codes[order][nearest]
+    return best
+
+
+def split_by_words(words: list[dict], diar_starts, diar_ends, diar_codes, labels: list) -> Segments:
+    """Делит сегмент по словам в местах смены говорящего (нужны отметки времени слов)."""
+    codes = assign_speakers(
+        [word["start"] for word in words], [word["end"] for word in words],
+        diar_starts, diar_ends, diar_codes, len(labels),
+    )
+    pieces = []
+    for word, code in zip(words, codes.tolist()):
+        if pieces and pieces[-1]["code"] == code:
+            pieces[-1]["end"] = word["end"]
+            pieces[-1]["words"].append(word)
+        else:
+            pieces.append({"start": word["start"], "end": word["end"], "code": code, "words": [word]})
+    return Segments(
+        [p["start"] for p in pieces],
+        [p["end"] for p in pieces],
+        ["".join(w["word"] for w in p["words"]).strip() for p in pieces],
+        [labels[p["code"]] for p in pieces],
+        [p["words"] for p in pieces],
+    )
+
+
+def align(transcription: Segments | list[dict], diarization: Segments | list[dict], split_words: bool = True) -> Segments:
+    """Сопоставляет сегменты транскрипции с говорящими.
+
+    Returns:
+        Segments: Сегменты транскрипции по времени со столбцом speaker
+    """
+    transcription = Segments.coerce(transcription).sorted()
+    diarization = Segments.coerce(diarization)
+    labels, diar_codes = factorize(diarization.speaker.tolist() if diarization.speaker is not None else [])
+
+    codes = assign_speakers(transcription.start, transcription.end, diarization.start, diarization.end, diar_codes, len(labels))
+    speakers = object_array([labels[code] if code >= 0 else None for code in codes.tolist()])
+    aligned = transcription.with_speakers(speakers)
+
+    if not split_words or aligned.words is None or len(diarization) == 0:
+        return aligned
+
+    # Сегменты со словами заменяются кусками по смене говорящего, порядок сохраняется
+    parts = []
+    position = 0
+    for index, words in enumerate(aligned.words):
+        if words:
+            parts.append(aligned[position:index])
+            parts.append(split_by_words(words, diarization.start, diarization.end, diar_codes, labels))
+            position = index + 1
+    parts.append(aligned[position:])
+    return Segments.concatenate(parts)
@@ -1,13 +1,47 @@
 import os
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 class DiarizationConfig(BaseModel):
     checkpoint_path: str
     hf_token: str
+    device: str = "cpu"
 
 class TranscriptionConfig(BaseModel):
     type: str
     model_name: str
+    device: str = "cpu"
+    hf_token: str | None = None
+    # Источник разметки речи для GigaAM: pyannote | diarization.
+    # diarization экономит проход VAD, но транскрибация ждёт окончания диаризации
+    vad_source: str = "pyannote"
+    energy_threshold: float | None = None
+    # Ограничение размера батча GigaAM в отсчётах с учётом паддинга (по умолчанию 3 минуты)
+    batch_max_samples: int = 16000 * 180
+    # Long-form режим: перекрытие окон и зона поиска паузы перед границей окна
+    longform_overlap_seconds: float = 1.0
+    longform_search_seconds: float = 3.0
+    # Отметки времени слов (Whisper): сегменты делятся в местах смены говорящего
+    word_timestamps: bool = False
+    # Бэкенд инференса на CPU: torch_fp32 | torch_int8 | onnx | onnx_int8 (onnx — только GigaAM)
+    inference_backend: str = "torch_fp32"
+    # Потоки ONNX Runtime внутри оператора и между операторами; 0 — по умолчанию ORT
+    onnx_intra_op_threads: int = 0
+    onnx_inter_op_threads: int = 0
+    # Кеш экспортированных артефактов (ONNX), общий для воркеров одной машины
+    artifact_dir: str = "model_artifacts"
+
+    @validator("longform_overlap_seconds")
+    def check_longform_overlap(cls, value):
+        # Верхняя граница — длина окна модели, она проверяется при загрузке GigaAM
+        if value < 0:
+            raise ValueError(f"longform_overlap_seconds must be >= 0, got {value}")
+        return value
+
+    @validator("longform_search_seconds")
+    def check_longform_search(cls, value):
+        if value <= 0:
+            raise ValueError(f"longform_search_seconds must be > 0, got {value}")
+        return value
 
 class SummarizationConfig(BaseModel):
     model: str
@@ -15,9 +49,162 @@ class SummarizationConfig(BaseModel):
     temperature: float
     format: str
     prompt_path: str
-    
+    api_key: str = ""
+    # Иерархическая суммаризация: бюджет фрагмента в токенах, перекрытие в репликах
+    chunk_max_tokens: int = 6000
+    chunk_overlap_turns: int = 2
+    max_concurrency: int = 4
+    # Клиент LLM: таймаут запроса, повторы и потоковая выдача токенов
+    request_timeout: float = 300.0
+    max_retries: int = 3
+    stream: bool = True
+
+class CompactionConfig(BaseModel):
+    enabled: bool = True
+    # Заменять метки говорящих короткими псевдонимами S1, S2, ...
+    aliases: bool = True
+    # Списки слов-паразитов по языкам; None — встроенные списки
+    fillers: dict[str, list[str]] | None = None
+
+class ExecutionConfig(BaseModel):
+    # sequential | thread | process
+    mode: str = "thread"
+    max_workers: int = 2
+
+class ShardingConfig(BaseModel):
+    # Записи длиннее threshold_seconds делятся на шарды по shard_seconds
+    threshold_seconds: float = 3600.0
+    shard_seconds: float = 900.0
+    # Окно поиска паузы вокруг границы шарда
+    search_seconds: float = 30.0
+    # Порог косинусного расстояния при объединении говорящих разных шардов
+    speaker_threshold: float = 0.5
+
+    @validator("shard_seconds")
+    def check_shard_seconds(cls, value):
+        if value <= 0:
+            raise ValueError(f"shard_seconds must be > 0, got {value}")
+        return value
+
+    @validator("search_seconds")
+    def check_search_seconds(cls, value, values):
+        # Иначе точка разреза может оказаться не дальше начала шарда, и деление не продвинется
+        shard_seconds = values.get("shard_seconds")
+        if value < 0 or (shard_seconds is not None and value >= shard_seconds):
+            raise ValueError(f"search_seconds must be >= 0 and < shard_seconds ({shard_seconds}), got {value}")
+        return value
+
+class StreamingConfig(BaseModel):
+    # Энергетический VAD: кадр, абсолютный порог RMS и порог относительно уровня шума
+    frame_ms: int = 30
+    energy_threshold: float = 0.01
+    noise_ratio: float = 3.0
+    # Фрагмент закрывается после паузы min_silence_seconds или по длине max_segment_seconds,
+    # что ограничивает задержку строки диалога
+    min_speech_seconds: float = 0.3
+    min_silence_seconds: float = 0.5
+    max_segment_seconds: float = 10.0
+    pre_roll_seconds: float = 0.2
+    # Онлайн-назначение говорящих: косинусное расстояние до центроида и минимальная
+    # длина фрагмента, эмбеддинг которого уточняет центроид
+    speaker_threshold: float = 0.5
+    min_embedding_seconds: float = 1.0
+    embedding_checkpoint: str = "pyannote/wespeaker-voxceleb-resnet34-LM"
+    device: str = "cpu"
+    hf_token: str = ""
+
 def load_transcription_config(language: str) -> TranscriptionConfig:
+    device = os.getenv("DEVICE", "cpu")
+    hf_token = os.getenv("HF_TOKEN")
+    inference = dict(
+        onnx_intra_op_threads=int(os.getenv("ONNX_INTRA_OP_THREADS", "0")),
+        onnx_inter_op_threads=int(os.getenv("ONNX_INTER_OP_THREADS", "0")),
+        artifact_dir=os.getenv("ASR_ARTIFACT_DIR", "model_artifacts"),
+    )
     if language == "ru":
-        return TranscriptionConfig(type="gigaam", model_name=os.getenv("GIGAAM_MODEL_NAME"))
+        return TranscriptionConfig(
+            type="gigaam",
+            model_name=os.getenv("GIGAAM_MODEL_NAME"),
+            device=device,
+            hf_token=hf_token,
+            batch_max_samples=int(os.getenv("GIGAAM_BATCH_MAX_SAMPLES", 16000 * 180)),
+            vad_source=os.getenv("GIGAAM_VAD_SOURCE", "pyannote"),
+            energy_threshold=float(os.getenv("GIGAAM_ENERGY_THRESHOLD")) if os.getenv("GIGAAM_ENERGY_THRESHOLD") else None,
+            inference_backend=os.getenv("GIGAAM_INFERENCE_BACKEND", "torch_fp32"),
+            **inference,
+        )
     else:
-        return TranscriptionConfig(type="whisper", model_name=os.getenv("WHISPER_MODEL_NAME"))
\ No newline at end of file
+        return TranscriptionConfig(
+            type="whisper",
+            model_name=os.getenv("WHISPER_MODEL_NAME"),
+            device=device,
+            hf_token=hf_token,
+            word_timestamps=os.getenv("WHISPER_WORD_TIMESTAMPS", "false").lower() == "true",
+            inference_backend=os.getenv("WHISPER_INFERENCE_BACKEND", "torch_fp32"),
+            **inference,
+        )
+
+def load_diarization_config() -> DiarizationConfig:
+    return DiarizationConfig(
+        checkpoint_path=os.getenv("DIARIZATION_CHECKPOINT", "pyannote/speaker-diarization-3.1"),
+        hf_token=os.getenv("HF_TOKEN", ""),
+        device=os.getenv("DEVICE", "cpu"),
+    )
+
+def load_summarization_config() -> SummarizationConfig:
+    return SummarizationConfig(
+        model=os.getenv("LLM_MODEL", ""),
+        url=os.getenv("LLM_URL", ""),
+        temperature=float(os.getenv("LLM_TEMPERATURE", "0.2")),
+        format=os.getenv("LLM_FORMAT", "ollama"),
+        prompt_path=os.getenv("PROMPT_PATH", "prompt.json"),
+        api_key=os.getenv("OPENAI_API_KEY", ""),
+        chunk_max_tokens=int(os.getenv("LLM_CHUNK_MAX_TOKENS", "6000")),
+        chunk_overlap_turns=int(os.getenv("LLM_CHUNK_OVERLAP_TURNS", "2")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        request_timeout=float(os.getenv("LLM_TIMEOUT", "300")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        stream=os.getenv("LLM_STREAM", "true").lower() == "true",
+    )
+
+def load_compaction_config() -> CompactionConfig:
+    fillers = {}
+    for language in ("ru", "en"):
+        value = os.getenv(f"DIALOGUE_FILLERS_{language.upper()}")
+        if value is not None:
+            fillers[language] = [word.strip() for word in value.split(",") if word.strip()]
+    return CompactionConfig(
+        enabled=os.getenv("DIALOGUE_COMPACTION", "true").lower() == "true",
+        aliases=os.getenv("DIALOGUE_SPEAKER_ALIASES", "true").lower() == "true",
+        fillers=fillers or None,
+    )
+
+def load_execution_config() -> ExecutionConfig:
+    return ExecutionConfig(
+        mode=os.getenv("PIPELINE_EXECUTION_MODE", "thread"),
+        max_workers=int(os.getenv("PIPELINE_MAX_WORKERS", "2")),
+    )
+
+def load_sharding_config() -> ShardingConfig:
+    return ShardingConfig(
+        threshold_seconds=float(os.getenv("SHARD_THRESHOLD_SECONDS", "3600")),
+        shard_seconds=float(os.getenv("SHARD_SECONDS", "900")),
+        search_seconds=float(os.getenv("SHARD_SEARCH_SECONDS", "30")),
+        speaker_threshold=float(os.getenv("SHARD_SPEAKER_THRESHOLD", "0.5")),
+    )
+
+def load_streaming_config() -> StreamingConfig:
+    return StreamingConfig(
+        frame_ms=int(os.getenv("STREAM_FRAME_MS", "30")),
+        energy_threshold=float(os.getenv("STREAM_ENERGY_THRESHOLD", "0.01")),
+        noise_ratio=float(os.getenv("STREAM_NOISE_RATIO", "3.0")),
+        min_speech_seconds=float(os.getenv("STREAM_MIN_SPEECH_SECONDS", "0.3")),
+        min_silence_seconds=float(os.getenv("STREAM_MIN_SILENCE_SECONDS", "0.5")),
+        max_segment_seconds=float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", "10")),
+        pre_roll_seconds=float(os.getenv("STREAM_PRE_ROLL_SECONDS", "0.2")),
+        speaker_threshold=float(os.getenv("STREAM_SPEAKER_THRESHOLD", "0.5")),
+        min_embedding_seconds=float(os.getenv("STREAM_MIN_EMBEDDING_SECONDS", "1.0")),
+        embedding_checkpoint=os.getenv("STREAM_EMBEDDING_CHECKPOINT", "pyannote/wespeaker-voxceleb-resnet34-LM"),
+        device=os.getenv("DEVICE", "cpu"),
+        hf_token=os.getenv("HF_TOKEN", ""),
+    )
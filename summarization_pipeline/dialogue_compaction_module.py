@@ -0,0 +1,101 @@
+import re
+
+from summarization_module import estimate_tokens
+
+# Без однобуквенных "э"/"м" и "мм"/"mm": это и единицы измерения ("5 м", "3 мм")
+DEFAULT_FILLERS = {
+    "ru": ["ээ", "эээ", "эм", "ммм", "хм", "ну вот", "как бы", "типа", "короче", "в общем", "это самое", "так сказать", "скажем так"],
+    "en": ["uh", "uhh", "um", "umm", "erm", "er", "ah", "hmm", "you know", "i mean", "kind of like", "sort of like"],
+}
+
+LINE_PATTERN = re.compile(r"^#(.+?)#: ?(.*)$")
+# Повторы слова подряд ("я я я думаю") — типичная запинка и артефакт склейки окон ASR.
+# Сравниваются только целые слова: "что что-то" — не повтор
+REPEAT_PATTERN = re.compile(r"(?<![\w-])(\w+)(?:[\s,]+\1)+(?![\w-])", re.IGNORECASE)
+SPACES_PATTERN = re.compile(r"\s+")
+PUNCTUATION_CLEANUP_PATTERN = re.compile(r"\s+([,.!?;:])|^[\s,.;:]+|([,;:])(?=\s*[,.!?;:])")
+
+
+class DialogueCompactionModule:
+    """Сжатие диалога перед суммаризацией.
+
+    Сливает подряд идущие реплики одного говорящего, заменяет метки
+    псевдонимами, убирает слова-паразиты и текст, продублированный на стыке
+    сегментов. Порядок смены говорящих сохраняется: реплика, состоящая
+    только из паразитов, остаётся без изменений.
+    """
+
+    def __init__(self, config, language: str | None = None):
+        self.config = config
+        fillers = config.fillers or DEFAULT_FILLERS
+        # Язык не задан — чистим по всем спискам
+        words = fillers.get(language, []) if language in fillers else [w for ws in fillers.values() for w in ws]
+        # Длинные выражения первыми, чтобы "ну вот" не разбивалось на части
+        alternatives = "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+        self.filler_pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)[,]?", re.IGNORECASE) if alternatives else None
+
+    @staticmethod
+    def parse_turns(dialogue: str) -> list[tuple[str, str]]:
+        turns = []
+        for line in dialogue.splitlines():
+            match = LINE_PATTERN.match(line)
+            if match:
+                turns.append((match.group(1), match.group(2).strip()))
+            elif line.strip() and turns:
+                # Строка без метки продолжает предыдущую реплику
+                speaker, text = turns[-1]
+                turns[-1] = (speaker, f"{text} {line.strip()}")
+        return turns
+
+    @staticmethod
+    def merge_text(left: str, right: str, max_words: int = 8) -> str:
+        """Склеивает соседние фрагменты, убирая повтор конца левого в начале правого."""
+        if not left:
+            return right
+        left_words = left.split()
+        right_words = right.split()
+        normalize = lambda words: [w.strip(",.!?;:").lower() for w in words]
+        if normalize(right_words) == normalize(left_words[-len(right_words):]):
+            return left
+        for size in range(min(max_words, len(left_words), len(right_words)), 1, -1):
+            if normalize(left_words[-size:]) == normalize(right_words[:size]):
+                right_words = right_words[size:]
+                break
+        return " ".join([left] + right_words) if right_words else left
+
+    def clean_text(self, text: str) -> str:
+        cleaned = text
+        if self.filler_pattern is not None:
+            cleaned = self.filler_pattern.sub(" ", cleaned)
+        cleaned = REPEAT_PATTERN.sub(r"\1", cleaned)
+        cleaned = PUNCTUATION_CLEANUP_PATTERN.sub(lambda m: m.group(1) or "", cleaned)
+        cleaned = SPACES_PATTERN.sub(" ", cleaned).strip()
+        if not re.search(r"\w", cleaned):
+            return text
+        return cleaned[0].upper() + cleaned[1:] if text[:1].isupper() else cleaned
+
+    def compact(self, dialogue: str) -> tuple[str, dict]:
+        """Возвращает сжатый диалог и статистику (токены и реплики до/после, псевдонимы)."""
+        turns = self.parse_turns(dialogue)
+        merged = []
+        for speaker, text in turns:
+            if merged and merged[-1][0] == speaker:
+                merged[-1] = (speaker, self.merge_text(merged[-1][1], text))
+            else:
+                merged.append((speaker, text))
+
+        aliases = {}
+        for speaker, _ in merged:
+            if speaker not in aliases:
+                aliases[speaker] = f"S{len(aliases) + 1}" if self.config.aliases else speaker
+
+        lines = [f"#{aliases[speaker]}#: {self.clean_text(text)}" for speaker, text in merged]
+        compacted = "\n".join(lines)
+        stats = {
+            "input_tokens": estimate_tokens(dialogue),
+            "output_tokens": estimate_tokens(compacted),
+            "input_turns": len(turns),
+            "output_turns": len(lines),
+            "aliases": aliases,
+        }
+        return compacted, stats
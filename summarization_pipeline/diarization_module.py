@@ -1,24 +1,83 @@
-from pyannote.audio import Pipeline
-import torch
+import numpy as np
+
+from model_registry import model_registry
+from file_ingestion_module import PreprocessedAudio, load_audio
+from segments import Segments
 
 class DiarizationModule:
     def __init__(self, config):
+        self.diarization_pipeline = model_registry.get(
+            ("diarization", config.checkpoint_path, config.device),
+            lambda: self.load_pipeline(config),
+        )
+
+    @staticmethod
+    def load_pipeline(config):
+        # pyannote и torch импортируются при загрузке модели: процессам без диаризации они не нужны
+        import torch
+        from pyannote.audio import Pipeline
 
-        self.diarization_pipeline = Pipeline.from_pretrained(
+        pipeline = Pipeline.from_pretrained(
             checkpoint_path=config.checkpoint_path,
             use_auth_token=config.hf_token)
-        self.diarization_pipeline.to(torch.device(config.device))
+        pipeline.to(torch.device(config.device))
+        return pipeline
 
-    def diarize(self, audio_path: str, num_speakers: int | None = None) -> list[dict]:
-        diarization = self.diarization_pipeline(audio_path, num_speakers)
+    def diarize(self, audio: PreprocessedAudio | str, num_speakers: int | None = None) -> Segments:
+        diarization = self.diarization_pipeline(load_audio(audio).to_pyannote(), num_speakers=num_speakers)
         return self.format_diarization(diarization)
+
+    def diarize_with_embeddings(self, audio: PreprocessedAudio | str, num_speakers: int | None = None) -> tuple[Segments, dict]:
+        """Диаризация с эмбеддингами говорящих для сведения шардов.
+
+        Returns:
+            tuple: (сегменты диаризации, {метка говорящего: эмбеддинг})
+        """
+        diarization, embeddings = self.diarization_pipeline(
+            load_audio(audio).to_pyannote(), num_speakers=num_speakers, return_embeddings=True
+        )
+        speaker_embeddings = {
+            label: embeddings[index].tolist()
+            for index, label in enumerate(diarization.labels())
+        }
+        return self.format_diarization(diarization), speaker_embeddings
     
-    def format_diarization(self, diarization: list[dict]) -> list[dict]:
-        formatted_diarization = []
-        for segment, track in diarization._tracks.items():
-            formatted_diarization.append({
-                "start": segment.start,
-                "end": segment.end,
-                "speacker_id": list(track.values())[0]
-            })
-        return formatted_diarization
\ No newline at end of file
+    @staticmethod
+    def speech_timeline(diarization_segments: Segments) -> Segments:
+        """Разметка речи: объединение сегментов всех говорящих.
+
+        Используется транскрибацией вместо отдельного прогона VAD, так что
+        сегментация по файлу выполняется один раз.
+        """
+        return diarization_segments.union()
+
+    def format_diarization(self, diarization) -> Segments:
+        tracks = list(diarization._tracks.items())
+        return Segments(
+            [segment.start for segment, _ in tracks],
+            [segment.end for segment, _ in tracks],
+            speaker=[list(track.values())[0] for _, track in tracks],
+        )
+
+
+class SpeakerEmbeddingModule:
+    """Эмбеддинг говорящего по целому фрагменту для онлайн-назначения в потоковом режиме."""
+
+    def __init__(self, config):
+        self.inference = model_registry.get(
+            ("speaker_embedding", config.embedding_checkpoint, config.device),
+            lambda: self.load_inference(config),
+        )
+
+    @staticmethod
+    def load_inference(config):
+        import torch
+        from pyannote.audio import Inference, Model
+
+        model = Model.from_pretrained(config.embedding_checkpoint, use_auth_token=config.hf_token or None)
+        inference = Inference(model, window="whole")
+        inference.to(torch.device(config.device))
+        return inference
+
+    def embed(self, audio: PreprocessedAudio) -> np.ndarray:
+        return np.asarray(self.inference(audio.to_pyannote()), dtype=np.float32).reshape(-1)
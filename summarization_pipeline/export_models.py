@@ -0,0 +1,60 @@
+"""Экспорт и кеш артефактов моделей ASR для бэкендов инференса.
+
+Запуск (из каталога summarization_pipeline, с теми же переменными окружения, что у воркера):
+    python export_models.py --languages ru --backends onnx,onnx_int8
+    python export_models.py --languages ru,en --backends torch_int8,onnx --force
+
+ONNX-артефакты пишутся в ASR_ARTIFACT_DIR; воркеры, загружая модель с тем
+же бэкендом, берут их оттуда и не тратят время на экспорт при старте.
+torch_int8 квантуется при загрузке за секунды и на диск не пишется:
+для него инструмент только проверяет загрузку и печатает размер модели.
+Неподдерживаемые сочетания (onnx для Whisper) пропускаются.
+"""
+import argparse
+import json
+import os
+import time
+
+from config import load_transcription_config
+from inference_backends import INFERENCE_BACKENDS, ONNX_BACKENDS, artifact_path, check_backend, load_onnx_session
+from model_registry import estimate_model_size_mb
+from transcription_module import load_backend
+
+
+def export(language: str, backend: str, force: bool = False) -> dict:
+    config = load_transcription_config(language).copy(update={"inference_backend": backend})
+    module_class = load_backend(config.type)
+    result = {"language": language, "type": config.type, "model_name": config.model_name, "backend": backend}
+    try:
+        check_backend(config, getattr(module_class, "SUPPORTED_BACKENDS", INFERENCE_BACKENDS))
+    except ValueError as e:
+        return {**result, "skipped": str(e)}
+
+    path = artifact_path(config, "encoder") if backend in ONNX_BACKENDS else None
+    if path and force and os.path.exists(path):
+        os.remove(path)
+    cached = bool(path) and os.path.exists(path)
+    started = time.perf_counter()
+    model = module_class.load_model(config)
+    result.update(cached=cached, seconds=round(time.perf_counter() - started, 3), model_mb=round(estimate_model_size_mb(model), 1))
+    if path:
+        # Сессия создаётся для проверки, что артефакт читается ONNX Runtime
+        load_onnx_session(path, config)
+        result.update(artifact=path, artifact_mb=round(os.path.getsize(path) / (1024 * 1024), 1))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--languages", default="ru", help="Языки моделей, например ru,en")
+    parser.add_argument("--backends", default="onnx,onnx_int8", help=f"Бэкенды из {', '.join(INFERENCE_BACKENDS)}")
+    parser.add_argument("--force", action="store_true", help="Экспортировать заново, даже если артефакт есть")
+    args = parser.parse_args()
+
+    for language in args.languages.split(","):
+        for backend in args.backends.split(","):
+            print(json.dumps(export(language.strip(), backend.strip(), args.force), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
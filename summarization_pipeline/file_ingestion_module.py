@@ -1,40 +1,178 @@
 import os
+import struct
+import time
+import resource
+
+import numpy as np
 from pydub import AudioSegment
 # import librosa
 # import soundfile as sf
 
 SUPPORTED_FORMATS = [".mp3", ".wav", ".m4a", ".flac", ".ogg", ".mp4"]
+TARGET_SAMPLE_RATE = 16000
+
+# WAVE_FORMAT_IEEE_FLOAT, 32 бита на отсчёт
+_WAV_FLOAT_FORMAT = 3
+_WAV_HEADER_SIZE = 58
+
+
+def write_float_wav(path: str, samples: np.ndarray, sample_rate: int) -> None:
+    """Записывает моно float32 WAV одним проходом."""
+    samples = np.asarray(samples, dtype="<f4")
+    data_size = samples.nbytes
+    with open(path, "wb") as f:
+        f.write(b"RIFF")
+        f.write(struct.pack("<I", _WAV_HEADER_SIZE - 8 + data_size))
+        f.write(b"WAVE")
+        # fmt-чанк с cbSize = 0, как требует формат IEEE float
+        f.write(b"fmt ")
+        f.write(struct.pack("<IHHIIHHH", 18, _WAV_FLOAT_FORMAT, 1, sample_rate, sample_rate * 4, 4, 32, 0))
+        f.write(b"fact")
+        f.write(struct.pack("<II", 4, len(samples)))
+        f.write(b"data")
+        f.write(struct.pack("<I", data_size))
+        samples.tofile(f)
+
+
+def find_silence_point(waveform, start: int, end: int, frame_size: int = 400) -> tuple[int, float]:
+    """Ищет самый тихий кадр в диапазоне [start, end).
+
+    Returns:
+        tuple: (индекс отсчёта в центре кадра, RMS-энергия кадра)
+    """
+    region = np.asarray(waveform[start:end], dtype=np.float32)
+    num_frames = len(region) // frame_size
+    if num_frames == 0:
+        return end, float("inf")
+    frames = region[:num_frames * frame_size].reshape(num_frames, frame_size)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    quietest = int(np.argmin(energy))
+    return start + quietest * frame_size + frame_size // 2, float(energy[quietest])
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса в мегабайтах."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PreprocessedAudio:
+    """Результат предобработки: моно float32 16 кГц.
+
+    waveform отображён в память из WAV-файла на диске, поэтому стадии,
+    которым нужен путь, используют path, а остальные читают буфер без
+    повторного декодирования.
+    """
+
+    def __init__(self, path: str, sample_rate: int = TARGET_SAMPLE_RATE, decode_seconds: float = 0.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.decode_seconds = decode_seconds
+        self.waveform = self._open_memmap(path)
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE) -> "PreprocessedAudio":
+        """Буфер в памяти без файла: фрагменты потокового режима."""
+        audio = cls.__new__(cls)
+        audio.path = None
+        audio.sample_rate = sample_rate
+        audio.decode_seconds = 0.0
+        audio.waveform = np.asarray(samples, dtype=np.float32)
+        return audio
+
+    @staticmethod
+    def _open_memmap(path: str) -> np.ndarray:
+        with open(path, "rb") as f:
+            header = f.read(_WAV_HEADER_SIZE)
+        if header[:4] != b"RIFF" or header[38:42] != b"fact" or header[50:54] != b"data":
+            raise ValueError(f"Not a preprocessed float32 WAV: {path}")
+        (data_size,) = struct.unpack("<I", header[54:58])
+        return np.memmap(path, dtype="<f4", mode="r", offset=_WAV_HEADER_SIZE, shape=(data_size // 4,))
+
+    @property
+    def duration(self) -> float:
+        return len(self.waveform) / self.sample_rate
+
+    def as_tensor(self):
+        """Тензор формы (1, T) без копирования данных."""
+        import torch
+        return torch.from_numpy(np.asarray(self.waveform)).unsqueeze(0)
+
+    def to_pyannote(self) -> dict:
+        """Входные данные для pyannote-пайплайнов в памяти."""
+        return {"waveform": self.as_tensor(), "sample_rate": self.sample_rate}
+
+    def stats(self) -> dict:
+        return {
+            "duration": round(self.duration, 3),
+            "decode_seconds": round(self.decode_seconds, 3),
+            "decode_seconds_per_hour": round(self.decode_seconds / max(self.duration, 1e-9) * 3600, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+    def release(self) -> None:
+        """Освобождает буфер и удаляет временный WAV."""
+        self.waveform = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # При передаче в дочерний процесс пересоздаём memmap вместо копирования буфера
+    def __getstate__(self):
+        return {"path": self.path, "sample_rate": self.sample_rate, "decode_seconds": self.decode_seconds}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["sample_rate"], state["decode_seconds"])
+
+
+def load_audio(audio) -> PreprocessedAudio:
+    """Принимает PreprocessedAudio или путь к файлу."""
+    if isinstance(audio, PreprocessedAudio):
+        return audio
+    try:
+        return PreprocessedAudio(audio)
+    except ValueError:
+        return FileIngestionModule.preprocess_audio(audio)
+
 
 class FileIngestionModule:
     @staticmethod
-    def preprocess_audio(file_path: str) -> str:
-        """Предварительная обработка аудио"""
+    def preprocess_audio(file_path: str, output_path: str | None = None) -> PreprocessedAudio:
+        """Предварительная обработка аудио за одно декодирование.
+
+        decode -> mono -> normalize -> 16 kHz -> float32 WAV (memmap).
+        """
         if not FileIngestionModule.is_supported_format(file_path):
             raise ValueError(f"Unsupported file format: {file_path}")
-        
-        file_path = FileIngestionModule.convert_to_wav(file_path)
-        normalized_path = FileIngestionModule.normalize_volume(file_path)
-        resampled_path = FileIngestionModule.resample_audio(normalized_path)
-        return resampled_path   
-        
-    def is_supported_format(self, file_path: str) -> bool:
+
+        started = time.perf_counter()
+        audio = AudioSegment.from_file(file_path)
+        audio = audio.set_channels(1).normalize().set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+        samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+        del audio
+
+        output_path = output_path or os.path.splitext(file_path)[0] + "_16k.wav"
+        write_float_wav(output_path, samples.astype(np.float32) / 32768.0, TARGET_SAMPLE_RATE)
+        del samples
+        return PreprocessedAudio(output_path, TARGET_SAMPLE_RATE, time.perf_counter() - started)
+
+    @staticmethod
+    def is_supported_format(file_path: str) -> bool:
         """Проверка, поддерживается ли формат."""
         return any(file_path.endswith(ext) for ext in SUPPORTED_FORMATS)
-    
+
     def convert_to_wav(self, file_path: str) -> str:
         """Конвертация в WAV 16kHz mono"""
         if not self.is_supported_format(file_path):
             raise ValueError(f"Unsupported file format: {file_path}")
-        
+
         # Конвертация в WAV
         wav_path = file_path.replace(os.path.splitext(file_path)[1], '.wav')
         audio = AudioSegment.from_file(file_path)
         audio.export(wav_path, format="wav")
         return wav_path
-    
+
     def get_audio_metadata(self, file_path: str) -> dict:
         """Извлекает метаданные: длительность, частота, каналы и т.д."""
-        
+
         audio = AudioSegment.from_file(file_path)
         return {
             "duration": len(audio) / 1000,
@@ -44,14 +182,14 @@ class FileIngestionModule:
 
     def normalize_volume(self, audio_path: str) -> str:
         """Нормализация уровня громкости."""
-        
+
         audio = AudioSegment.from_file(audio_path)
         audio = audio.normalize()
         return audio_path
-        
+
     def resample_audio(self, audio_path: str, target_sr: int = 16000) -> str:
         """Ресемплирование аудио до нужной частоты."""
         audio = AudioSegment.from_wav(audio_path)
         resampled_audio = audio.set_frame_rate(target_sr)
         resampled_audio.export(audio_path, format="wav")
-        return audio_path
\ No newline at end of file
+        return audio_path
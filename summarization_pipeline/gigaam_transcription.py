@@ -0,0 +1,243 @@
+import os
+
+import gigaam
+import torch
+from pyannote.audio import Pipeline
+
+from model_registry import model_registry
+from file_ingestion_module import PreprocessedAudio, load_audio, find_silence_point
+from inference_backends import INFERENCE_BACKENDS, ONNX_BACKENDS, artifact_path, check_backend, export_onnx, load_onnx_session, quantize_int8
+from segments import Segments
+from transcription_module import TranscriptionModule, stitch_overlap
+
+VAD_CHECKPOINT = "pyannote/voice-activity-detection"
+# Длина тишины для трассировки энкодера при экспорте; длина по времени и батч — динамические оси
+EXPORT_SAMPLE_SECONDS = 4
+
+
+def export_encoder(model, path: str, quantize: bool = False) -> str:
+    """Экспорт энкодера GigaAM в ONNX: признаки и декодирование остаются в torch."""
+    waveform = torch.zeros(1, 16000 * EXPORT_SAMPLE_SECONDS)
+    with torch.no_grad():
+        features, feature_lengths = model.preprocessor(waveform, torch.tensor([waveform.shape[1]]))
+    return export_onnx(
+        model.encoder, (features, feature_lengths), path,
+        input_names=["features", "feature_lengths"],
+        output_names=["encoded", "encoded_lengths"],
+        dynamic_axes={
+            "features": {0: "batch", 2: "frames"},
+            "feature_lengths": {0: "batch"},
+            "encoded": {0: "batch", 2: "steps"},
+            "encoded_lengths": {0: "batch"},
+        },
+        quantize=quantize,
+    )
+
+
+class GigaamTranscriptionModule(TranscriptionModule):
+    def __init__(self, config):
+        check_backend(config, INFERENCE_BACKENDS)
+        self.model = model_registry.get(
+            ("gigaam", config.model_name, config.device, config.inference_backend),
+            lambda: self.load_model(config),
+        )
+        # Энкодер в ONNX Runtime; артефакт уже экспортирован загрузкой модели
+        self.encoder_session = None
+        if config.inference_backend in ONNX_BACKENDS:
+            path = artifact_path(config, "encoder")
+            self.encoder_session = model_registry.get(
+                ("gigaam-onnx", path, config.onnx_intra_op_threads, config.onnx_inter_op_threads),
+                lambda: load_onnx_session(path, config),
+                size_mb=os.path.getsize(path) / (1024 * 1024),
+            )
+        self.energy_threshold = config.energy_threshold
+        self.batch_max_samples = config.batch_max_samples
+        self.longform_overlap = int(config.longform_overlap_seconds * 16000)
+        self.longform_search = int(config.longform_search_seconds * 16000)
+        # Иначе окно split_longform не сдвигается вперёд и цикл не завершается
+        if not 0 <= self.longform_overlap < self.model.LONGFORM_THRESHOLD:
+            raise ValueError(
+                f"longform_overlap_seconds={config.longform_overlap_seconds} must be less than "
+                f"the model window of {self.model.LONGFORM_THRESHOLD / 16000:g} seconds"
+            )
+        if self.longform_search <= 0:
+            raise ValueError(f"longform_search_seconds={config.longform_search_seconds} is shorter than one sample")
+        self.config = config
+        # Отдельная VAD-модель загружается только если разметку речи не даёт диаризация
+        self.pipeline = None
+        if config.vad_source == "pyannote":
+            self.pipeline = self.load_vad_pipeline()
+
+        os.makedirs("temp_chunks", exist_ok=True)
+
+    @staticmethod
+    def load_model(config):
+        model = gigaam.load_model(config.model_name, device=config.device)
+        if config.inference_backend == "torch_int8":
+            return quantize_int8(model)
+        if config.inference_backend in ONNX_BACKENDS:
+            path = artifact_path(config, "encoder")
+            if not os.path.exists(path):
+                export_encoder(model, path, quantize=config.inference_backend == "onnx_int8")
+            # Энкодер исполняет ONNX Runtime: веса torch-копии не нужны
+            model.encoder = None
+        return model
+
+    def load_vad_pipeline(self) -> Pipeline:
+        return model_registry.get(
+            ("vad", VAD_CHECKPOINT, self.config.device),
+            lambda: Pipeline.from_pretrained(VAD_CHECKPOINT, use_auth_token=self.config.hf_token).to(torch.device(self.config.device)),
+        )
+
+    def transcribe(self, audio: PreprocessedAudio | str, speech_timeline: Segments | None = None) -> Segments:
+        audio = load_audio(audio)
+        if speech_timeline is not None:
+            waveform = audio.as_tensor()[0]
+            sr = audio.sample_rate
+            active_segments = [
+                {"start": int(start * sr), "end": int(end * sr)}
+                for start, end in zip(speech_timeline.start.tolist(), speech_timeline.end.tolist())
+            ]
+        else:
+            waveform, sr, active_segments = self.vad(audio)
+
+        # Длинные сегменты режутся на окна, и все куски распознаются общими батчами
+        pieces = []
+        for segment_index, segment in enumerate(active_segments):
+            if segment["end"] - segment["start"] > self.model.LONGFORM_THRESHOLD:
+                windows = self.split_longform(waveform, segment["start"], segment["end"])
+            else:
+                windows = [(segment["start"], segment["end"])]
+            for start, end in windows:
+                pieces.append({"segment": segment_index, "start": start, "end": end})
+
+        texts = self.transcribe_batched([waveform[p["start"]:p["end"]] for p in pieces])
+        for piece, text in zip(pieces, texts):
+            piece["transcription"] = text
+
+        pieces_by_segment = {}
+        for piece in pieces:
+            pieces_by_segment.setdefault(piece["segment"], []).append(piece)
+
+        chunks = []
+        for segment_pieces in pieces_by_segment.values():
+            for piece in self.merge_longform(segment_pieces):
+                chunks.append({
+                    "start": piece["start"] / sr,
+                    "end": piece["end"] / sr,
+                    "transcription": piece["transcription"]
+                })
+
+        return self.format_transcription(chunks)
+
+    def split_longform(self, waveform: torch.Tensor, start: int, end: int) -> list[tuple[int, int]]:
+        """Делит длинный сегмент на окна не длиннее LONGFORM_THRESHOLD.
+
+        Граница окна ставится в самую тихую точку перед лимитом, если её энергия
+        ниже energy_threshold; иначе окна перекрываются на longform_overlap.
+        """
+        max_size = self.model.LONGFORM_THRESHOLD
+        windows = []
+        position = start
+        while end - position > max_size:
+            limit = position + max_size
+            search_from = max(position + 1, limit - self.longform_search)
+            cut, energy = find_silence_point(waveform, search_from, limit)
+            if self.energy_threshold is not None and energy <= self.energy_threshold:
+                windows.append((position, cut))
+                position = cut
+            else:
+                windows.append((position, limit))
+                position = limit - self.longform_overlap
+        windows.append((position, end))
+        return windows
+
+    @staticmethod
+    def merge_longform(pieces: list[dict]) -> list[dict]:
+        """Склеивает соседние окна, убирая текст, распознанный дважды в перекрытии.
+
+        Время перекрытия делится пополам между окнами, чтобы интервалы не пересекались.
+        """
+        merged = []
+        for piece in pieces:
+            piece = dict(piece)
+            if merged and piece["start"] < merged[-1]["end"]:
+                previous = merged[-1]
+                previous["transcription"], piece["transcription"] = stitch_overlap(
+                    previous["transcription"], piece["transcription"]
+                )
+                middle = (piece["start"] + previous["end"]) // 2
+                previous["end"] = middle
+                piece["start"] = middle
+            merged.append(piece)
+        return [piece for piece in merged if piece["transcription"]]
+
+    def make_batches(self, lengths: list[int]) -> list[list[int]]:
+        """Группирует индексы сегментов в батчи близкой длины.
+
+        Сегменты сортируются по длине, и батч растёт, пока размер
+        с учётом паддинга (max_len * batch_size) не превысит batch_max_samples.
+        """
+        batches = []
+        current = []
+        for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            # Индексы отсортированы по длине, поэтому текущий сегмент — самый длинный в батче
+            if current and lengths[index] * (len(current) + 1) > self.batch_max_samples:
+                batches.append(current)
+                current = []
+            current.append(index)
+        if current:
+            batches.append(current)
+        return batches
+
+    def transcribe_batched(self, segments: list[torch.Tensor]) -> list[str]:
+        """Распознаёт список одномерных сегментов, возвращая тексты в исходном порядке."""
+        texts = [""] * len(segments)
+        for batch_indices in self.make_batches([len(segment) for segment in segments]):
+            batch_texts = self.run_batch([segments[i] for i in batch_indices])
+            for index, text in zip(batch_indices, batch_texts):
+                texts[index] = text
+        return texts
+
+    def run_batch(self, segments: list[torch.Tensor]) -> list[str]:
+        """Один forward/decode для батча сегментов с паддингом нулями."""
+        lengths = torch.tensor([len(segment) for segment in segments], device=self.model._device)
+        batch = torch.nn.utils.rnn.pad_sequence(list(segments), batch_first=True)
+        batch = batch.to(self.model._device).to(self.model._dtype)
+        with torch.inference_mode():
+            if self.encoder_session is None:
+                encoded, encoded_len = self.model.forward(batch, lengths)
+            else:
+                encoded, encoded_len = self.run_onnx_encoder(batch, lengths)
+            return self.model.decoding.decode(self.model.head, encoded, encoded_len)
+
+    def run_onnx_encoder(self, batch: torch.Tensor, lengths: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        features, feature_lengths = self.model.preprocessor(batch, lengths)
+        encoded, encoded_len = self.encoder_session.run(None, {
+            "features": features.float().cpu().numpy(),
+            "feature_lengths": feature_lengths.cpu().numpy(),
+        })
+        return torch.from_numpy(encoded), torch.from_numpy(encoded_len)
+
+    def vad(self, audio: PreprocessedAudio) -> tuple[torch.Tensor, int, list[dict]]:
+        if self.pipeline is None:
+            self.pipeline = self.load_vad_pipeline()
+        # pyannote получает уже декодированный буфер, повторного чтения файла нет
+        vad_result = self.pipeline(audio.to_pyannote())
+
+        waveform = audio.as_tensor()
+        sr = audio.sample_rate
+
+        # Преобразуем сегменты в list[dict]
+        speech_segments = []
+        for turn in vad_result.get_timeline().support():
+            speech_segments.append({
+                "start": int(turn.start * sr),
+                "end": int(turn.end * sr)
+            })
+
+        return waveform[0], sr, speech_segments
+
+    
+    def format_transcription(self, transcription_segments: list[dict]) -> Segments:
+        return Segments.from_records(transcription_segments)
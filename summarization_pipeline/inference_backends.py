@@ -0,0 +1,92 @@
+import inspect
+import json
+import os
+import re
+import time
+
+# Бэкенды инференса ASR на CPU:
+#   torch_fp32 — исходная модель PyTorch;
+#   torch_int8 — динамическое int8-квантование Linear-слоёв при загрузке;
+#   onnx / onnx_int8 — тяжёлая часть модели в ONNX Runtime (артефакт экспортируется один раз и кешируется)
+INFERENCE_BACKENDS = ("torch_fp32", "torch_int8", "onnx", "onnx_int8")
+ONNX_BACKENDS = ("onnx", "onnx_int8")
+ONNX_OPSET = 17
+
+
+def check_backend(config, supported: tuple[str, ...]) -> None:
+    if config.inference_backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {config.inference_backend}")
+    if config.inference_backend not in supported:
+        raise ValueError(f"Inference backend {config.inference_backend} is not supported for {config.type}")
+    if config.inference_backend != "torch_fp32" and config.device != "cpu":
+        raise ValueError(f"Inference backend {config.inference_backend} requires device=cpu, got {config.device}")
+
+
+def artifact_path(config, part: str) -> str:
+    """Путь кешированного артефакта: модель, бэкенд и часть модели входят в имя файла."""
+    model_name = re.sub(r"[^\w.-]+", "_", config.model_name)
+    return os.path.join(config.artifact_dir, f"{config.type}-{model_name}-{part}-{config.inference_backend}.onnx")
+
+
+def quantize_int8(model):
+    """Динамическое int8-квантование весов Linear; активации квантуются на лету."""
+    import torch
+
+    # Подклассы nn.Linear (например, в Whisper) квантование пропускает: заменяем на обычные
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(parent, name, linear)
+    # На месте: копия модели удвоила бы пиковую память при загрузке
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def export_onnx(module, inputs: tuple, path: str, input_names: list[str], output_names: list[str], dynamic_axes: dict, quantize: bool = False) -> str:
+    """Экспортирует модуль в ONNX (и при quantize — в int8) атомарно, рядом пишет метаданные."""
+    import torch
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    started = time.perf_counter()
+    # Временные файлы свои у каждого процесса: параллельный экспорт не смешает записи
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fp32_path = f"{tmp_path}.fp32" if quantize else tmp_path
+    # Новые версии torch по умолчанию используют dynamo-экспортёр с другим описанием динамических осей
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            module.eval(), inputs, fp32_path, input_names=input_names, output_names=output_names,
+            dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET, **options,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    # Читатели видят только полностью записанный файл
+    os.replace(tmp_path, path)
+    with open(f"{path}.json", "w") as f:
+        json.dump({
+            "torch": torch.__version__,
+            "opset": ONNX_OPSET,
+            "quantized": quantize,
+            "export_seconds": round(time.perf_counter() - started, 3),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    return path
+
+
+def load_onnx_session(path: str, config):
+    """Сессия ONNX Runtime на CPU с потоками из конфига (0 — по умолчанию ORT)."""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = config.onnx_intra_op_threads
+    options.inter_op_num_threads = config.onnx_inter_op_threads
+    if config.onnx_inter_op_threads > 1:
+        # Потоки между операторами работают только в параллельном режиме исполнения графа
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+    return onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
@@ -0,0 +1,153 @@
+import cProfile
+import contextlib
+import io
+import os
+import pstats
+import resource
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:  # метрики необязательны: без prometheus_client пишутся только тайминги задачи
+    Counter = Histogram = None
+
+# Границы гистограмм: от долей секунды (короткие стадии) до часов (ASR длинных записей)
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+RSS_BUCKETS = (-512, -128, -32, 0, 16, 64, 128, 256, 512, 1024, 2048, 4096)
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Время стадии пайплайна", ["stage"], buckets=SECONDS_BUCKETS)
+    STAGE_RTF = Histogram("pipeline_stage_realtime_factor", "Время стадии на секунду аудио", ["stage"], buckets=RTF_BUCKETS)
+    STAGE_RSS_DELTA = Histogram("pipeline_stage_rss_delta_mb", "Изменение RSS процесса за стадию", ["stage"], buckets=RSS_BUCKETS)
+    AUDIO_SECONDS = Counter("pipeline_audio_seconds", "Обработано секунд аудио", ["stage"])
+    LLM_TOKENS = Counter("pipeline_llm_tokens", "Токены LLM (оценка по длине текста)", ["kind"])
+    STAGE_FAILURES = Counter("pipeline_stage_failures", "Стадии, завершившиеся исключением", ["stage"])
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса; без /proc — пиковый (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def observe_tokens(prompt_tokens: int, completion_tokens: int) -> None:
+    if Histogram is not None:
+        LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels("completion").inc(completion_tokens)
+
+
+class StageTimings:
+    """Тайминги стадий одной задачи: длительность, секунды аудио, RTF, изменение RSS.
+
+    Повторный замер стадии (например, шарды) суммирует время и аудио.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, stage: str, audio_seconds: float | None = None):
+        """Замер блока; длительность аудио, известную только после стадии, можно задать в info."""
+        info = {"audio_seconds": audio_seconds}
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        try:
+            yield info
+        except BaseException:
+            if Histogram is not None:
+                STAGE_FAILURES.labels(stage).inc()
+            raise
+        self.record(stage, time.perf_counter() - started, info["audio_seconds"], rss_mb() - rss_before)
+
+    def record(self, stage: str, seconds: float, audio_seconds: float | None = None, rss_delta_mb: float = 0.0) -> None:
+        if Histogram is not None:
+            STAGE_SECONDS.labels(stage).observe(seconds)
+            STAGE_RSS_DELTA.labels(stage).observe(rss_delta_mb)
+            if audio_seconds:
+                AUDIO_SECONDS.labels(stage).inc(audio_seconds)
+                STAGE_RTF.labels(stage).observe(seconds / audio_seconds)
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "rss_delta_mb": 0.0})
+            entry["seconds"] = round(entry["seconds"] + seconds, 3)
+            entry["rss_delta_mb"] = round(entry["rss_delta_mb"] + rss_delta_mb, 1)
+            if audio_seconds:
+                entry["audio_seconds"] = round(entry.get("audio_seconds", 0.0) + audio_seconds, 3)
+                entry["rtf"] = round(entry["seconds"] / entry["audio_seconds"], 4)
+
+    def timed(self, stage: str, audio_seconds: float | None, fn):
+        """Обёртка для executor.submit: замер стадии в потоке исполнителя."""
+        def run(*args, **kwargs):
+            with self.measure(stage, audio_seconds):
+                return fn(*args, **kwargs)
+        return run
+
+    def pop(self) -> dict:
+        with self._lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+
+def merge_timings(target: dict, stages: dict) -> dict:
+    """Добавляет тайминги стадии Celery к накопленным в контексте задачи."""
+    for stage, entry in stages.items():
+        if stage in target:
+            merged = dict(target[stage])
+            for key in ("seconds", "rss_delta_mb", "audio_seconds"):
+                if key in entry:
+                    merged[key] = round(merged.get(key, 0.0) + entry[key], 3)
+            if merged.get("audio_seconds"):
+                merged["rtf"] = round(merged["seconds"] / merged["audio_seconds"], 4)
+            target[stage] = merged
+        else:
+            target[stage] = entry
+    return target
+
+
+@contextlib.contextmanager
+def profile_to(directory: str | None, name: str, mode: str = "cprofile"):
+    """Профиль стадии по запросу; при directory=None профилирование выключено.
+
+    cprofile — name.prof (pstats/snakeviz) и name.txt с топом по cumulative;
+    видит только текущий поток, поэтому для стадий с пулом потоков удобнее
+    PIPELINE_EXECUTION_MODE=sequential. py-spy — flame graph name.svg по всем
+    потокам процесса (нужен py-spy и права на ptrace).
+    """
+    if not directory:
+        yield None
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    if mode == "py-spy":
+        recorder = subprocess.Popen(
+            ["py-spy", "record", "--pid", str(os.getpid()), "--threads", "--output", f"{path}.svg"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            yield f"{path}.svg"
+        finally:
+            # py-spy дописывает отчёт по SIGINT
+            recorder.send_signal(signal.SIGINT)
+            recorder.wait(timeout=30)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield f"{path}.prof"
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path}.prof")
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+        with open(f"{path}.txt", "w") as f:
+            f.write(report.getvalue())
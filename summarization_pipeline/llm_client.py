@@ -0,0 +1,122 @@
+import asyncio
+import json
+import random
+import threading
+from typing import Callable
+
+import httpx
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_clients: dict[tuple, "LLMClient"] = {}
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Фоновый цикл событий процесса, в котором живут пулы соединений к LLM."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client", daemon=True).start()
+    return _loop
+
+
+def get_llm_client(config) -> "LLMClient":
+    """Возвращает долгоживущий клиент для конфигурации, чтобы соединения
+    переиспользовались между задачами воркера."""
+    key = (config.request_timeout, config.max_concurrency, config.max_retries)
+    with _loop_lock:
+        if key not in _clients:
+            _clients[key] = LLMClient(config.request_timeout, config.max_concurrency, config.max_retries)
+    return _clients[key]
+
+
+class LLMClient:
+    """Асинхронный HTTP-клиент к LLM с keep-alive, ограничением параллельности
+    и повторами с экспоненциальной задержкой.
+
+    Синхронный код вызывает run(), корутины выполняются в фоновом цикле.
+    """
+
+    def __init__(self, timeout: float, max_concurrency: int, max_retries: int, backoff_seconds: float = 1.0):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._client = None
+        self._semaphore = None
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Создаётся внутри фонового цикла при первом запросе
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _with_retries(self, request: Callable):
+        client = self.client
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await request(client)
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in RETRY_STATUSES
+                    if not retryable or attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self.backoff_seconds * 2 ** attempt * (1 + random.random() / 2))
+
+    async def post_json(self, url: str, payload: dict, headers: dict | None = None) -> dict:
+        async def request(client: httpx.AsyncClient) -> dict:
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        return await self._with_retries(request)
+
+    async def post_stream(self, url: str, payload: dict, parse_line: Callable[[str], str | None],
+                          on_partial: Callable[[str], None] | None = None, headers: dict | None = None) -> str:
+        """Потоковый запрос: собирает текст из строк ответа.
+
+        parse_line возвращает фрагмент текста из строки потока (или None).
+        on_partial получает накопленный текст после каждого фрагмента.
+        Повтор после обрыва начинает ответ заново.
+        """
+        async def request(client: httpx.AsyncClient) -> str:
+            parts = []
+            async with client.stream("POST", url, json=payload, headers=headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    piece = parse_line(line) if line.strip() else None
+                    if piece:
+                        parts.append(piece)
+                        if on_partial is not None:
+                            on_partial("".join(parts))
+            return "".join(parts)
+
+        return await self._with_retries(request)
+
+
+def parse_ollama_line(line: str) -> str | None:
+    return json.loads(line).get("response")
+
+
+def parse_openai_line(line: str) -> str | None:
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content")
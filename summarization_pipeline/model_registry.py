@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+def estimate_model_size_mb(model: Any) -> float:
+    """Оценивает объём памяти модели по её параметрам и буферам."""
+    modules = []
+    if callable(getattr(model, "parameters", None)):
+        modules.append(model)
+    else:
+        # pyannote Pipeline не является nn.Module, но хранит модели в атрибутах
+        for value in vars(model).values() if hasattr(model, "__dict__") else []:
+            if callable(getattr(value, "parameters", None)):
+                modules.append(value)
+
+    size = 0
+    for module in modules:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            size += tensor.numel() * tensor.element_size()
+    return size / (1024 * 1024)
+
+
+class ModelRegistry:
+    """Пул моделей, живущий в процессе воркера.
+
+    Модели загружаются один раз (при старте воркера или при первом обращении)
+    и переиспользуются между задачами. Ключ модели — кортеж
+    (тип, имя модели, устройство, бэкенд инференса). При превышении бюджета памяти
+    вытесняются давно не использовавшиеся модели (LRU).
+    """
+
+    def __init__(self, max_memory_mb: float | None = None):
+        self.max_memory_mb = max_memory_mb
+        self._models: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._local = threading.local()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], size_mb: float | None = None) -> Any:
+        """Возвращает модель по ключу, загружая её через loader при промахе."""
+        started = time.perf_counter()
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                model = self._models[key][0]
+                self._record(key, "warm", time.perf_counter() - started)
+                return model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Загрузка идёт вне общего лока, чтобы разные модели грузились параллельно
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self._record(key, "warm", time.perf_counter() - started)
+                    return self._models[key][0]
+
+            model = loader()
+            if size_mb is None:
+                size_mb = estimate_model_size_mb(model)
+
+            with self._lock:
+                self._evict(size_mb)
+                self._models[key] = (model, size_mb)
+                self._key_locks.pop(key, None)
+            self._record(key, "cold", time.perf_counter() - started)
+        return model
+
+    def _evict(self, incoming_mb: float) -> None:
+        if self.max_memory_mb is None:
+            return
+        while self._models and self.memory_usage_mb() + incoming_mb > self.max_memory_mb:
+            self._models.popitem(last=False)
+
+    def memory_usage_mb(self) -> float:
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._models.keys())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def _record(self, key: Hashable, state: str, seconds: float) -> None:
+        timings = getattr(self._local, "timings", None)
+        if timings is None:
+            timings = self._local.timings = []
+        timings.append({"model": "/".join(str(part) for part in key), "state": state, "seconds": round(seconds, 3)})
+
+    def pop_timings(self) -> list[dict]:
+        """Возвращает и сбрасывает тайминги загрузки моделей текущего потока."""
+        timings = getattr(self._local, "timings", None) or []
+        self._local.timings = []
+        return timings
+
+
+_max_memory = os.getenv("MODEL_POOL_MAX_MEMORY_MB")
+model_registry = ModelRegistry(float(_max_memory) if _max_memory else None)
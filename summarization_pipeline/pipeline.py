@@ -1,49 +1,279 @@
-from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import time
+from functools import cached_property
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-from file_ingestion_module import FileIngestionModule
+from file_ingestion_module import FileIngestionModule, PreprocessedAudio, load_audio
 from transcription_module import TranscriptionModule
 from diarization_module import DiarizationModule
 from dialogue_parser_module import DialogueParserModule
+from dialogue_compaction_module import DialogueCompactionModule
 from summarization_module import SummarizationModule
 from result_formatter import ResultFormatterModule
-from config import load_transcription_config
+from config import ExecutionConfig, load_transcription_config, load_diarization_config, load_compaction_config
+from model_registry import model_registry
+from segments import Segments
+import instrumentation
+
+
+# Сколько первых сегментов транскрипции уходит подписчикам как частичный результат
+PARTIAL_TRANSCRIPT_SEGMENTS = 20
+
+_executors: dict[tuple[str, int], Executor] = {}
+
+
+def get_executor(config: ExecutionConfig) -> Executor | None:
+    """Возвращает долгоживущий пул исполнителей для параллельных стадий.
+
+    Пул процессов создаётся один раз на процесс воркера, чтобы модели,
+    загруженные в дочерних процессах, оставались в их пуле моделей.
+    Режим process требует, чтобы Celery-воркер не был демоническим
+    (например, --pool=threads или --pool=solo).
+    """
+    if config.mode == "sequential":
+        return None
+    key = (config.mode, config.max_workers)
+    if key not in _executors:
+        if config.mode == "thread":
+            _executors[key] = ThreadPoolExecutor(max_workers=config.max_workers, thread_name_prefix="pipeline")
+        elif config.mode == "process":
+            _executors[key] = ProcessPoolExecutor(
+                max_workers=config.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            raise ValueError(f"Unknown execution mode: {config.mode}")
+    return _executors[key]
+
+
+def _transcribe_in_subprocess(transcription_config, audio: PreprocessedAudio, speech_timeline: Segments | None = None) -> Segments:
+    return TranscriptionModule.from_config(transcription_config).transcribe(audio, speech_timeline)
+
+
+def _diarize_in_subprocess(diarization_config, audio: PreprocessedAudio, num_speakers: int | None) -> Segments:
+    return DiarizationModule(diarization_config).diarize(audio, num_speakers)
 
 
 class SummarizationPipeline:
-    def __init__(self, transcription_config, diarization_config, summarization_config, status_tracker, num_speakers, language):
-        transcription_module = load_transcription_config(language)
-        self.transcription = TranscriptionModule.from_config(transcription_module)
-        self.diarization = DiarizationModule(diarization_config)
-        self.summarization = SummarizationModule(summarization_config)
+    def __init__(self, transcription_config, diarization_config, summarization_config, status_tracker, num_speakers, language, execution_config=None, compaction_config=None):
+        self.execution_config = execution_config or ExecutionConfig()
+        self.compaction_config = compaction_config or load_compaction_config()
+        self.transcription_config = transcription_config or load_transcription_config(language)
+        self.diarization_config = diarization_config
+        self.summarization_config = summarization_config
         self.status_tracker = status_tracker
         self.num_speakers = num_speakers
         self.language = language
-    
-    def run(self, audio_file_path, task_id):
+        # Тайминги загрузки моделей (cold — загрузка, warm — взята из пула воркера)
+        self.model_load_timings = []
+        # Длительность, аудио, RTF и RSS по стадиям; задача забирает их через timings.pop()
+        self.timings = instrumentation.StageTimings()
+
+    # Модули создаются при первом обращении: стадии, которым модели не нужны
+    # (например, суммаризация на I/O-воркере), их не загружают.
+    # В режиме process модели ASR и диаризации живут в дочерних процессах.
+    @cached_property
+    def transcription(self) -> TranscriptionModule:
+        return self._load_module(lambda: TranscriptionModule.from_config(self.transcription_config))
+
+    @cached_property
+    def diarization(self) -> DiarizationModule:
+        return self._load_module(lambda: DiarizationModule(self.diarization_config))
+
+    @cached_property
+    def summarization(self) -> SummarizationModule:
+        return SummarizationModule.from_config(self.summarization_config)
+
+    @cached_property
+    def compaction(self) -> DialogueCompactionModule:
+        return DialogueCompactionModule(self.compaction_config, self.language)
+
+    def _load_module(self, factory):
+        model_registry.pop_timings()
+        module = factory()
+        self.model_load_timings.extend(model_registry.pop_timings())
+        return module
+
+    def run(self, audio_file_path, task_id, output_dir="results"):
         # 1. File ingestion
-        FileIngestionModule.preprocess_audio(audio_file_path)
-        self.status_tracker.set_status(task_id, "preprocessed")
-        
-        # 2. Transcription 
-        transcription = self.transcription.transcribe(audio_file_path)
-        self.status_tracker.set_status(task_id, "transcription_done")
-        
-        # 3. Diarization
-        diarization = self.diarization.diarize(audio_file_path, self.num_speakers)
-        self.status_tracker.set_status(task_id, "diarization_done")
-        
+        audio = self.preprocess(audio_file_path, task_id)
+
+        # 2-3. Transcription and diarization
+        transcription, diarization = self.transcribe_and_diarize(audio, task_id)
+        audio.release()
+
+        # 4-6. Dialogue parsing, summarization, formatting
+        return self.summarize_dialogue(transcription, diarization, task_id, output_dir)
+
+    def preprocess(self, audio_file_path, task_id, output_path=None) -> PreprocessedAudio:
+        # Одно декодирование, дальше стадии работают с буфером
+        with self.timings.measure("preprocess") as stage:
+            audio = FileIngestionModule.preprocess_audio(audio_file_path, output_path)
+            stage["audio_seconds"] = audio.duration
+        self.status_tracker.set_status(task_id, "preprocessed", audio.stats())
+        return audio
+
+    def summarize_dialogue(self, transcription, diarization, task_id, output_dir="results"):
+        dialogue = self.parse_dialogue(transcription, diarization, task_id)
+        dialogue, _ = self.compact_dialogue(dialogue, task_id)
+        summary = self.summarize(dialogue, task_id)
+        return self.format_results(summary, task_id, output_dir)
+
+    def parse_dialogue(self, transcription, diarization, task_id) -> str:
         # 4. Dialogue parsing
-        dialogue = DialogueParserModule.format_as_dialogue(transcription, diarization)
+        with self.timings.measure("dialogue"):
+            dialogue = DialogueParserModule.format_as_dialogue(transcription, diarization)
         self.status_tracker.set_status(task_id, "dialogue_done")
+        return dialogue
+
+    def compact_dialogue(self, dialogue: str, task_id) -> tuple[str, dict]:
+        # 4a. Compaction: меньше токенов на входе LLM
+        if not self.compaction_config.enabled:
+            return dialogue, {}
+        with self.timings.measure("compaction"):
+            dialogue, stats = self.compaction.compact(dialogue)
+        self.status_tracker.set_status(task_id, "dialogue_compacted", stats)
+        return dialogue, stats
 
+    def summarize(self, dialogue: str, task_id) -> str:
         # 5. Summarization
-        summary = self.summarization.summarize(dialogue)
-        self.status_tracker.set_status(task_id, "summarization_done")
+        # Частичный реферат публикуется подписчикам по мере потоковой генерации
+        self.status_tracker.set_status(task_id, "summarizing")
+        with self.timings.measure("summarization"):
+            summary = self.summarization.summarize(
+                dialogue,
+                on_partial=lambda text: self.status_tracker.publish_partial(task_id, "summary", text),
+            )
+        self.status_tracker.set_status(task_id, "summarization_done", self.summarization.last_stats)
+        return summary
 
+    def format_results(self, summary: str, task_id, output_dir="results"):
         # 6. Formatting
-        formatted_summary = ResultFormatterModule.format_results(summary)
+        with self.timings.measure("formatting"):
+            formatted_summary = ResultFormatterModule().format_results(summary, output_dir, task_id)
         self.status_tracker.set_status(task_id, "formatting_done")
-
         return formatted_summary
-    
-    
\ No newline at end of file
+
+    def render_results(self, summary: str, task_id) -> dict[str, str]:
+        # 6. Formatting в памяти: результаты сразу уходят в хранилище
+        with self.timings.measure("formatting"):
+            rendered = ResultFormatterModule().render_results(summary)
+        self.status_tracker.set_status(task_id, "formatting_done")
+        return rendered
+
+    def mark_transcribed(self, task_id, transcription: Segments) -> None:
+        self.status_tracker.set_status(task_id, "transcription_done")
+        self.publish_transcript(task_id, transcription)
+
+    def publish_transcript(self, task_id, transcription: Segments) -> None:
+        if transcription.text is not None:
+            snippet = " ".join(text for text in transcription.text[:PARTIAL_TRANSCRIPT_SEGMENTS] if text)
+            self.status_tracker.publish_partial(task_id, "transcript", snippet)
+
+    def process_shard(self, audio: PreprocessedAudio | str) -> dict:
+        """Транскрибация и диаризация одного шарда длинной записи.
+
+        Число говорящих в шарде не фиксируется: общее num_speakers
+        применяется при сведении шардов.
+        """
+        audio = load_audio(audio)
+        with self.timings.measure("diarization", audio.duration):
+            diarization, embeddings = self.diarization.diarize_with_embeddings(audio)
+        speech_timeline = None
+        if TranscriptionModule.requires_speech_timeline(self.transcription_config):
+            speech_timeline = DiarizationModule.speech_timeline(diarization)
+        with self.timings.measure("transcription", audio.duration):
+            transcription = self.transcription.transcribe(audio, speech_timeline)
+        return {"transcription": transcription, "diarization": diarization, "embeddings": embeddings}
+
+    def transcribe_and_diarize(self, audio: PreprocessedAudio | str, task_id, transcription=None, diarization=None) -> tuple[Segments, Segments]:
+        """Транскрибация и диаризация не зависят друг от друга и могут идти параллельно.
+
+        Исключение — GigaAM с разметкой речи от диаризации: тогда сегментация
+        выполняется один раз, и транскрибация стартует после диаризации.
+        Уже известный результат одной из стадий (например, из кэша) можно
+        передать, тогда считается только недостающая.
+        Статус обновляется по мере завершения каждой стадии.
+        """
+        audio = load_audio(audio)
+        if transcription is not None or diarization is not None:
+            return self.complete_missing(audio, task_id, transcription, diarization)
+        if TranscriptionModule.requires_speech_timeline(self.transcription_config):
+            return self.diarize_then_transcribe(audio, task_id)
+
+        executor = get_executor(self.execution_config)
+        if executor is None:
+            with self.timings.measure("transcription", audio.duration):
+                transcription = self.transcription.transcribe(audio)
+            self.mark_transcribed(task_id, transcription)
+            with self.timings.measure("diarization", audio.duration):
+                diarization = self.diarization.diarize(audio, self.num_speakers)
+            self.status_tracker.set_status(task_id, "diarization_done")
+            return transcription, diarization
+
+        if self.execution_config.mode == "process":
+            # Замыкание в дочерний процесс не передать: время меряется здесь, от отправки до результата
+            submitted = time.perf_counter()
+            futures = {
+                executor.submit(_transcribe_in_subprocess, self.transcription_config, audio): "transcription_done",
+                executor.submit(_diarize_in_subprocess, self.diarization_config, audio, self.num_speakers): "diarization_done",
+            }
+        else:
+            submitted = None
+            futures = {
+                executor.submit(self.timings.timed("transcription", audio.duration, self.transcription.transcribe), audio): "transcription_done",
+                executor.submit(self.timings.timed("diarization", audio.duration, self.diarization.diarize), audio, self.num_speakers): "diarization_done",
+            }
+
+        results = {}
+        for future in as_completed(futures):
+            stage = futures[future]
+            results[stage] = future.result()
+            if submitted is not None:
+                self.timings.record(stage.removesuffix("_done"), time.perf_counter() - submitted, audio.duration)
+            if stage == "transcription_done":
+                self.mark_transcribed(task_id, results[stage])
+            else:
+                self.status_tracker.set_status(task_id, stage)
+        return results["transcription_done"], results["diarization_done"]
+
+    def complete_missing(self, audio: PreprocessedAudio, task_id, transcription, diarization) -> tuple[Segments, Segments]:
+        if diarization is None:
+            with self.timings.measure("diarization", audio.duration):
+                diarization = self.diarization.diarize(audio, self.num_speakers)
+            self.status_tracker.set_status(task_id, "diarization_done")
+        if transcription is None:
+            speech_timeline = None
+            if TranscriptionModule.requires_speech_timeline(self.transcription_config):
+                speech_timeline = DiarizationModule.speech_timeline(diarization)
+            with self.timings.measure("transcription", audio.duration):
+                transcription = self.transcription.transcribe(audio, speech_timeline)
+            self.mark_transcribed(task_id, transcription)
+        return transcription, diarization
+
+    def diarize_then_transcribe(self, audio: PreprocessedAudio, task_id) -> tuple[Segments, Segments]:
+        with self.timings.measure("diarization", audio.duration):
+            if self.execution_config.mode == "process":
+                executor = get_executor(self.execution_config)
+                diarization = executor.submit(_diarize_in_subprocess, self.diarization_config, audio, self.num_speakers).result()
+            else:
+                diarization = self.diarization.diarize(audio, self.num_speakers)
+        self.status_tracker.set_status(task_id, "diarization_done")
+
+        speech_timeline = DiarizationModule.speech_timeline(diarization)
+        with self.timings.measure("transcription", audio.duration):
+            if self.execution_config.mode == "process":
+                transcription = executor.submit(_transcribe_in_subprocess, self.transcription_config, audio, speech_timeline).result()
+            else:
+                transcription = self.transcription.transcribe(audio, speech_timeline)
+        self.mark_transcribed(task_id, transcription)
+        return transcription, diarization
+
+
+def preload_models(languages: list[str]) -> list[dict]:
+    """Прогревает пул моделей воркера для перечисленных языков."""
+    model_registry.pop_timings()
+    for language in languages:
+        TranscriptionModule.from_config(load_transcription_config(language))
+    DiarizationModule(load_diarization_config())
+    return model_registry.pop_timings()
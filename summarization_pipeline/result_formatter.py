@@ -40,6 +40,13 @@ Generated on: {timestamp}
 ---
 This summary was automatically generated from audio content."""
 
+    def render_results(self, summary: str) -> Dict[str, str]:
+        """Format the summary into .md and .txt contents without touching the disk."""
+        return {
+            "md": self._format_markdown(summary),
+            "txt": self._format_text(summary)
+        }
+
     def format_results(self, summary: str, output_dir: str, task_id: str) -> Dict[str, str]:
         """
         Format the summary into both .md and .txt files and return their paths.
@@ -59,16 +66,12 @@ This summary was automatically generated from audio content."""
         md_path = os.path.join(output_dir, f"{task_id}_summary.md")
         txt_path = os.path.join(output_dir, f"{task_id}_summary.txt")
         
-        # Format and save markdown
-        md_content = self._format_markdown(summary)
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(md_content)
-            
-        # Format and save text
-        txt_content = self._format_text(summary)
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(txt_content)
-            
+        # Format and save both documents
+        rendered = self.render_results(summary)
+        for path, content in ((md_path, rendered["md"]), (txt_path, rendered["txt"])):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
         return {
             "md": md_path,
             "txt": txt_path
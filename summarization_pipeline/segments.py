@@ -0,0 +1,225 @@
+import io
+import os
+
+import numpy as np
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Объединяет пересекающиеся интервалы. Returns: (начала, концы) по возрастанию."""
+    if len(starts) == 0:
+        return np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    # Интервал начинает новую группу, если начинается после всех предыдущих концов
+    running_end = np.maximum.accumulate(ends)
+    new_group = np.ones(len(starts), dtype=bool)
+    new_group[1:] = starts[1:] > running_end[:-1]
+    # Конец группы — накопленный максимум концов на её последнем интервале
+    last_in_group = np.append(np.flatnonzero(new_group)[1:] - 1, len(starts) - 1)
+    return starts[new_group], running_end[last_in_group]
+
+
+def encode_strings(values) -> tuple[np.ndarray, np.ndarray]:
+    """Строки -> (UTF-8 блоб, смещения длиной N + 1), без pickle."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    return [data[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def object_array(values) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def factorize(labels) -> tuple[list, np.ndarray]:
+    """Метки говорящих -> (уникальные метки в порядке появления, целочисленные коды)."""
+    index = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.int64, count=len(labels))
+    return list(index), codes
+
+
+def as_column(values) -> np.ndarray | None:
+    if values is None or isinstance(values, np.ndarray):
+        return values
+    return object_array(list(values))
+
+
+class Segments:
+    """Набор временных сегментов (транскрипция, диаризация, разметка речи).
+
+    Хранит столбцы numpy вместо списка словарей: start/end в секундах,
+    необязательные text, speaker и words (слова с отметками времени).
+    Срезы и запросы по времени не копируют строки, сериализация — npz без pickle.
+    """
+
+    __slots__ = ("start", "end", "text", "speaker", "words")
+
+    def __init__(self, start, end, text=None, speaker=None, words=None):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.text = as_column(text)
+        self.speaker = as_column(speaker)
+        self.words = as_column(words)
+
+    @classmethod
+    def empty(cls) -> "Segments":
+        return cls(np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "Segments":
+        """Из прежнего формата list[dict] с ключами start, end, transcription, speaker_id, words."""
+        if not records:
+            return cls.empty()
+        first = records[0]
+        return cls(
+            [r["start"] for r in records],
+            [r["end"] for r in records],
+            [r["transcription"] for r in records] if "transcription" in first else None,
+            [r["speaker_id"] for r in records] if "speaker_id" in first else None,
+            [r.get("words") for r in records] if any("words" in r for r in records) else None,
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "Segments":
+        return value if isinstance(value, cls) else cls.from_records(value)
+
+    @classmethod
+    def concatenate(cls, parts: list["Segments"]) -> "Segments":
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+
+        def column(name):
+            if all(getattr(part, name) is None for part in parts):
+                return None
+            return np.concatenate([
+                getattr(part, name) if getattr(part, name) is not None else object_array([None] * len(part))
+                for part in parts
+            ])
+
+        return cls(
+            np.concatenate([part.start for part in parts]),
+            np.concatenate([part.end for part in parts]),
+            column("text"), column("speaker"), column("words"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __repr__(self) -> str:
+        columns = [name for name in ("text", "speaker", "words") if getattr(self, name) is not None]
+        return f"Segments(n={len(self)}, columns={columns})"
+
+    def record(self, index: int) -> dict:
+        record = {"start": float(self.start[index]), "end": float(self.end[index])}
+        if self.text is not None:
+            record["transcription"] = self.text[index]
+        if self.speaker is not None:
+            record["speaker_id"] = self.speaker[index]
+        if self.words is not None and self.words[index] is not None:
+            record["words"] = self.words[index]
+        return record
+
+    def to_records(self) -> list[dict]:
+        return [self.record(i) for i in range(len(self))]
+
+    def __iter__(self):
+        return (self.record(i) for i in range(len(self)))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.record(key)
+        return Segments(
+            self.start[key], self.end[key],
+            None if self.text is None else self.text[key],
+            None if self.speaker is None else self.speaker[key],
+            None if self.words is None else self.words[key],
+        )
+
+    def sorted(self) -> "Segments":
+        if len(self) < 2 or np.all(self.start[1:] >= self.start[:-1]):
+            return self
+        return self[np.argsort(self.start, kind="stable")]
+
+    def between(self, start: float, end: float) -> "Segments":
+        """Сегменты, пересекающиеся с [start, end). Набор должен быть отсортирован по началу."""
+        hi = np.searchsorted(self.start, end, side="left")
+        # Концы не упорядочены, поэтому ищем по накопленному максимуму концов
+        lo = np.searchsorted(np.maximum.accumulate(self.end[:hi]), start, side="right") if hi else 0
+        window = self[lo:hi]
+        return window[window.end > start]
+
+    def shift(self, offset: float) -> "Segments":
+        words = None
+        if self.words is not None:
+            words = [
+                None if ws is None else [{**w, "start": w["start"] + offset, "end": w["end"] + offset} for w in ws]
+                for ws in self.words
+            ]
+        return Segments(self.start + offset, self.end + offset, self.text, self.speaker, words)
+
+    def with_speakers(self, speaker) -> "Segments":
+        return Segments(self.start, self.end, self.text, speaker, self.words)
+
+    def union(self) -> "Segments":
+        """Объединение интервалов без учёта говорящих (разметка речи)."""
+        return Segments(*merge_intervals(self.start, self.end))
+
+    def to_bytes(self) -> bytes:
+        arrays = {"start": self.start, "end": self.end}
+        if self.text is not None:
+            arrays["text_blob"], arrays["text_offsets"] = encode_strings(self.text)
+        if self.speaker is not None:
+            labels, codes = factorize(self.speaker.tolist())
+            arrays["speaker_labels"], arrays["speaker_codes"] = np.array(labels, dtype=str), codes.astype(np.int32)
+        if self.words is not None:
+            flat = [w for ws in self.words for w in (ws or [])]
+            arrays["word_counts"] = np.array([len(ws) if ws is not None else -1 for ws in self.words], dtype=np.int32)
+            arrays["word_start"] = np.array([w["start"] for w in flat], dtype=np.float64)
+            arrays["word_end"] = np.array([w["end"] for w in flat], dtype=np.float64)
+            arrays["word_blob"], arrays["word_offsets"] = encode_strings([w["word"] for w in flat])
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Segments":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            text = speaker = words = None
+            if "text_blob" in arrays:
+                text = object_array(decode_strings(arrays["text_blob"], arrays["text_offsets"]))
+            if "speaker_labels" in arrays:
+                speaker = object_array(arrays["speaker_labels"].tolist())[arrays["speaker_codes"]]
+            if "word_counts" in arrays:
+                texts = decode_strings(arrays["word_blob"], arrays["word_offsets"])
+                starts, ends = arrays["word_start"].tolist(), arrays["word_end"].tolist()
+                words = []
+                position = 0
+                for count in arrays["word_counts"].tolist():
+                    if count < 0:
+                        words.append(None)
+                        continue
+                    words.append([
+                        {"start": starts[i], "end": ends[i], "word": texts[i]}
+                        for i in range(position, position + count)
+                    ])
+                    position += count
+            return cls(arrays["start"], arrays["end"], text, speaker, words)
+
+    def save(self, path: str) -> str:
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Segments":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
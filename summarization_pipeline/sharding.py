@@ -0,0 +1,121 @@
+import numpy as np
+
+from file_ingestion_module import PreprocessedAudio, find_silence_point, load_audio, write_float_wav
+from segments import Segments, object_array
+
+
+def plan_shards(audio: PreprocessedAudio | str, shard_seconds: float, search_seconds: float) -> list[tuple[int, int]]:
+    """Делит запись на шарды примерно по shard_seconds, разрезая в паузах.
+
+    Returns:
+        list: Границы шардов в секундах
+    """
+    audio = load_audio(audio)
+    sr = audio.sample_rate
+    total = len(audio.waveform)
+    shard_size = int(shard_seconds * sr)
+    search = int(search_seconds * sr)
+    if not 0 <= search < shard_size:
+        raise ValueError(f"search_seconds={search_seconds} must be >= 0 and < shard_seconds={shard_seconds}")
+
+    shards = []
+    position = 0
+    while total - position > shard_size + search:
+        limit = position + shard_size
+        cut, _ = find_silence_point(audio.waveform, limit - search, limit + search)
+        if cut <= position:
+            raise RuntimeError(f"Shard cut at {cut / sr:.1f}s does not advance past {position / sr:.1f}s")
+        shards.append((position / sr, cut / sr))
+        position = cut
+    shards.append((position / sr, total / sr))
+    return shards
+
+
+def write_shard(audio: PreprocessedAudio | str, start: float, end: float, path: str) -> PreprocessedAudio:
+    """Сохраняет срез записи [start, end) секунд как отдельный предобработанный WAV."""
+    audio = load_audio(audio)
+    sr = audio.sample_rate
+    write_float_wav(path, audio.waveform[int(round(start * sr)):int(round(end * sr))], sr)
+    return PreprocessedAudio(path, audio.sample_rate)
+
+
+def cluster_embeddings(embeddings: np.ndarray, threshold: float, num_clusters: int | None = None, groups: list | None = None) -> np.ndarray:
+    """Агломеративная кластеризация эмбеддингов (косинусное расстояние, средняя связь).
+
+    Слияние идёт, пока расстояние между ближайшими кластерами меньше threshold,
+    либо до num_clusters кластеров, если число говорящих известно.
+    Эмбеддинги одной группы (groups, например шард) никогда не попадают
+    в один кластер: num_clusters меньше размера группы не достигается.
+    """
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    distances = 1.0 - normalized @ normalized.T
+    clusters = [[i] for i in range(len(embeddings))]
+    cluster_groups = [{groups[i]} if groups is not None else set() for i in range(len(embeddings))]
+
+    while len(clusters) > 1:
+        best = None
+        for a in range(len(clusters)):
+            for b in range(a + 1, len(clusters)):
+                if cluster_groups[a] & cluster_groups[b]:
+                    # Разные говорящие одного шарда: слияние запрещено
+                    continue
+                distance = distances[np.ix_(clusters[a], clusters[b])].mean()
+                if best is None or distance < best[0]:
+                    best = (distance, a, b)
+        if best is None:
+            break
+        distance, a, b = best
+        if num_clusters is not None:
+            if len(clusters) <= num_clusters:
+                break
+        elif distance >= threshold:
+            break
+        clusters[a] = clusters[a] + clusters[b]
+        cluster_groups[a] = cluster_groups[a] | cluster_groups[b]
+        del clusters[b]
+        del cluster_groups[b]
+
+    labels = np.empty(len(embeddings), dtype=int)
+    for label, members in enumerate(clusters):
+        labels[members] = label
+    return labels
+
+
+def reconcile_speakers(shard_results: list[dict], threshold: float = 0.5, num_speakers: int | None = None) -> tuple[Segments, Segments]:
+    """Сводит результаты шардов к общей шкале времени и общим speaker_id.
+
+    Каждый элемент shard_results содержит offset (секунды), transcription и
+    diarization (Segments) и embeddings ({локальная метка: вектор}). Говорящие
+    разных шардов объединяются кластеризацией их эмбеддингов; разные
+    говорящие одного шарда всегда остаются разными.
+    """
+    keys = []
+    vectors = []
+    for shard_index, shard in enumerate(shard_results):
+        for label, vector in shard["embeddings"].items():
+            vector = np.asarray(vector, dtype=np.float32)
+            if np.all(np.isfinite(vector)) and np.any(vector):
+                keys.append((shard_index, label))
+                vectors.append(vector)
+
+    mapping = {}
+    if vectors:
+        labels = cluster_embeddings(np.stack(vectors), threshold, num_speakers, [shard_index for shard_index, _ in keys])
+        mapping = {key: f"SPEAKER_{label:02d}" for key, label in zip(keys, labels)}
+    next_label = len(set(mapping.values()))
+
+    transcription = []
+    diarization = []
+    for shard_index, shard in enumerate(shard_results):
+        offset = shard["offset"]
+        transcription.append(shard["transcription"].shift(offset))
+        speakers = []
+        for label in shard["diarization"].speaker.tolist():
+            key = (shard_index, label)
+            if key not in mapping:
+                # Говорящий без пригодного эмбеддинга получает отдельную метку
+                mapping[key] = f"SPEAKER_{next_label:02d}"
+                next_label += 1
+            speakers.append(mapping[key])
+        diarization.append(shard["diarization"].shift(offset).with_speakers(object_array(speakers)))
+    return Segments.concatenate(transcription), Segments.concatenate(diarization)
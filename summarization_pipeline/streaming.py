@@ -0,0 +1,219 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from file_ingestion_module import PreprocessedAudio, TARGET_SAMPLE_RATE
+from transcription_module import TranscriptionModule
+from diarization_module import SpeakerEmbeddingModule
+from config import StreamingConfig, load_streaming_config, load_transcription_config
+from segments import Segments
+
+# Уровень шума сглаживается по кадрам без речи
+NOISE_SMOOTHING = 0.05
+
+
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    """16-битный little-endian PCM в float32 [-1, 1]."""
+    return np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class IncrementalVAD:
+    """Энергетический VAD по кадрам для потока отсчётов.
+
+    Порог — максимум из абсолютного energy_threshold и уровня шума,
+    умноженного на noise_ratio. Фрагмент речи закрывается после паузы
+    min_silence_seconds или принудительно по max_segment_seconds.
+    """
+
+    def __init__(self, config: StreamingConfig, sample_rate: int = TARGET_SAMPLE_RATE):
+        self.config = config
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * config.frame_ms / 1000)
+        self.min_silence_frames = max(1, int(config.min_silence_seconds * 1000 / config.frame_ms))
+        self.max_segment_frames = max(1, int(config.max_segment_seconds * 1000 / config.frame_ms))
+        self.min_speech_frames = max(1, int(config.min_speech_seconds * 1000 / config.frame_ms))
+        self.pre_roll = deque(maxlen=max(1, int(config.pre_roll_seconds * 1000 / config.frame_ms)))
+        self.pending = np.empty(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.noise_floor = None
+        self.speech = []
+        self.speech_start = 0
+        self.silence_frames = 0
+
+    def feed(self, samples: np.ndarray) -> list[tuple[float, np.ndarray]]:
+        """Принимает очередные отсчёты.
+
+        Returns:
+            list: Завершённые фрагменты (начало в секундах, отсчёты)
+        """
+        data = np.concatenate([self.pending, samples]) if len(self.pending) else samples
+        count = len(data) // self.frame
+        self.pending = data[count * self.frame:]
+        if count == 0:
+            return []
+        blocks = data[:count * self.frame].reshape(count, self.frame)
+        energy = np.sqrt(np.mean(np.square(blocks), axis=1))
+
+        finished = []
+        for block, value in zip(blocks, energy.tolist()):
+            if self.noise_floor is None:
+                # Поток может начаться с речи: уровень шума не выше абсолютного порога
+                self.noise_floor = min(value, self.config.energy_threshold)
+            voiced = value > max(self.config.energy_threshold, self.noise_floor * self.config.noise_ratio)
+            if not voiced:
+                self.noise_floor += NOISE_SMOOTHING * (value - self.noise_floor)
+
+            if self.speech:
+                self.speech.append(block)
+                self.silence_frames = 0 if voiced else self.silence_frames + 1
+                if self.silence_frames >= self.min_silence_frames:
+                    # Хвостовая тишина не нужна модели, остаётся только её начало
+                    tail = self.speech[-self.silence_frames:]
+                    finished.extend(self.close(self.speech[:len(self.speech) - self.silence_frames + self.pre_roll.maxlen]))
+                    self.pre_roll.extend(tail)
+                elif len(self.speech) >= self.max_segment_frames:
+                    # Речь без пауз режется по длине; продолжение начнётся следующим фрагментом
+                    finished.extend(self.close(self.speech))
+                    self.pre_roll.clear()
+            elif voiced:
+                self.speech_start = self.frames_seen - len(self.pre_roll)
+                self.speech = list(self.pre_roll) + [block]
+                self.silence_frames = 0
+            else:
+                self.pre_roll.append(block)
+            self.frames_seen += 1
+        return finished
+
+    def close(self, blocks: list[np.ndarray]) -> list[tuple[float, np.ndarray]]:
+        start = self.speech_start * self.frame / self.sample_rate
+        voiced_frames = len(self.speech) - self.silence_frames
+        self.speech = []
+        self.silence_frames = 0
+        if voiced_frames < self.min_speech_frames:
+            return []
+        return [(start, np.concatenate(blocks))]
+
+    def flush(self) -> list[tuple[float, np.ndarray]]:
+        """Закрывает незавершённый фрагмент в конце потока."""
+        if not self.speech:
+            return []
+        return self.close(self.speech)
+
+    @property
+    def position(self) -> float:
+        """Секунд потока, прошедших через VAD."""
+        return (self.frames_seen * self.frame + len(self.pending)) / self.sample_rate
+
+
+class OnlineSpeakerTracker:
+    """Назначение говорящих по ближайшему центроиду эмбеддингов.
+
+    Фрагмент дальше speaker_threshold (косинусное расстояние) от всех
+    центроидов открывает нового говорящего, пока их меньше max_speakers.
+    """
+
+    def __init__(self, threshold: float, max_speakers: int | None = None):
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.sums = []
+
+    @staticmethod
+    def label(index: int) -> str:
+        return f"SPEAKER_{index:02d}"
+
+    def assign(self, embedding: np.ndarray, update: bool = True) -> str:
+        vector = embedding / (np.linalg.norm(embedding) or 1.0)
+        if self.sums:
+            centroids = np.array(self.sums)
+            similarity = centroids @ vector / np.linalg.norm(centroids, axis=1)
+            best = int(np.argmax(similarity))
+            full = self.max_speakers is not None and len(self.sums) >= self.max_speakers
+            if 1.0 - similarity[best] < self.threshold or full or not update:
+                if update:
+                    self.sums[best] = self.sums[best] + vector
+                return self.label(best)
+        self.sums.append(vector)
+        return self.label(len(self.sums) - 1)
+
+
+class StreamingSession:
+    """Транскрибация живого потока: VAD, ASR фрагмента, говорящий по эмбеддингу.
+
+    feed() дешёвый и выполняется при приёме кадров; process() вызывает модели,
+    поэтому фрагменты одной сессии обрабатываются по порядку в пуле инференса.
+    """
+
+    def __init__(self, transcription: TranscriptionModule, embedding: SpeakerEmbeddingModule, config: StreamingConfig, num_speakers: int | None = None):
+        self.transcription = transcription
+        self.embedding = embedding
+        self.config = config
+        self.vad = IncrementalVAD(config)
+        self.speakers = OnlineSpeakerTracker(config.speaker_threshold, num_speakers)
+        self.lines = []
+        self.segment_latencies = []
+
+    def feed(self, pcm: bytes) -> list[tuple[float, np.ndarray]]:
+        return self.vad.feed(pcm16_to_float(pcm))
+
+    def flush(self) -> list[tuple[float, np.ndarray]]:
+        return self.vad.flush()
+
+    def process(self, start: float, samples: np.ndarray, closed_at: float | None = None) -> list[dict]:
+        """Распознаёт фрагмент и назначает говорящего.
+
+        Returns:
+            list: Строки диалога (start, end, speaker, text, line, latency)
+        """
+        audio = PreprocessedAudio.from_samples(samples, self.vad.sample_rate)
+        # Фрагмент целиком — речь: собственный VAD модели не нужен
+        segments = self.transcription.transcribe(audio, Segments([0.0], [audio.duration]))
+        if segments.text is None or not any(segments.text):
+            return []
+        # Короткий фрагмент даёт ненадёжный эмбеддинг: назначаем ближайшего, не сдвигая центроид
+        update = audio.duration >= self.config.min_embedding_seconds
+        speaker = self.speakers.assign(self.embedding.embed(audio), update)
+
+        lines = []
+        for record in segments:
+            text = (record.get("transcription") or "").strip()
+            if not text:
+                continue
+            lines.append({
+                "start": round(start + record["start"], 3),
+                "end": round(start + record["end"], 3),
+                "speaker": speaker,
+                "text": text,
+                "line": f"#{speaker}#: {text}",
+            })
+        if closed_at is not None:
+            latency = time.perf_counter() - closed_at
+            self.segment_latencies.append(latency)
+            for line in lines:
+                line["latency"] = round(latency, 3)
+        self.lines.extend(lines)
+        return lines
+
+    def dialogue(self) -> str:
+        return "\n".join(line["line"] for line in self.lines)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.segment_latencies)
+        return {
+            "duration": round(self.vad.position, 3),
+            "lines": len(self.lines),
+            "speakers": len(self.speakers.sums),
+            "segment_latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "segment_latency_max": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+def create_session(language: str | None, num_speakers: int | None = None, config: StreamingConfig | None = None) -> StreamingSession:
+    """Сессия с моделями из пула процесса: после первой сессии модели уже загружены."""
+    config = config or load_streaming_config()
+    return StreamingSession(
+        TranscriptionModule.from_config(load_transcription_config(language)),
+        SpeakerEmbeddingModule(config),
+        config,
+        num_speakers,
+    )
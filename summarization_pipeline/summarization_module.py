@@ -1,8 +1,93 @@
+import abc
+import asyncio
 import json
-import requests
-import openai
-
-class SummarizationModule:
+import time
+
+from llm_client import get_llm_client, parse_ollama_line, parse_openai_line
+from instrumentation import observe_tokens
+
+# Грубая оценка без токенизатора: для смеси русского и английского ~3 символа на токен
+CHARS_PER_TOKEN = 3
+
+# Частичный реферат публикуется в статус не чаще раза в столько секунд
+PARTIAL_INTERVAL_SECONDS = 1.0
+
+DEFAULT_REDUCE_PROMPT = (
+    "Ниже приведены рефераты последовательных фрагментов одной беседы. "
+    "Объедини их в единый связный реферат всей беседы без повторов.\n\n{summaries}"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def throttle(callback, interval: float):
+    """Пропускает вызовы callback чаще interval секунд."""
+    if callback is None:
+        return None
+    last_call = 0.0
+
+    def throttled(text: str) -> None:
+        nonlocal last_call
+        now = time.monotonic()
+        if now - last_call >= interval:
+            last_call = now
+            callback(text)
+    return throttled
+
+
+def split_long_turn(turn: str, max_tokens: int) -> list[str]:
+    """Делит слишком длинную реплику по словам, сохраняя метку говорящего."""
+    speaker, sep, text = turn.partition(": ")
+    prefix = speaker + sep if sep else ""
+    words = (text if sep else turn).split()
+
+    pieces = []
+    current = []
+    for word in words:
+        if current and estimate_tokens(prefix + " ".join(current + [word])) > max_tokens:
+            pieces.append(prefix + " ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(prefix + " ".join(current))
+    return pieces
+
+
+def split_dialogue(dialogue: str, max_tokens: int, overlap_turns: int = 0) -> list[str]:
+    """Делит диалог на фрагменты по границам реплик в пределах бюджета токенов.
+
+    Последние overlap_turns реплик фрагмента повторяются в начале следующего,
+    чтобы не терять контекст на стыке.
+    """
+    turns = []
+    for line in dialogue.splitlines():
+        if not line.strip():
+            continue
+        turns.extend(split_long_turn(line, max_tokens) if estimate_tokens(line) > max_tokens else [line])
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for turn in turns:
+        tokens = estimate_tokens(turn)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # Перекрытие не должно само по себе съедать весь бюджет
+            overlap = current[-overlap_turns:] if overlap_turns else []
+            while overlap and sum(map(estimate_tokens, overlap)) + tokens > max_tokens // 2:
+                overlap = overlap[1:]
+            current = list(overlap)
+            current_tokens = sum(map(estimate_tokens, current))
+        current.append(turn)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class SummarizationModule(abc.ABC):
     def __init__(self, config):
         self.config = config
 
@@ -14,95 +99,148 @@ class SummarizationModule:
         else:
             self.structured_outputs = False
 
-    def summarize(self, dialogue: str) -> str:
-        """Создаёт общий реферат всей беседы."""
-    
+        self.client = get_llm_client(config)
+        self.last_stats = {}
 
-class OllamaSummarizer(SummarizationModule):
-    def __init__(self, config):
-        super().__init__(config)
+    @staticmethod
+    def from_config(config) -> "SummarizationModule":
+        if config.format == "ollama":
+            return OllamaSummarizer(config)
+        elif config.format == "openai":
+            return OpenAISummarizer(config)
+        else:
+            raise ValueError(f"Unknown LLM format: {config.format}")
 
-    def get_promt(self, dialogue: str) -> str:
-        prompt = self.prompt.format(DIalogue=dialogue)
-        return prompt
+    def get_prompt(self, dialogue: str) -> str:
+        return self.prompt["prompt"].format(DIalogue=dialogue)
+
+    def get_reduce_prompt(self, summaries: list[str]) -> str:
+        template = self.prompt.get("reduce_prompt", DEFAULT_REDUCE_PROMPT)
+        parts = [f"Фрагмент {i + 1}:\n{summary}" for i, summary in enumerate(summaries)]
+        return template.format(summaries="\n\n".join(parts))
 
-    def summarize(self, dialogue: str) -> str:
+    async def generate(self, prompt: str, on_partial=None) -> str:
         if self.structured_outputs:
-            summary = self.run_structured_output(dialogue)
+            return await self.run_structured_output(prompt)
+        return await self.run_general_output(prompt, on_partial)
+
+    @abc.abstractmethod
+    async def run_structured_output(self, prompt: str) -> str:
+        """Ответ в формате из промпта (format); возвращает поле summary."""
+
+    @abc.abstractmethod
+    async def run_general_output(self, prompt: str, on_partial=None) -> str:
+        """Текстовый ответ; при потоковой выдаче on_partial получает накопленный текст."""
+
+    async def timed_generate(self, prompt: str, stats: dict, on_partial=None) -> tuple[str, float]:
+        started = time.perf_counter()
+        summary = await self.generate(prompt, on_partial)
+        # Оценка по длине текста: ответы Ollama и OpenAI-совместимых серверов считают токены по-разному
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(summary)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        observe_tokens(prompt_tokens, completion_tokens)
+        return summary, time.perf_counter() - started
+
+    def summarize(self, dialogue: str, on_partial=None) -> str:
+        """Создаёт общий реферат всей беседы.
+
+        Диалог, не помещающийся в chunk_max_tokens, реферируется по частям
+        (map) параллельно, затем частичные рефераты сводятся (reduce) —
+        при необходимости в несколько уровней. on_partial получает
+        накопленный текст итогового реферата по мере генерации.
+        """
+        return self.client.run(self.asummarize(dialogue, throttle(on_partial, PARTIAL_INTERVAL_SECONDS)))
+
+    async def asummarize(self, dialogue: str, on_partial=None) -> str:
+        started = time.perf_counter()
+        chunks = split_dialogue(dialogue, self.config.chunk_max_tokens, self.config.chunk_overlap_turns)
+        stats = {"chunks": len(chunks), "chunk_latencies": [], "reduce_latencies": [], "prompt_tokens": 0, "completion_tokens": 0}
+
+        if len(chunks) <= 1:
+            summary, latency = await self.timed_generate(self.get_prompt(dialogue), stats, on_partial)
+            stats["chunk_latencies"].append(round(latency, 3))
         else:
-            summary = self.run_general_output(dialogue)
+            # Параллельность ограничивает семафор клиента (max_concurrency)
+            results = await asyncio.gather(*[self.timed_generate(self.get_prompt(chunk), stats) for chunk in chunks])
+            stats["chunk_latencies"] = [round(latency, 3) for _, latency in results]
+            summary = await self.reduce([partial for partial, _ in results], stats, on_partial)
+
+        stats["total_seconds"] = round(time.perf_counter() - started, 3)
+        self.last_stats = stats
         return summary
-    
-    def run_structured_output(self, dialogue: str) -> dict:
-        payload = {
-            "model": self.config.model,
-            "prompt": self.get_promt(dialogue),
-            "stream": False,
-            "format": self.prompt['format'],
-            "temperature": self.config.temperature
-        }
-        headers = {
-            "Content-Type": "application/json"
-        }
 
-        response = requests.post(self.config.url, headers=headers, data=json.dumps(payload))
-        response = json.loads(response['response'])
-        return response['summary']
-    
-    def run_general_output(self, dialogue: str) -> str:
-        payload = {
+    async def reduce(self, summaries: list[str], stats: dict, on_partial=None) -> str:
+        """Сводит частичные рефераты группами в пределах бюджета, пока не останется один."""
+        while True:
+            groups = [[]]
+            for summary in summaries:
+                group = groups[-1]
+                if group and estimate_tokens(self.get_reduce_prompt(group + [summary])) > self.config.chunk_max_tokens:
+                    groups.append([summary])
+                else:
+                    group.append(summary)
+
+            # Если рефераты не укладываются в бюджет даже парами, сводим всё за один проход
+            if len(groups) == len(summaries) > 1:
+                groups = [summaries]
+            # Потоково публикуется только последний, итоговый проход
+            final = on_partial if len(groups) == 1 else None
+            results = await asyncio.gather(*[self.timed_generate(self.get_reduce_prompt(group), stats, final) for group in groups])
+            stats["reduce_latencies"].extend(round(latency, 3) for _, latency in results)
+            summaries = [summary for summary, _ in results]
+            if len(summaries) == 1:
+                return summaries[0]
+
+
+class OllamaSummarizer(SummarizationModule):
+    def payload(self, prompt: str, stream: bool) -> dict:
+        return {
             "model": self.config.model,
-            "prompt": self.get_promt(dialogue),
-            "stream": False,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"temperature": self.config.temperature}
         }
 
-        headers = {
-            "Content-Type": "application/json"
-        }
+    async def run_structured_output(self, prompt: str) -> str:
+        payload = {**self.payload(prompt, False), "format": self.prompt['format']}
+        response = await self.client.post_json(self.config.url, payload)
+        return json.loads(response['response'])['summary']
 
-        response = requests.post(self.config.url, headers=headers, data=json.dumps(payload))
+    async def run_general_output(self, prompt: str, on_partial=None) -> str:
+        if self.config.stream:
+            return await self.client.post_stream(self.config.url, self.payload(prompt, True), parse_ollama_line, on_partial)
+        response = await self.client.post_json(self.config.url, self.payload(prompt, False))
         return response['response']
 
 
 class OpenAISummarizer(SummarizationModule):
-    def __init__(self, config):
-        super().__init__(config)
-        openai.api_key = self.config.api_key
+    """Chat Completions API (OpenAI и совместимые серверы); LLM_URL — полный адрес
+    эндпоинта, например https://api.openai.com/v1/chat/completions."""
 
-    def get_prompt(self, dialogue: str) -> str:
-        return self.prompt.format(DIalogue=dialogue)
+    @property
+    def headers(self) -> dict:
+        # Локальным совместимым серверам ключ не нужен
+        return {"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else {}
 
-    def summarize(self, dialogue: str) -> str:
-        if self.structured_outputs:
-            return self.run_structured_output(dialogue)
-        else:
-            return self.run_general_output(dialogue)
-
-    def run_structured_output(self, dialogue: str) -> dict:
-        prompt = self.get_prompt(dialogue)
-
-        response = openai.ChatCompletion.create(
-            model=self.config.model,
-            messages=[
-                {"role": "system", "content": self.prompt.get("system", "You are a helpful assistant.")},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=self.config.temperature,
-            response_format="json"  # если ты используешь функцию structured output с json_mode
-        )
-        
-        return response.choices[0].message["content"]  # предполагается, что ответ — JSON-строка, которую можно распарсить отдельно
-
-    def run_general_output(self, dialogue: str) -> str:
-        prompt = self.get_prompt(dialogue)
-
-        response = openai.ChatCompletion.create(
-            model=self.config.model,
-            messages=[
+    def payload(self, prompt: str, stream: bool) -> dict:
+        return {
+            "model": self.config.model,
+            "messages": [
                 {"role": "system", "content": self.prompt.get("system", "You are a helpful assistant.")},
                 {"role": "user", "content": prompt}
             ],
-            temperature=self.config.temperature
-        )
-        
-        return response.choices[0].message["content"]
+            "temperature": self.config.temperature,
+            "stream": stream
+        }
+
+    async def run_structured_output(self, prompt: str) -> str:
+        payload = {**self.payload(prompt, False), "response_format": {"type": "json_object"}}
+        response = await self.client.post_json(self.config.url, payload, self.headers)
+        return json.loads(response["choices"][0]["message"]["content"])["summary"]
+
+    async def run_general_output(self, prompt: str, on_partial=None) -> str:
+        if self.config.stream:
+            return await self.client.post_stream(self.config.url, self.payload(prompt, True), parse_openai_line, on_partial, self.headers)
+        response = await self.client.post_json(self.config.url, self.payload(prompt, False), self.headers)
+        return response["choices"][0]["message"]["content"]
@@ -0,0 +1,48 @@
+import numpy as np
+import whisper
+
+from model_registry import model_registry
+from file_ingestion_module import PreprocessedAudio, load_audio
+from inference_backends import check_backend, quantize_int8
+from segments import Segments
+from transcription_module import TranscriptionModule
+
+
+class WhisperTranscriptionModule(TranscriptionModule):
+    # Декодер Whisper с kv-кешем в ONNX не экспортируется: только квантование torch
+    SUPPORTED_BACKENDS = ("torch_fp32", "torch_int8")
+
+    def __init__(self, config):
+        check_backend(config, self.SUPPORTED_BACKENDS)
+        self.model = model_registry.get(
+            ("whisper", config.model_name, config.device, config.inference_backend),
+            lambda: self.load_model(config),
+        )
+        self.word_timestamps = config.word_timestamps
+
+    @staticmethod
+    def load_model(config):
+        model = whisper.load_model(config.model_name, device=config.device)
+        if config.inference_backend == "torch_int8":
+            return quantize_int8(model)
+        return model
+
+    def transcribe(self, audio: PreprocessedAudio | str, speech_timeline: Segments | None = None) -> Segments:
+        # Whisper принимает float32 16 кГц массив напрямую
+        waveform = np.asarray(load_audio(audio).waveform)
+        result = self.model.transcribe(waveform, word_timestamps=self.word_timestamps)
+        return self.format_transcription(result["segments"])
+
+    def format_transcription(self, transcription_segments: list[dict]) -> Segments:
+        words = None
+        if self.word_timestamps:
+            words = [
+                [{"start": w["start"], "end": w["end"], "word": w["word"]} for w in segment.get("words", [])]
+                for segment in transcription_segments
+            ]
+        return Segments(
+            [segment["start"] for segment in transcription_segments],
+            [segment["end"] for segment in transcription_segments],
+            [segment["text"].strip() for segment in transcription_segments],
+            words=words,
+        )
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Модули сервиса и пайплайна импортируются плоско, как в процессах API и воркера
+for path in ("summarization_pipeline", "moduels", "benchmarks"):
+    sys.path.insert(0, os.path.join(ROOT, path))
@@ -0,0 +1,27 @@
+"""Очистка реплик при сжатии диалога."""
+from config import CompactionConfig
+from dialogue_compaction_module import DialogueCompactionModule
+
+
+def module(language: str = "ru") -> DialogueCompactionModule:
+    return DialogueCompactionModule(CompactionConfig(), language)
+
+
+def test_hyphenated_word_is_not_a_repeat():
+    text = "Я знаю, что что-то пошло не так"
+    assert module().clean_text(text) == text
+
+
+def test_units_are_kept():
+    assert module().clean_text("Длина 5 м, ширина 3 мм") == "Длина 5 м, ширина 3 мм"
+    assert module("en").clean_text("Gap is 3 mm wide") == "Gap is 3 mm wide"
+
+
+def test_repeats_are_collapsed():
+    assert module().clean_text("я я я думаю") == "я думаю"
+    assert module().clean_text("Да, да, да, согласен") == "Да, согласен"
+
+
+def test_fillers_are_removed():
+    assert module().clean_text("ну вот мы ээ закончили") == "мы закончили"
+
@@ -0,0 +1,100 @@
+"""Клиент LLM против фейкового сервера (benchmarks/fake_ollama.py)."""
+import json
+import os
+import tempfile
+
+import httpx
+
+from config import SummarizationConfig
+from fake_ollama import start_server
+from llm_client import LLMClient
+from summarization_module import SummarizationModule
+
+DIALOGUE = "\n".join(f"#SPEAKER_0{i % 2}#: реплика номер {i}" for i in range(40))
+TOKENS = 20
+EXPECTED = "".join(f"слово{i} " for i in range(TOKENS))
+
+
+def summarizer(url: str, llm_format: str = "ollama", prompt: dict | None = None, **options) -> SummarizationModule:
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(prompt or {"prompt": "Кратко перескажи беседу:\n{DIalogue}"}, f, ensure_ascii=False)
+    try:
+        config = SummarizationConfig(model="fake", url=url, temperature=0.2, format=llm_format, prompt_path=f.name, **options)
+        return SummarizationModule.from_config(config)
+    finally:
+        os.remove(f.name)
+
+
+def serve(**options):
+    server = start_server(tokens=TOKENS, token_delay=0.002, first_token_delay=0.01, **options)
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_stream_is_assembled_in_order():
+    server, base = serve()
+    try:
+        for llm_format, path in (("ollama", "/api/generate"), ("openai", "/v1/chat/completions")):
+            module = summarizer(base + path, llm_format)
+            partials = []
+            summary = module.client.run(module.asummarize(DIALOGUE, partials.append))
+            assert summary == EXPECTED
+            assert len(partials) == TOKENS and partials[-1] == EXPECTED
+            assert all(EXPECTED.startswith(partial) for partial in partials)
+        assert all(payload["stream"] for payload in server.RequestHandlerClass.payloads)
+    finally:
+        server.shutdown()
+
+
+def test_5xx_is_retried():
+    server, base = serve(fail_first=2)
+    try:
+        client = LLMClient(timeout=10, max_concurrency=2, max_retries=2, backoff_seconds=0.01)
+        response = client.run(client.post_json(base + "/api/generate", {"prompt": "x", "stream": False}))
+        assert response["response"] == EXPECTED
+        assert server.RequestHandlerClass.requests == 3
+    finally:
+        server.shutdown()
+
+
+def test_5xx_gives_up_after_max_retries():
+    server, base = serve(fail_first=10)
+    try:
+        client = LLMClient(timeout=10, max_concurrency=2, max_retries=1, backoff_seconds=0.01)
+        try:
+            client.run(client.post_json(base + "/api/generate", {"prompt": "x", "stream": False}))
+        except httpx.HTTPStatusError as e:
+            assert e.response.status_code == 503
+        else:
+            raise AssertionError("503 not raised")
+        assert server.RequestHandlerClass.requests == 2
+    finally:
+        server.shutdown()
+
+
+def test_concurrency_is_capped():
+    server, base = serve()
+    try:
+        # Мелкие фрагменты: map-запросов заметно больше, чем max_concurrency
+        module = summarizer(base + "/api/generate", chunk_max_tokens=60, chunk_overlap_turns=0, max_concurrency=2)
+        module.summarize(DIALOGUE)
+        handler = server.RequestHandlerClass
+        assert module.last_stats["chunks"] > 4
+        assert handler.requests > 4
+        assert handler.max_active == 2
+    finally:
+        server.shutdown()
+
+
+def test_structured_format_is_sent_and_parsed():
+    server, base = serve()
+    schema = {"type": "object", "properties": {"summary": {"type": "string"}}}
+    try:
+        prompt = {"prompt": "Кратко перескажи беседу:\n{DIalogue}", "format": schema}
+        assert summarizer(base + "/api/generate", prompt=prompt).summarize(DIALOGUE) == EXPECTED
+        assert summarizer(base + "/v1/chat/completions", "openai", prompt=prompt).summarize(DIALOGUE) == EXPECTED
+        ollama, openai = server.RequestHandlerClass.payloads
+        assert ollama["format"] == schema and not ollama["stream"]
+        assert openai["response_format"] == {"type": "json_object"} and not openai["stream"]
+    finally:
+        server.shutdown()
+
@@ -0,0 +1,38 @@
+"""Склейка long-form окон и настройки окон GigaAM."""
+from pydantic import ValidationError
+
+from config import TranscriptionConfig
+from transcription_module import stitch_overlap
+
+
+def test_stitch_overlap_removes_duplicate_at_boundary():
+    left, right = stitch_overlap("мы пошли в магазин и купили хлеб", "купили хлеб и молоко")
+    assert left == "мы пошли в магазин и купили хлеб"
+    assert right == "и молоко"
+
+
+def test_stitch_overlap_ignores_case_and_punctuation():
+    left, right = stitch_overlap("Он сказал: приходи завтра.", "Приходи завтра утром")
+    assert right == "утром"
+
+
+def test_stitch_overlap_keeps_speech_without_boundary_match():
+    # Общее слово в середине окон — не перекрытие: ни одно слово не удаляется
+    left = "мы пошли в магазин и купили хлеб вчера"
+    right = "завтра и послезавтра мы будем отдыхать дома"
+    assert stitch_overlap(left, right) == (left, right)
+
+
+def test_stitch_overlap_needs_two_words():
+    assert stitch_overlap("сделали отчёт и", "и презентацию") == ("сделали отчёт и", "и презентацию")
+
+
+def test_longform_settings_are_validated():
+    base = {"type": "gigaam", "model_name": "v2_ctc"}
+    for field, value in (("longform_overlap_seconds", -1.0), ("longform_search_seconds", 0.0)):
+        try:
+            TranscriptionConfig(**base, **{field: value})
+        except ValidationError:
+            continue
+        raise AssertionError(f"{field}={value} accepted")
+
@@ -0,0 +1,82 @@
+"""Сведение говорящих между шардами."""
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from config import ShardingConfig
+from file_ingestion_module import PreprocessedAudio, write_float_wav
+from segments import Segments
+from sharding import cluster_embeddings, plan_shards, reconcile_speakers
+
+
+def shard(offset: float, embeddings: dict) -> dict:
+    labels = list(embeddings)
+    starts = np.arange(len(labels), dtype=float) * 10
+    return {
+        "offset": offset,
+        "transcription": Segments(starts, starts + 5, [f"реплика {label}" for label in labels]),
+        "diarization": Segments(starts, starts + 5, speaker=labels),
+        "embeddings": embeddings,
+    }
+
+
+def speakers_by_shard(diarization: Segments, shards: list[dict]) -> list[list[str]]:
+    speakers = diarization.speaker.tolist()
+    result = []
+    for item in shards:
+        result.append(speakers[:len(item["embeddings"])])
+        speakers = speakers[len(item["embeddings"]):]
+    return result
+
+
+def test_similar_speakers_in_one_shard_stay_apart():
+    # Два похожих голоса в первом шарде ближе друг к другу, чем порог
+    a = np.array([1.0, 0.0, 0.0])
+    b = np.array([0.95, 0.3, 0.0])
+    shards = [shard(0.0, {"A": a, "B": b}), shard(600.0, {"A": a + 0.01})]
+    _, diarization = reconcile_speakers(shards, threshold=0.5)
+    first, second = speakers_by_shard(diarization, shards)
+    assert first[0] != first[1]
+    assert second[0] == first[0]
+
+
+def test_num_speakers_below_shard_speakers_keeps_them_apart():
+    a = np.array([1.0, 0.0, 0.0])
+    b = np.array([0.9, 0.1, 0.0])
+    shards = [shard(0.0, {"A": a, "B": b}), shard(600.0, {"B": b, "A": a})]
+    _, diarization = reconcile_speakers(shards, threshold=0.5, num_speakers=1)
+    first, second = speakers_by_shard(diarization, shards)
+    assert first[0] != first[1]
+    # Шард 2 сопоставлен с шардом 1 по голосам, а не по порядку меток
+    assert second == [first[1], first[0]]
+
+
+def test_cluster_embeddings_without_groups_merges_close_vectors():
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+    labels = cluster_embeddings(embeddings, threshold=0.3)
+    assert labels[0] == labels[1] != labels[2]
+
+
+def noise(tmp_path, seconds: float) -> PreprocessedAudio:
+    path = str(tmp_path / "audio.wav")
+    write_float_wav(path, np.random.default_rng(0).normal(0, 0.1, int(seconds * 16000)), 16000)
+    return PreprocessedAudio(path)
+
+
+def test_plan_shards_covers_recording(tmp_path):
+    shards = plan_shards(noise(tmp_path, 100), shard_seconds=30, search_seconds=5)
+    assert shards[0][0] == 0 and shards[-1][1] == 100
+    assert all(end > start for start, end in shards)
+    assert all(prev[1] == next_[0] for prev, next_ in zip(shards, shards[1:]))
+
+
+def test_plan_shards_rejects_search_not_shorter_than_shard(tmp_path):
+    with pytest.raises(ValueError):
+        plan_shards(noise(tmp_path, 100), shard_seconds=30, search_seconds=30)
+
+
+def test_sharding_config_rejects_search_not_shorter_than_shard():
+    with pytest.raises(ValidationError):
+        ShardingConfig(shard_seconds=60, search_seconds=60)
+    with pytest.raises(ValidationError):
+        ShardingConfig(search_seconds=-1)
@@ -0,0 +1,70 @@
+"""Раздача событий статуса при обрыве подписки Redis."""
+import asyncio
+
+import fakeredis
+
+import status_events
+from status_events import StatusEventHub
+from status_tracker import StatusTracker
+
+
+class BrokenPubSub:
+    """Подписка, которая ничего не доставляет и обрывается по команде."""
+    def __init__(self, pubsub, broken: asyncio.Event):
+        self.pubsub = pubsub
+        self.broken = broken
+
+    async def psubscribe(self, *patterns):
+        await self.pubsub.psubscribe(*patterns)
+
+    async def listen(self):
+        await self.broken.wait()
+        raise ConnectionError("connection lost")
+        yield
+
+    async def aclose(self):
+        await self.pubsub.aclose()
+
+
+class FlakyRedis:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.broken = asyncio.Event()
+        self.failures = 1
+
+    def pubsub(self):
+        pubsub = self.redis_client.pubsub()
+        if self.failures:
+            self.failures -= 1
+            return BrokenPubSub(pubsub, self.broken)
+        return pubsub
+
+
+async def reader_restarts_and_resyncs():
+    server = fakeredis.FakeServer()
+    tracker = StatusTracker(fakeredis.FakeRedis(server=server))
+    redis_client = FlakyRedis(fakeredis.aioredis.FakeRedis(server=server))
+    hub = StatusEventHub(redis_client)
+    tracker.set_status("t1", "uploaded")
+
+    events = hub.events("t1", lambda: asyncio.to_thread(tracker.get_status, "t1"))
+    first = await events.__anext__()
+    assert first["type"] == "snapshot" and first["status"] == "uploaded"
+
+    # Переход во время обрыва теряется, но приходит снимком после переподписки
+    tracker.set_status("t1", "processing")
+    redis_client.broken.set()
+    second = await asyncio.wait_for(events.__anext__(), 5)
+    assert second["type"] == "snapshot" and second["status"] == "processing"
+
+    tracker.set_status("t1", "completed")
+    third = await asyncio.wait_for(events.__anext__(), 5)
+    assert third["type"] == "status" and third["status"] == "completed"
+    assert not hub._reader.done()
+    hub._reader.cancel()
+
+
+def test_reader_restarts_and_resyncs(monkeypatch):
+    monkeypatch.setattr(status_events, "RECONNECT_MIN_SECONDS", 0.01)
+    asyncio.run(reader_restarts_and_resyncs())
+